@@ -39,6 +39,7 @@ import numpy as np
 import json
 import os
 import re
+import shutil
 import glob
 import time
 import io
@@ -48,6 +49,7 @@ import traceback
 from datetime import datetime, timedelta
 from pathlib import Path
 from collections import defaultdict
+from collections.abc import Mapping
 from io import StringIO
 from urllib.parse import quote
 from typing import Dict, List, Tuple, Optional, Any, Union, Set
@@ -60,6 +62,52 @@ import functools
 from contextlib import contextmanager
 import streamlit.components.v1 as components
 from database import db_manager
+from cache_metrics import TIER_COMPUTE, TIER_INGEST, cache_metrics, instrumented_cache_data, quiet_cache_calls
+from data_fingerprint import bulk_fingerprint, config_fingerprint
+from config_dependencies import ScopedConfig, affected_analyses, scoped_config, scoped_config_fingerprint
+from precompute import PrecomputeTask, precompute_progress, schedule_precompute, wait_for_precompute
+from shared_store import SharedDataStore
+from secure_files import (
+    FORMAT_CHUNKED,
+    FORMAT_FERNET,
+    FileCipher,
+    SecureFileError,
+    available as secure_files_available,
+    read_file as read_secure_file,
+)
+from session_compare import (
+    COMPARISON_LEVELS,
+    STATUS_NEW,
+    STATUS_REMOVED,
+    STATUS_SAME,
+    STATUS_UPDATED,
+    compare_sessions,
+    level_summary,
+)
+from session_index import SessionIndex
+from session_snapshot import (
+    SNAPSHOT_SUFFIX,
+    is_snapshot,
+    load_snapshot,
+    materialize_snapshot,
+    read_manifest,
+    snapshot_document,
+    write_snapshot,
+)
+from column_schema import (
+    apply_schema,
+    column_resolver,
+    release_categoricals,
+    resolve_column,
+    to_numeric_clean,
+)
+from branded_classifier import classify_targets, term_classifier
+from bulk_reader import (
+    BulkIngestCache,
+    BulkWorkbook,
+    CAMPAIGN_SHEET_KEYS as BULK_CAMPAIGN_SHEET_KEYS,
+    ingest_worker_count,
+)
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, NamedStyle
 from openpyxl.formatting.rule import ColorScaleRule
@@ -236,27 +284,55 @@ def _get_fernet():
         st.session_state._fernet = None
         return None
 
-def _read_json_secure(filepath: str):
-    """Read JSON from filepath. If encryption is enabled, decrypt; else read plaintext.
-    If decryption fails but plaintext JSON exists, auto-migrate by re-writing encrypted.
+def _get_file_cipher():
+    """Return a cached FileCipher if ENCRYPTION_KEY is set and cryptography is available; else None."""
+    try:
+        if '_file_cipher' in st.session_state:
+            return st.session_state._file_cipher
+        st.session_state._file_cipher = None
+        if not secure_files_available():
+            return None
+        try:
+            key = st.secrets.get('ENCRYPTION_KEY')
+        except Exception:
+            key = None
+        if key:
+            # Same secret as the Fernet key that encrypted older files
+            st.session_state._file_cipher = FileCipher.from_secret(_derive_fernet_key_from_string(key))
+        return st.session_state._file_cipher
+    except Exception:
+        st.session_state._file_cipher = None
+        return None
+
+def _read_bytes_secure(filepath: str, cipher=None, fernet=None):
+    """Contents of filepath, decrypted. Returns (data, needs_migration).
+
+    Chunked encrypted files stream through ``cipher``; files written before it
+    (whole-file Fernet tokens, decrypted with ``fernet``, or plaintext) are read
+    as they are, and needs_migration is True when encryption is enabled so
+    callers can rewrite them.
     """
-    f = _get_fernet()
-    # Try encrypted read first if encryption enabled
-    if f is not None:
+    data, file_format = read_secure_file(filepath, cipher)
+    if file_format == FORMAT_FERNET:
+        if fernet is None:
+            raise SecureFileError(f"{filepath} is encrypted but no encryption key is configured")
         try:
-            with open(filepath, 'rb') as fh:
-                token = fh.read()
-            data = f.decrypt(token)
-            return json.loads(data.decode('utf-8'))
-        except (InvalidToken, json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError):
-            # Fall through to plaintext attempt for migration/backward compatibility
-            pass
-    # Plaintext read path
+            data = fernet.decrypt(data)
+        except InvalidToken:
+            raise SecureFileError(f"{filepath} could not be decrypted (wrong key or corrupted)") from None
+    return data, cipher is not None and file_format != FORMAT_CHUNKED
+
+def _read_json_secure(filepath: str):
+    """Read JSON from filepath, decrypting when it is encrypted.
+    Files in an older format (plaintext or whole-file Fernet) are rewritten in the
+    chunked encrypted format when encryption is enabled.
+    """
+    cipher = _get_file_cipher()
     try:
-        with open(filepath, 'r') as fh:
-            obj = json.load(fh)
-        # If encryption enabled, auto-migrate by re-writing encrypted
-        if f is not None:
+        data, needs_migration = _read_bytes_secure(filepath, cipher, _get_fernet())
+        obj = json.loads(data)
+        del data
+        if needs_migration:
             try:
                 _write_json_secure(filepath, obj)
             except Exception:
@@ -274,17 +350,45 @@ def _read_json_secure(filepath: str):
         return None
 
 def _write_json_secure(filepath: str, obj: Any):
-    """Write JSON to filepath, encrypting when enabled."""
-    f = _get_fernet()
-    if f is not None:
-        data = json.dumps(obj, indent=2).encode('utf-8')
-        token = f.encrypt(data)
-        with open(filepath, 'wb') as fh:
-            fh.write(token)
+    """Write JSON to filepath, encrypting when enabled.
+    Encrypted output is streamed chunk by chunk instead of building the whole document first.
+    """
+    cipher = _get_file_cipher()
+    if cipher is not None:
+        with cipher.writer(filepath) as out:
+            # iterencode yields many tiny strings; encode them in batches
+            batch = []
+            for piece in json.JSONEncoder(indent=2).iterencode(obj):
+                batch.append(piece)
+                if len(batch) >= 4096:
+                    out.write(''.join(batch).encode('utf-8'))
+                    batch.clear()
+            out.write(''.join(batch).encode('utf-8'))
     else:
         with open(filepath, 'w') as fh:
             json.dump(obj, fh, indent=2)
 
+def _secure_bytes_io():
+    """(read_bytes, write_bytes) callables for binary files, encrypting when enabled.
+
+    The current key is bound into them, so readers that run later or on another
+    thread (lazily loaded session sheets) don't need this session's state.
+    """
+    cipher = _get_file_cipher()
+    fernet = _get_fernet()
+
+    def _read_bytes(filepath: str):
+        return _read_bytes_secure(filepath, cipher, fernet)[0]
+
+    def _write_bytes(filepath: str, data) -> None:
+        if cipher is not None:
+            cipher.write(filepath, data)
+        else:
+            with open(filepath, 'wb') as fh:
+                fh.write(data)
+
+    return _read_bytes, _write_bytes
+
 # --- Helper Functions for Expandable/Downloadable Sections ---
 def create_expandable_section(title, key=None):
     """
@@ -558,26 +662,58 @@ if 'current_page' not in st.session_state:
     st.session_state.current_page = "home"  # Set default page
     
 # --- Cache Management Functions ---
+def session_sd_attribution():
+    """The session's Sponsored Display attribution; analyses that read it include it in their cache key."""
+    return st.session_state.get('sd_attribution_choice', 'Sales')
+
 def clear_caches():
-    """Clear all st.cache_data caches and database caches to force data refresh"""
-    st.cache_data.clear()
+    """Recompute the current client's analyses on next use.
+    
+    New uploads, loaded sessions and attribution changes need no clearing: the
+    analysis caches are keyed on the data fingerprint, the settings each
+    analysis reads and the attribution. This is the explicit refresh; it drops
+    this client's database rows and the analysis functions' st.cache_data
+    entries, not every cached function on the server.
+    """
+    for cached_function in (classify_branded_campaigns, calculate_branded_kpis, get_targeting_performance_data,
+                            get_search_term_data, get_campaign_performance_data, generate_search_term_wordcloud):
+        cached_function.clear()
     
-    # Also clear database cache for current client
     if 'client_config' in st.session_state and st.session_state.client_config:
         client_name = st.session_state.client_config.get('client_name', 'unknown')
         db_manager.clear_client_cache(client_name)
     
     if 'debug_messages' in st.session_state:
-        st.session_state.debug_messages.append("[INFO] All data caches and database caches cleared")
+        st.session_state.debug_messages.append("[INFO] Cleared cached analyses for the current client")
+
+@st.cache_resource
+def shared_data_store():
+    """Process-wide store of loaded datasets, shared by sessions that load the same content."""
+    return SharedDataStore()
+
+def _shared_data_key(kind, *uploaded_files):
+    """Shared store key of uploaded files for the selected client.
+    Processing reads and writes client-scoped caches, so clients never share an entry.
+    """
+    client_name = (st.session_state.get('client_config') or {}).get('client_name', '')
+    return (kind, client_name, _uploads_fingerprint(*uploaded_files))
+
+def _uploads_fingerprint(*uploaded_files):
+    """Content fingerprint of one or more uploaded files (missing ones count as empty)."""
+    digest = hashlib.md5()
+    for uploaded_file in uploaded_files:
+        digest.update(uploaded_file.getvalue() if uploaded_file is not None else b'')
+        digest.update(b'\0')
+    return digest.hexdigest()
         
 if 'cache_initialized' not in st.session_state:
     st.session_state.cache_initialized = True
     # Initialize cache timestamp to track when data was last refreshed
     st.session_state.last_cache_refresh = datetime.now()
     
-    # Cleanup old database cache entries (older than 7 days)
+    # Cleanup old database cache entries (older than 7 days) on a background thread
     try:
-        db_manager.cleanup_old_cache(days_old=7)
+        db_manager.start_background_maintenance(days_old=7)
     except Exception as e:
         if 'debug_messages' in st.session_state:
             st.session_state.debug_messages.append(f"[DB] Cache cleanup failed: {str(e)}")
@@ -599,10 +735,8 @@ def clean_acos(val):
 
 # Helper function to safely convert values to numeric, handling both string and numeric inputs
 def safe_convert_to_numeric(series):
-    if series.dtype == 'object':
-        return pd.to_numeric(series.str.replace('[$,]', '', regex=True), errors='coerce')
-    else:
-        return pd.to_numeric(series, errors='coerce')
+    # Columns typed at ingest are returned as-is
+    return to_numeric_clean(series)
 
 def format_currency_abbreviated(value):
     """
@@ -639,8 +773,11 @@ def calculate_acos_range_distribution(df, num_ranges=5):
     
     # Clean and convert ACoS values to numeric
     df = df.copy()
-    df['ACoS_numeric'] = df['ACoS'].apply(lambda x: clean_acos(x))
-    df['Spend_numeric'] = df['Spend'].replace('[\$,]', '', regex=True).astype(float)
+    if pd.api.types.is_numeric_dtype(df['ACoS'].dtype):
+        df['ACoS_numeric'] = df['ACoS'].fillna(0).astype(float)
+    else:
+        df['ACoS_numeric'] = df['ACoS'].apply(lambda x: clean_acos(x))
+    df['Spend_numeric'] = to_numeric_clean(df['Spend']).astype(float)
     
     # Determine which sales column to use
     sales_col = None
@@ -653,7 +790,7 @@ def calculate_acos_range_distribution(df, num_ranges=5):
         # If no sales column is found, add a placeholder
         df[sales_col] = 0
     
-    df['Sales_numeric'] = df[sales_col].replace('[\$,]', '', regex=True).astype(float)
+    df['Sales_numeric'] = to_numeric_clean(df[sales_col]).astype(float)
     
     # Initialize results dictionary
     results = []
@@ -1016,8 +1153,11 @@ def calculate_acos_distribution_with_ranges(df, ranges, labels):
         return pd.DataFrame()
     
     df = df.copy()
-    df['ACoS_numeric'] = df['ACoS'].apply(lambda x: clean_acos(x))
-    df['Spend_numeric'] = df['Spend'].replace('[\$,]', '', regex=True).astype(float)
+    if pd.api.types.is_numeric_dtype(df['ACoS'].dtype):
+        df['ACoS_numeric'] = df['ACoS'].fillna(0).astype(float)
+    else:
+        df['ACoS_numeric'] = df['ACoS'].apply(lambda x: clean_acos(x))
+    df['Spend_numeric'] = to_numeric_clean(df['Spend']).astype(float)
     
     # Determine which sales column to use
     sales_col = None
@@ -1029,7 +1169,7 @@ def calculate_acos_distribution_with_ranges(df, ranges, labels):
     if sales_col not in df.columns:
         df[sales_col] = 0
     
-    df['Sales_numeric'] = df[sales_col].replace('[\$,]', '', regex=True).astype(float)
+    df['Sales_numeric'] = to_numeric_clean(df[sales_col]).astype(float)
     
     # Initialize results
     results = []
@@ -1323,6 +1463,8 @@ USER_DATA_DIR = get_user_data_dir()
 # Secure root directory to store client data behind a password gate
 SECURE_ROOT_DIR = os.path.join(USER_DATA_DIR, 'secure_data')
 CLIENT_CONFIG_DIR = os.path.join(SECURE_ROOT_DIR, 'clients')
+# Parsed bulk sheets, memory-mapped when the same file is uploaded again
+bulk_ingest_cache = BulkIngestCache(USER_DATA_DIR)
 
 def clear_client_caches():
     """Helper to clear all client-related caches across all storage layers."""
@@ -1643,8 +1785,18 @@ def save_client_config(client_name, config_data):
     # Clear caches so the new/updated client appears in the list
     clear_client_caches()
 
+    # Drop cached analyses only where the settings they read actually changed;
+    # unchanged analyses keep their cache entries (their cache keys are scoped too).
+    affected = affected_analyses(previous_data, config_data)
+    if affected:
+        db_manager.invalidate_analyses(client_name, affected)
+    if 'debug_messages' in st.session_state:
+        st.session_state.debug_messages.append(
+            f"[Settings] {client_name}: invalidated {', '.join(affected) if affected else 'no analyses'}")
+
     # Flag downstream pages to refresh because something actually changed.
     st.session_state.settings_updated = True
+    st.session_state.settings_affected_analyses = affected
 
 # --- Session Management Functions ---
 
@@ -1658,41 +1810,109 @@ def ensure_session_directory(client_name):
         os.makedirs(client_session_dir)
     return client_session_dir
 
+# Sessions shown per page in the session picker
+SESSION_PAGE_SIZE = 20
+# Delta sessions saved against one base before the next session is saved in full
+DELTA_REBASE_EVERY = 8
+
+def _session_metadata(filename, session_data):
+    """The fields the session picker shows for one saved session."""
+    default_name = filename[:-len(SNAPSHOT_SUFFIX)] if filename.endswith(SNAPSHOT_SUFFIX) else filename.replace('.json', '')
+    return {
+        'display_name': session_data.get('session_name', default_name),
+        'timestamp': session_data.get('timestamp', 'Unknown'),
+        'created_date': session_data.get('created_date', 'Unknown'),
+        'description': session_data.get('description', 'No description'),
+        'data_types': session_data.get('data_types', []),
+        # File of the full session a delta session was saved against
+        'delta_base': (session_data.get('base') or {}).get('file')
+    }
+
+def _session_index(client_name):
+    """The session index of a client's session directory (see session_index)."""
+    read_bytes, write_bytes = _secure_bytes_io()
+    
+    def _describe(filepath):
+        # Only called for sessions the index doesn't know yet
+        filename = os.path.basename(filepath)
+        if is_snapshot(filepath):
+            # Only the small manifest is read; sheets stay on disk
+            session_data = read_manifest(filepath, read_bytes)
+        else:
+            session_data = _read_json_secure(filepath)
+        if not isinstance(session_data, dict):
+            if 'debug_messages' in st.session_state:
+                st.session_state.debug_messages.append(f"Error reading session file {filename}: invalid session format")
+            return None
+        return _session_metadata(filename, session_data)
+    
+    return SessionIndex(os.path.join(CLIENT_SESSIONS_DIR, client_name), _describe, read_bytes, write_bytes)
+
 @st.cache_data(ttl=300, show_spinner=False)  # Cache for 5 minutes
-def get_saved_sessions(client_name):
-    """Returns a list of saved session files for a given client from localStorage or filesystem."""
-    # Use filesystem for both cloud and local
+def get_saved_sessions(client_name, sort_by='timestamp', descending=True, offset=0, limit=None):
+    """Returns saved sessions for a given client from the client's session index (newest first by default).
+    Pass offset/limit for one page; count_saved_sessions gives the total.
+    """
     client_session_dir = os.path.join(CLIENT_SESSIONS_DIR, client_name)
     if not os.path.exists(client_session_dir):
         return []
     
-    sessions = []
-    for file in os.listdir(client_session_dir):
-        if file.endswith('.json'):
-            filepath = os.path.join(client_session_dir, file)
-            try:
-                session_data = _read_json_secure(filepath)
-                if not isinstance(session_data, dict):
-                    raise json.JSONDecodeError("Invalid session format", doc=str(session_data), pos=0)
-                sessions.append({
-                        'filename': file,
-                        'filepath': filepath,
-                        'display_name': session_data.get('session_name', file.replace('.json', '')),
-                        'timestamp': session_data.get('timestamp', 'Unknown'),
-                        'created_date': session_data.get('created_date', 'Unknown'),
-                        'description': session_data.get('description', 'No description'),
-                        'data_types': session_data.get('data_types', [])
-                    })
-            except (json.JSONDecodeError, KeyError) as e:
-                st.session_state.debug_messages.append(f"Error reading session file {file}: {str(e)}")
-                continue
-    
-    # Sort by timestamp (newest first)
-    sessions.sort(key=lambda x: x['timestamp'], reverse=True)
+    sessions, _ = _session_index(client_name).page(sort_by, descending, offset, limit)
     return sessions
 
-def save_audit_session(client_name, session_name=None, description=""):
-    """Saves the current audit session data for a client to localStorage or filesystem."""
+@st.cache_data(ttl=300, show_spinner=False)
+def count_saved_sessions(client_name):
+    """Number of saved sessions for a given client."""
+    if not os.path.exists(os.path.join(CLIENT_SESSIONS_DIR, client_name)):
+        return 0
+    return len(_session_index(client_name).entries())
+
+def _clear_session_listing():
+    get_saved_sessions.clear()
+    count_saved_sessions.clear()
+
+def _session_option_label(session):
+    """How a saved session is shown in the session pickers: name and creation date."""
+    try:
+        # Parse the created_date which is in format "YYYY-MM-DD HH:MM:SS"
+        created_date = datetime.strptime(session['created_date'], '%Y-%m-%d %H:%M:%S')
+        formatted_date = created_date.strftime('%m/%d/%y')
+    except (ValueError, TypeError):
+        # Fallback if date parsing fails
+        formatted_date = "Unknown"
+    return f"{session['display_name']} - {formatted_date}"
+
+def _delta_base_session(client_name, session_filename):
+    """Path of the full session a new delta session should be saved against, or None to save in full.
+
+    The newest full session is the base until DELTA_REBASE_EVERY sessions
+    reference it; the next one is saved in full and becomes the new base, which
+    keeps deltas (and their load time) from growing with every audit.
+    """
+    entries = [e for e in _session_index(client_name).entries() if e['filename'] != session_filename]
+    full_sessions = [e for e in entries if e['filename'].endswith(SNAPSHOT_SUFFIX) and not e.get('delta_base')]
+    if not full_sessions:
+        return None
+    base = max(full_sessions, key=lambda e: str(e.get('timestamp', '')))
+    if sum(1 for e in entries if e.get('delta_base') == base['filename']) >= DELTA_REBASE_EVERY:
+        st.session_state.debug_messages.append(f"[Sessions] {base['filename']} has {DELTA_REBASE_EVERY} delta sessions; saving in full as the new base")
+        return None
+    return base['filepath']
+
+def _materialize_delta_sessions(client_name, base_filename):
+    """Rewrite the delta sessions saved against base_filename in full, before it is replaced or deleted."""
+    session_index = _session_index(client_name)
+    read_bytes, write_bytes = _secure_bytes_io()
+    for entry in session_index.entries():
+        if entry.get('delta_base') == base_filename:
+            manifest = materialize_snapshot(entry['filepath'], read_bytes, write_bytes)
+            session_index.record(entry['filename'], _session_metadata(entry['filename'], manifest))
+            st.session_state.debug_messages.append(f"[Sessions] Saved {entry['filename']} in full before its base {base_filename} changed")
+
+def save_audit_session(client_name, session_name=None, description="", delta=False):
+    """Saves the current audit session data for a client to localStorage or filesystem.
+    With delta=True, bulk sheets are stored as changes since the client's latest full session.
+    """
     if not client_name:
         st.error("No client selected for saving session.")
         return False
@@ -1710,43 +1930,61 @@ def save_audit_session(client_name, session_name=None, description=""):
         'created_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         'description': description,
         'data_types': [],
-        'bulk_data': None,
-        'sales_report_data': None,
         'is_companion_data': st.session_state.get('is_companion_data', False),
         'sd_attribution_choice': st.session_state.get('sd_attribution_choice', 'Sales')
     }
     
-    # Save bulk data if available
-    if 'bulk_data' in st.session_state and st.session_state.bulk_data is not None:
-        # Convert DataFrames to dict format for JSON serialization
-        bulk_data_serializable = {}
-        if isinstance(st.session_state.bulk_data, dict):
-            for sheet_name, df in st.session_state.bulk_data.items():
-                if isinstance(df, pd.DataFrame):
-                    bulk_data_serializable[sheet_name] = df.to_dict('records')
-        session_data['bulk_data'] = bulk_data_serializable
+    bulk_data = st.session_state.get('bulk_data')
+    sales_report_data = st.session_state.get('sales_report_data')
+    if bulk_data is not None:
         data_type = "Companion Data" if st.session_state.get('is_companion_data', False) else "Bulk File"
         session_data['data_types'].append(data_type)
-    
-    # Save sales report data if available
-    if 'sales_report_data' in st.session_state and st.session_state.sales_report_data is not None:
-        if isinstance(st.session_state.sales_report_data, pd.DataFrame):
-            session_data['sales_report_data'] = st.session_state.sales_report_data.to_dict('records')
+    if sales_report_data is not None:
         session_data['data_types'].append("Sales Report")
     
-    # Create filename from session name (sanitized)
+    # Create directory name from session name (sanitized)
     safe_session_name = re.sub(r'[^\w\-_\.]', '_', session_name)
-    filename = f"{safe_session_name}.json"
     
     try:
         # Use filesystem in all environments
         client_session_dir = ensure_session_directory(client_name)
-        filepath = os.path.join(client_session_dir, filename)
+        snapshot_path = os.path.join(client_session_dir, f"{safe_session_name}{SNAPSHOT_SUFFIX}")
+        
+        snapshot_filename = os.path.basename(snapshot_path)
+        base_path = _delta_base_session(client_name, snapshot_filename) if delta else None
+        # Sessions saved as changes against the one being replaced keep their data
+        _materialize_delta_sessions(client_name, snapshot_filename)
+        
+        # One compressed columnar file per sheet plus a small manifest (see session_snapshot)
+        read_bytes, write_bytes = _secure_bytes_io()
+        manifest = write_snapshot(
+            snapshot_path,
+            session_data,
+            bulk_data=bulk_data if isinstance(bulk_data, Mapping) else ({} if bulk_data is not None else None),
+            sales_report_data=sales_report_data if isinstance(sales_report_data, pd.DataFrame) else None,
+            write_bytes=write_bytes,
+            base_path=base_path,
+            read_bytes=read_bytes,
+        )
+        if manifest['base']:
+            delta_sheets = [e for e in manifest['bulk_sheets'] if 'delta' in e]
+            st.session_state.debug_messages.append(
+                f"[Sessions] Saved {snapshot_filename} as changes since {manifest['base']['file']} "
+                f"({len(delta_sheets)} of {len(manifest['bulk_sheets'])} sheets, "
+                f"{sum(e['bytes'] for e in manifest['bulk_sheets']) / 1024:.0f} KB)"
+            )
         
-        _write_json_secure(filepath, session_data)
+        # A JSON session saved under the same name is superseded by the snapshot
+        legacy_filename = f"{safe_session_name}.json"
+        legacy_path = os.path.join(client_session_dir, legacy_filename)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
         
-        # Clear the cache to refresh the session list
-        get_saved_sessions.clear()
+        # Update the session index and clear the cache to refresh the session list
+        session_index = _session_index(client_name)
+        session_index.remove(legacy_filename)
+        session_index.record(snapshot_filename, _session_metadata(snapshot_filename, manifest))
+        _clear_session_listing()
         
         return True
         
@@ -1754,6 +1992,46 @@ def save_audit_session(client_name, session_name=None, description=""):
         st.error(f"Error saving session: {str(e)}")
         return False
 
+def _session_fingerprint(filepath, read_bytes):
+    """Identifies a saved session's content; changes whenever the session is saved again."""
+    if is_snapshot(filepath):
+        # Sheets are identified by the manifest; they are read when first used
+        return read_manifest(filepath, read_bytes)['snapshot_id']
+    with open(filepath, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+def _read_saved_session(filepath, read_bytes, include_sales_report=True):
+    """The data a saved session restores, or {'error': ...} if it can't be read."""
+    if is_snapshot(filepath):
+        session_data = load_snapshot(filepath, read_bytes, include_sales_report=include_sales_report)
+        return {
+            'bulk_data': session_data['bulk_data'],
+            'sales_report_data': session_data['sales_report_data'],
+            'is_companion_data': session_data.get('is_companion_data', False),
+            'sd_attribution_choice': session_data.get('sd_attribution_choice', 'Sales'),
+        }
+    # Sessions saved before snapshots: one JSON document of records
+    session_data = _read_json_secure(filepath)
+    if not isinstance(session_data, dict):
+        return {'error': "Session file is corrupted or unreadable."}
+    restored = {'bulk_data': None, 'sales_report_data': None}
+    
+    # Load bulk data if available
+    if session_data.get('bulk_data'):
+        bulk_data_restored = {}
+        for sheet_name, records in session_data['bulk_data'].items():
+            if records:  # Only restore if there are records
+                bulk_data_restored[sheet_name] = apply_schema(pd.DataFrame(records))
+        restored['bulk_data'] = bulk_data_restored if bulk_data_restored else None
+    
+    # Load sales report data if available
+    if include_sales_report and session_data.get('sales_report_data'):
+        restored['sales_report_data'] = apply_schema(pd.DataFrame(session_data['sales_report_data']))
+    
+    restored['is_companion_data'] = session_data.get('is_companion_data', False)
+    restored['sd_attribution_choice'] = session_data.get('sd_attribution_choice', 'Sales')
+    return restored
+
 def load_audit_session(client_name, session_filename):
     """Loads a saved audit session for a client from localStorage or filesystem."""
     if not client_name or not session_filename:
@@ -1768,35 +2046,28 @@ def load_audit_session(client_name, session_filename):
             st.error("Session file not found.")
             return False
         
-        session_data = _read_json_secure(filepath)
-        if not isinstance(session_data, dict):
-            st.error("Session file is corrupted or unreadable.")
+        read_bytes, _ = _secure_bytes_io()
+        session_fingerprint = _session_fingerprint(filepath, read_bytes)
+        
+        # Sessions that load the same file share one copy of its frames
+        restored = {}
+        def _session_slots(view):
+            restored.update(view)
+            return {'bulk_data': view.get('bulk_data'), 'sales_report_data': view.get('sales_report_data')}
+        restored_data = shared_data_store().share(('session', session_fingerprint), lambda: _read_saved_session(filepath, read_bytes), _session_slots)
+        if restored.get('error'):
+            st.error(restored['error'])
             return False
         
-        # Clear existing session data
-        st.session_state.bulk_data = None
-        st.session_state.sales_report_data = None
-        st.session_state.is_companion_data = False
-        
-        # Load bulk data if available
-        if session_data.get('bulk_data'):
-            bulk_data_restored = {}
-            for sheet_name, records in session_data['bulk_data'].items():
-                if records:  # Only restore if there are records
-                    bulk_data_restored[sheet_name] = pd.DataFrame(records)
-            st.session_state.bulk_data = bulk_data_restored if bulk_data_restored else None
-        
-        # Load sales report data if available
-        if session_data.get('sales_report_data'):
-            st.session_state.sales_report_data = pd.DataFrame(session_data['sales_report_data'])
+        # Replace existing session data
+        st.session_state.update(restored_data)
         
         # Restore other session state variables
-        st.session_state.is_companion_data = session_data.get('is_companion_data', False)
-        st.session_state.sd_attribution_choice = session_data.get('sd_attribution_choice', 'Sales')
+        st.session_state.is_companion_data = restored['is_companion_data']
+        st.session_state.sd_attribution_choice = restored['sd_attribution_choice']
         
-        # Clear caches to ensure fresh analysis
-        clear_caches()
         st.session_state.last_cache_refresh = datetime.now()
+        schedule_analysis_precompute()
         
         return True
         
@@ -1816,13 +2087,142 @@ def delete_audit_session(client_name, session_filename):
         if not os.path.exists(filepath):
             return False
         
-        os.remove(filepath)
-        # Clear the cache to refresh the session list
-        get_saved_sessions.clear()
+        if is_snapshot(filepath):
+            # Sessions saved as changes against this one keep their data
+            _materialize_delta_sessions(client_name, session_filename)
+            shutil.rmtree(filepath)
+        else:
+            os.remove(filepath)
+        # Update the session index and clear the cache to refresh the session list
+        _session_index(client_name).remove(session_filename)
+        _clear_session_listing()
         return True
     except Exception as e:
         return False
 
+@instrumented_cache_data(ttl=3600, show_spinner="Comparing sessions...")  # Cache for 1 hour
+def _compare_saved_sessions(previous_path, previous_fingerprint, current_path, current_fingerprint, sd_attribution):
+    """Comparison tables of two saved sessions (see session_compare).
+    The fingerprints are part of the cache key, so a session saved again is compared afresh.
+    """
+    read_bytes, _ = _secure_bytes_io()
+    bulk_data = []
+    for filepath in (previous_path, current_path):
+        # Snapshot sheets are read as the comparison reaches them; sales reports aren't read
+        restored = _read_saved_session(filepath, read_bytes, include_sales_report=False)
+        if restored.get('error'):
+            raise ValueError(f"{os.path.basename(filepath)}: {restored['error']}")
+        bulk_data.append(restored['bulk_data'] or {})
+    return compare_sessions(bulk_data[0], bulk_data[1], sd_attribution)
+
+def compare_audit_sessions(client_name, previous_filename, current_filename):
+    """Compares two saved audit sessions of a client; returns level name -> comparison table, or None."""
+    if not client_name or not previous_filename or not current_filename:
+        st.error("Select two sessions to compare.")
+        return None
+    
+    try:
+        client_session_dir = os.path.join(CLIENT_SESSIONS_DIR, client_name)
+        previous_path = os.path.join(client_session_dir, previous_filename)
+        current_path = os.path.join(client_session_dir, current_filename)
+        if not os.path.exists(previous_path) or not os.path.exists(current_path):
+            st.error("Session file not found.")
+            return None
+        
+        read_bytes, _ = _secure_bytes_io()
+        start_time = time.time()
+        tables = _compare_saved_sessions(
+            previous_path, _session_fingerprint(previous_path, read_bytes),
+            current_path, _session_fingerprint(current_path, read_bytes),
+            st.session_state.get('sd_attribution_choice', 'Sales'),
+        )
+        st.session_state.debug_messages.append(
+            f"[Sessions] Compared {previous_filename} with {current_filename} in {time.time() - start_time:.2f}s "
+            f"({', '.join(f'{len(table)} {name}' for name, table in tables.items())})"
+        )
+        return tables
+    except Exception as e:
+        st.error(f"Error comparing sessions: {str(e)}")
+        return None
+
+# Rows shown per comparison table; the CSV export has all of them
+COMPARISON_ROWS_SHOWN = 1000
+
+def _signed_currency(value):
+    return f"{'-' if value < 0 else '+'}${abs(value):,.2f}"
+
+def display_session_comparison():
+    """The Audit Comparison page: what changed between the two sessions chosen in the sidebar."""
+    st.title("Audit Comparison")
+    comparison = st.session_state.get('session_comparison')
+    if not comparison:
+        st.info("Choose two saved sessions with **📊 Compare Audits** in the sidebar.")
+        return
+    st.markdown(f"**{comparison['previous_name']}** → **{comparison['current_name']}**")
+    
+    tables = compare_audit_sessions(comparison['client_name'], comparison['previous'], comparison['current'])
+    if tables is None:
+        return
+    
+    # Account totals from the campaign rows
+    account = level_summary(tables['campaign'])
+    if account['entities']:
+        previous, current = account['previous'], account['current']
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Spend", f"${current['spend']:,.2f}", _signed_currency(current['spend'] - previous['spend']), delta_color="off")
+        with col2:
+            st.metric("Sales", f"${current['sales']:,.2f}", _signed_currency(current['sales'] - previous['sales']))
+        with col3:
+            if current['acos'] is not None and previous['acos'] is not None:
+                st.metric("ACoS", f"{current['acos']:.1f}%", f"{current['acos'] - previous['acos']:+.1f} pts", delta_color="inverse")
+            else:
+                st.metric("ACoS", f"{current['acos']:.1f}%" if current['acos'] is not None else "N/A")
+        with col4:
+            st.metric("Orders", f"{current['orders']:,.0f}", f"{current['orders'] - previous['orders']:+,.0f}")
+    
+    statuses = [STATUS_NEW, STATUS_REMOVED, STATUS_UPDATED, STATUS_SAME]
+    tabs = st.tabs([level.label for level in COMPARISON_LEVELS.values()])
+    for tab, (name, level) in zip(tabs, COMPARISON_LEVELS.items()):
+        with tab:
+            table = tables[name]
+            if table.empty:
+                st.info(f"No {level.label.lower()} found in these sessions.")
+                continue
+            
+            summary = level_summary(table)
+            changes = f"{summary['updated']:,} with state or {level.setting[0].lower()} changes" if level.setting else None
+            st.caption(" · ".join(part for part in [
+                f"{summary['entities']:,} {level.label.lower()}",
+                f"{summary['new']:,} new",
+                f"{summary['removed']:,} removed",
+                changes,
+            ] if part))
+            
+            status_filter = st.multiselect("Status:", statuses, default=statuses, key=f"comparison_status_{name}")
+            shown = table[table['Status'].isin(status_filter)]
+            if len(shown) > COMPARISON_ROWS_SHOWN:
+                st.caption(f"Showing the {COMPARISON_ROWS_SHOWN:,} largest spend changes of {len(shown):,}")
+            
+            column_config = {}
+            for column in shown.columns:
+                if column.startswith(('Spend', 'Sales', 'Bid', 'Budget')):
+                    column_config[column] = st.column_config.NumberColumn(column, format="$%.2f")
+                elif column.startswith('ACoS'):
+                    column_config[column] = st.column_config.NumberColumn(column, format="%.1f%%")
+            st.dataframe(shown.head(COMPARISON_ROWS_SHOWN), use_container_width=True, hide_index=True,
+                         column_config=column_config)
+            
+            # Written on request; a large account's full table takes a moment to export
+            if st.button("📥 Export CSV", key=f"comparison_export_{name}"):
+                st.download_button(
+                    label=f"💾 Download {level.label} ({len(shown):,} rows)",
+                    data=shown.to_csv(index=False),
+                    file_name=f"{name}_comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                    mime="text/csv",
+                    key=f"comparison_download_{name}"
+                )
+
 # --- Data Processing Functions ---
 
 @st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
@@ -1912,7 +2312,7 @@ def extract_asins_from_sales_report(sales_df):
     st.session_state.debug_messages.append(f"Extracted {len(asin_title_map)} ASINs with titles from sales report")
     return asin_title_map
 
-@st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
+@instrumented_cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
 def process_sales_report(uploaded_file):
     """
     Reads an SC or VC sales report (CSV or XLSX) and extracts relevant sales data.
@@ -1993,33 +2393,8 @@ def process_sales_report(uploaded_file):
         # Step 4: Create standardized DataFrame with proper column mapping
         standardized_df = pd.DataFrame()
         
-        # Helper function for case-insensitive column matching
-        def find_column_case_insensitive(target_patterns, available_columns):
-            """
-            Find a column that matches any of the target patterns (case-insensitive).
-            Returns the actual column name from available_columns, or None if not found.
-            """
-            for col in available_columns:
-                col_clean = str(col).lower().strip()
-                for pattern in target_patterns:
-                    pattern_clean = str(pattern).lower().strip()
-                    if col_clean == pattern_clean:
-                        return col
-            return None
-        
-        # Helper function for partial case-insensitive matching
-        def find_column_partial_match(target_patterns, available_columns):
-            """
-            Find a column that partially matches any of the target patterns (case-insensitive).
-            Returns the actual column name from available_columns, or None if not found.
-            """
-            for col in available_columns:
-                col_clean = str(col).lower().strip()
-                for pattern in target_patterns:
-                    pattern_clean = str(pattern).lower().strip()
-                    if pattern_clean in col_clean:
-                        return col
-            return None
+        # Case-insensitive column lookups (exact matches take the column that comes first in the report)
+        col_lookup = column_resolver(df)
         
         # Standard column mappings for non-sales columns (case-insensitive)
         column_mappings = {
@@ -2041,7 +2416,7 @@ def process_sales_report(uploaded_file):
         found_sales_columns = []
         for pattern in sales_patterns:
             # First try exact case-insensitive match
-            exact_match = find_column_case_insensitive([pattern], original_columns)
+            exact_match = col_lookup.get(pattern)
             if exact_match and exact_match not in found_sales_columns:
                 found_sales_columns.append(exact_match)
                 continue
@@ -2061,7 +2436,7 @@ def process_sales_report(uploaded_file):
         # Map standard columns using case-insensitive matching
         for std_col, possible_names in column_mappings.items():
             # Try case-insensitive exact match first
-            matched_col = find_column_case_insensitive(possible_names, original_columns)
+            matched_col = col_lookup.get(possible_names, first_in_frame=True)
             
             if matched_col:
                 # Found an exact case-insensitive match
@@ -2077,7 +2452,7 @@ def process_sales_report(uploaded_file):
                 continue
             
             # If no exact match, try partial matching
-            matched_col = find_column_partial_match(possible_names, original_columns)
+            matched_col = col_lookup.find_any(possible_names)
             
             if matched_col:
                 # Found a partial case-insensitive match
@@ -2142,7 +2517,7 @@ def process_sales_report(uploaded_file):
         if 'Orders' in standardized_df.columns:
             agg_dict['Orders'] = 'sum'
             
-        result_df = standardized_df.groupby('ASIN', as_index=False).agg(agg_dict)
+        result_df = apply_schema(standardized_df.groupby('ASIN', as_index=False).agg(agg_dict))
         
         # Ensure we have at least one row
         if len(result_df) > 0:
@@ -2164,7 +2539,7 @@ def process_sales_report(uploaded_file):
 
 
 
-@st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
+@instrumented_cache_data(ttl=3600, show_spinner=False, hash_funcs={BulkWorkbook: BulkWorkbook.cache_token})  # Cache for 1 hour
 def detect_and_persist_sku_asin_mappings(bulk_data):
     """
     Detect SKU-ASIN mappings from bulk file data and persist them to Branded ASINs.
@@ -2268,288 +2643,54 @@ def detect_and_persist_sku_asin_mappings(bulk_data):
             save_client_config(st.session_state.selected_client_name, st.session_state.client_config)
             st.session_state.debug_messages.append(f"Persisted {updated_count} SKU-ASIN mappings to Branded ASINs data")
 
+def _bulk_debug_log(message):
+    """Append to the debug log; safe to call from bulk workbook callbacks."""
+    try:
+        st.session_state.debug_messages.append(message)
+    except Exception:
+        pass
+
+def _configured_ingest_workers():
+    """Ingest worker processes from secrets (INGEST_WORKERS) or the environment; 1 = serial."""
+    configured = None
+    try:
+        configured = st.secrets.get('INGEST_WORKERS')
+    except Exception:
+        configured = None
+    return ingest_worker_count(configured)
+
 def process_bulk_data(uploaded_file):
     """
-    Reads all sheets from the bulk advertising file, cleans data,
-    and returns a dictionary of DataFrames.
+    Indexes the bulk advertising file and returns a lazy mapping of sheet keys to
+    DataFrames. Each sheet is streamed, cleaned and cached the first time it is read;
+    sheets of a previously seen file are memory-mapped from the ingest cache.
     """
-    # Check for cached data first
-    client_name = st.session_state.get('client_config', {}).get('client_name', 'unknown')
-    
     # Get file content for hashing
     uploaded_file.seek(0)
     file_content = uploaded_file.read()
     uploaded_file.seek(0)  # Reset for processing
-    
-    # Try to get cached data
-    cached_data = db_manager.get_cached_bulk_data(client_name, file_content)
-    if cached_data:
-        track_cache_hit("bulk_data_processing")
-        return cached_data
-    else:
-        track_cache_miss("bulk_data_processing")
-    
-    bulk_data = {}
-    # These are the primary campaign sheets we'll use for campaign analysis
-    campaign_sheets = [
-        'Sponsored Products Campaigns',
-        'Sponsored Brands Campaigns',
-        'Sponsored Display Campaigns', 
-        'SB Multi Ad Group Campaigns',  # Added SB Multi Ad Group Campaigns as a relevant sheet
-    ]
-
-    numeric_cols_pattern = [
-        'Impressions', 'Clicks', 'Spend', 'Orders', 'Total Sales', 'Sales', 'ROAS',
-        'Cost Per Click (CPC)', 'Click-Thru Rate (CTR)',
-        '7 Day Total Orders (#)', '7 Day Total Sales', 'Sales (Views & Clicks)'
-    ]
-    
-    # Define the sheets that require campaign-level filtering
-    campaign_sheets_to_filter = [
-        'Sponsored Products Campaigns',
-        'Sponsored Brands Campaigns',
-        'Sponsored Display Campaigns',
-        'SB Multi Ad Group Campaigns'  # Added SB Multi Ad Group Campaigns to filtering list
-    ]
 
     try:
-        # Use a more efficient approach to read Excel
-        xls = pd.ExcelFile(uploaded_file)
-        
-        # Helper function to find actual sheet name case-insensitively
-        def find_actual_sheet_name(target_name):
-            """Find the actual sheet name by case-insensitive matching."""
-            target_lower = target_name.lower()
-            for sheet_name in all_sheet_names:
-                if sheet_name.lower() == target_lower:
-                    return sheet_name
-            return None
-        
-        # Helper function to find actual sheet name case-insensitively
-        def find_actual_sheet_name(target_name):
-            """Find the actual sheet name by case-insensitive matching."""
-            target_lower = target_name.lower()
-            for sheet_name in all_sheet_names:
-                if sheet_name.lower() == target_lower:
-                    return sheet_name
-            return None
-        
-        # Get all the sheets available in the file
-        all_sheet_names = xls.sheet_names
-
-        # Find actual sheet names case-insensitively for later use
-        sp_sheet = find_actual_sheet_name('Sponsored Products Campaigns')
-        sb_multi_sheet = find_actual_sheet_name('SB Multi Ad Group Campaigns')
-        sb_standard_sheet = find_actual_sheet_name('Sponsored Brands Campaigns')
-        sd_sheet = find_actual_sheet_name('Sponsored Display Campaigns')
-        st.session_state.debug_messages.append(f"[Bulk File Processing] Found {len(all_sheet_names)} sheets in bulk file: {', '.join(all_sheet_names)}")
-        
-        # Check if we have both SB sheet types
-        has_sb_multi = any(sheet.lower() == 'sb multi ad group campaigns' for sheet in all_sheet_names)
-        has_sb_standard = any(sheet.lower() == 'sponsored brands campaigns' for sheet in all_sheet_names)
-        
-        # Log what we found for debugging
-        if has_sb_multi:
-            st.session_state.debug_messages.append("Found 'SB Multi Ad Group Campaigns' sheet - will use this for Sponsored Brands data")
-        if has_sb_standard:
-            if has_sb_multi:
-                st.session_state.debug_messages.append("Also found 'Sponsored Brands Campaigns' sheet - will be ignored in favor of Multi Ad Group data")
-            else:
-                st.session_state.debug_messages.append("Found 'Sponsored Brands Campaigns' sheet")
-        
-        # Process ALL sheets in the file to ensure we don't miss any data
-        # This is important for search term data which might be in non-standard sheets
-        for sheet_name in all_sheet_names:
-            # Skip sheets containing 'RAS' or 'Portfolio' in their names
-            if 'RAS' in sheet_name or 'Portfolio' in sheet_name:
-                st.session_state.debug_messages.append(f"Skipping sheet: {sheet_name} (contains 'RAS' or 'Portfolio')")
-                continue
-                
-            st.session_state.debug_messages.append(f"Processing sheet: {sheet_name}")
-            try:
-                # Read the sheet
-                df = pd.read_excel(xls, sheet_name=sheet_name)
-                
-                # Skip empty sheets
-                if df.empty:
-                    st.session_state.debug_messages.append(f"Sheet {sheet_name} is empty, skipping")
-                    continue
-                    
-                # Store the sheet data in our dictionary
-                bulk_data[sheet_name] = df
-                st.session_state.debug_messages.append(f"Added sheet {sheet_name} to bulk_data dictionary ({len(df)} rows, {len(df.columns)} columns)")
-            except Exception as e:
-                st.session_state.debug_messages.append(f"Error processing sheet {sheet_name}: {str(e)}")
-                continue
-        
-        # Now process the primary campaign sheets with additional cleaning
-        campaign_sheet_list = []
-        
-        # Add the campaign sheets in the order we want to process them
-
-        
-        if sp_sheet:
-
-        
-            campaign_sheet_list.append(sp_sheet)
-            
-        # For Sponsored Brands, prioritize Multi Ad Group if available
-
-            
-        if has_sb_multi and sb_multi_sheet:
-
-            
-            campaign_sheet_list.append(sb_multi_sheet)
-
-            
-        elif has_sb_standard and sb_standard_sheet:
-
-            
-            campaign_sheet_list.append(sb_standard_sheet)
-            
-        if sd_sheet:
-
-            
-            campaign_sheet_list.append(sd_sheet)
-        
-        # Apply additional processing to campaign sheets
-        for sheet_name in campaign_sheet_list:
-            st.session_state.debug_messages.append(f"Applying campaign processing to sheet: {sheet_name}") # Debug
-            try:
-                # We already loaded the sheet in the first pass, so get it from bulk_data
-                if sheet_name in bulk_data:
-                    df = bulk_data[sheet_name].copy()
-                else:
-                    st.session_state.debug_messages.append(f"Sheet {sheet_name} not found in bulk_data, skipping campaign processing")
-                    continue
-
-                # Ensure required numeric columns exist and handle potential errors
-                for col_pattern in numeric_cols_pattern:
-                    if col_pattern in df.columns:
-                        df[col_pattern] = pd.to_numeric(df[col_pattern], errors='coerce').fillna(0)
-                
-                # Convert column names to strings
-                df.columns = df.columns.astype(str)
-                
-                # Rename columns for consistency
-                column_renames = {}
-                # Do not rename 'Sales' to 'Total Sales' as these are different metrics
-                # 'Sales' in bulk file refers to ad-attributed sales
-                # 'Total Sales' should only come from the sales report
-                if 'Campaign' in df.columns and 'Campaign Name' not in df.columns:
-                    column_renames['Campaign'] = 'Campaign Name'
-                
-                if column_renames:
-                    df = df.rename(columns=column_renames)
-                
-                # Add campaign type efficiently
-                if 'Sponsored Product' in sheet_name:
-                    campaign_type = 'SP'
-                elif 'Sponsored Brand' in sheet_name or sheet_name.lower() == 'sb multi ad group campaigns':
-                    campaign_type = 'SB'
-                elif 'Sponsored Display' in sheet_name:
-                    campaign_type = 'SD'
-                else:
-                    campaign_type = 'Unknown'
-                
-                df['Campaign Type'] = campaign_type
-                
-                # Fix Auto targeting classification for all campaign types
-                # When Targeting Type = 'Auto', ensure Entity, Match Type, and Targeting Type are correctly set
-                if 'Targeting Type' in df.columns:
-                    auto_mask = df['Targeting Type'].fillna('').astype(str).str.strip().str.lower() == 'auto'
-                    if auto_mask.any():
-                        # Ensure Match Type='Auto' and preserve/normalize Targeting Type; do not alter Entity
-                        df.loc[auto_mask, 'Match Type'] = 'Auto'
-                        df.loc[auto_mask, 'Targeting Type'] = 'Auto'  # Explicitly preserve Targeting Type
-                        auto_count = auto_mask.sum()
-                        st.session_state.debug_messages.append(
-                            f"[Auto Targeting Fix] Corrected {auto_count} rows with Targeting Type='Auto' "
-                            f"in {sheet_name} (set Match Type='Auto', Targeting Type='Auto'; Entity unchanged)"
-                        )
-                
-                # Additionally, precisely map SP Auto targets for bulk files
-                # Criteria: Product='Sponsored Products' AND Entity='Product Targeting' AND
-                # Product Targeting Expression in {'loose-match','close-match','complements','compliments','substitutes'} (case-insensitive)
-                if campaign_type == 'SP':
-                    # Case-insensitive column lookup
-                    col_map = {c.lower(): c for c in df.columns}
-                    product_col = col_map.get('product')
-                    entity_col = col_map.get('entity')
-                    pte_col = col_map.get('product targeting expression')
-                    if product_col and entity_col and pte_col:
-                        prod_ser = df[product_col].fillna('').astype(str).str.strip().str.lower()
-                        entity_ser = df[entity_col].fillna('').astype(str).str.strip().str.lower()
-                        pte_ser = df[pte_col].fillna('').astype(str).str.strip().str.lower()
-                        auto_terms = {'loose-match', 'close-match', 'complements', 'compliments', 'substitutes'}
-                        mask = (
-                            (prod_ser == 'sponsored products') &
-                            (entity_ser == 'product targeting') &
-                            (pte_ser.isin(auto_terms))
-                        )
-                        if mask.any():
-                            df.loc[mask, 'Match Type'] = 'Auto'
-                            if 'Targeting Type' in df.columns:
-                                df.loc[mask, 'Targeting Type'] = 'Auto'
-                            st.session_state.debug_messages.append(
-                                f"[Auto Target Mapping] Set Match Type='Auto' for {int(mask.sum())} SP rows based on Product='Sponsored Products', Entity='Product Targeting' and PTE auto terms in {sheet_name}"
-                            )
-
-                # Store processed data
-                # For Multi Ad Group, store it under the standard Sponsored Brands key
-                if sheet_name.lower() == 'sb multi ad group campaigns':
-                    sheet_key = 'Sponsored Brands Campaigns'
-                    st.session_state.debug_messages.append(f"Storing 'SB Multi Ad Group Campaigns' data as 'Sponsored Brands Campaigns'")
-                    # Update the data in our dictionary
-                    bulk_data[sheet_key] = df
-                    # IMPORTANT: Remove the original Multi sheet to prevent double counting elsewhere
-                    # We will represent SB data under the normalized 'Sponsored Brands Campaigns' key only
-                    try:
-                        if sheet_name in bulk_data:
-                            del bulk_data[sheet_name]
-                            st.session_state.debug_messages.append(
-                                "Removed original 'SB Multi Ad Group Campaigns' sheet from bulk_data to prevent double counting"
-                            )
-                    except Exception:
-                        # Best-effort cleanup; proceed even if deletion fails
-                        pass
-                else:
-                    # Update the existing data in our dictionary using normalized keys
-
-                    # This ensures case-insensitive access to data
-
-                    if sp_sheet and sheet_name == sp_sheet:
-
-                        bulk_data['Sponsored Products Campaigns'] = df
-
-                    elif sb_standard_sheet and sheet_name == sb_standard_sheet:
-
-                        bulk_data['Sponsored Brands Campaigns'] = df  
-
-                    elif sd_sheet and sheet_name == sd_sheet:
-
-                        bulk_data['Sponsored Display Campaigns'] = df
-
-                    else:
-
-                        bulk_data[sheet_name] = df
-                
-                st.session_state.debug_messages.append(f"Applied campaign processing to {sheet_name}: {len(df)} rows")
-                
-            except Exception as e:
-                st.session_state.debug_messages.append(f"Error applying campaign processing to sheet '{sheet_name}': {str(e)}")
+        ingest_start = time.perf_counter()
+        # Only sheet names and dimensions are read here; sheet data is parsed on first access
+        bulk_data = BulkWorkbook.open(file_content, log=_bulk_debug_log, ingest_cache=bulk_ingest_cache)
+        if bulk_data.from_ingest_cache:
+            track_cache_hit("bulk_data_processing")
+        else:
+            track_cache_miss("bulk_data_processing")
         
         if not bulk_data:
             st.warning("No data could be processed from any sheets.")
             return None
         
-        # Detect and persist SKU-ASIN mappings for Seller Central clients
-        detect_and_persist_sku_asin_mappings(bulk_data)
-        
-        # Cache the processed data
-        db_manager.cache_bulk_data(client_name, file_content, bulk_data)
+        # Parse the campaign and search term sheets concurrently; other sheets stay lazy
+        bulk_data.prefetch(_configured_ingest_workers())
+        ingest_seconds = time.perf_counter() - ingest_start
+        cache_metrics.record('process_bulk_data', TIER_INGEST, bulk_data.from_ingest_cache, ingest_seconds)
+        if not bulk_data.from_ingest_cache:
+            cache_metrics.record('process_bulk_data', TIER_COMPUTE, False, ingest_seconds)
         
-        st.session_state.debug_messages.append(f"Successfully processed {len(bulk_data)} sheets from bulk file")
+        st.session_state.debug_messages.append(f"Successfully indexed {len(bulk_data)} sheets from bulk file")
         return bulk_data
         
     except Exception as e:
@@ -3132,7 +3273,7 @@ def process_companion_targeting_data(uploaded_file):
         st.session_state.debug_messages.append(f"[Companion Targeting] Error: {str(e)}")
         return None
 
-@st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
+@instrumented_cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
 def process_companion_data(asin_file, search_term_file, targeting_file=None):
     """
     Combines companion ASIN, Search Term, and Targeting data into a unified bulk data structure.
@@ -3236,6 +3377,9 @@ def process_companion_data(asin_file, search_term_file, targeting_file=None):
             st.warning("No data could be processed from companion files.")
             return None
         
+        # Type known columns once so downstream sections see the same dtypes as bulk uploads
+        combined_bulk_data = {name: apply_schema(df) for name, df in combined_bulk_data.items()}
+        
         # Cache the processed data
         db_manager.cache_bulk_data(client_name, combined_content, combined_bulk_data)
         
@@ -3250,7 +3394,8 @@ def process_companion_data(asin_file, search_term_file, targeting_file=None):
         st.session_state.debug_messages.append(f"[Companion Combined] Error: {str(e)}")
         return None
 
-@st.cache_data(ttl=3600, show_spinner="Classifying campaigns...")  # Cache for 1 hour
+@scoped_config('client_settings', 'classify_branded_campaigns', context=session_sd_attribution)
+@instrumented_cache_data(ttl=3600, show_spinner="Classifying campaigns...", hash_funcs={BulkWorkbook: BulkWorkbook.cache_token, ScopedConfig: ScopedConfig.cache_token})  # Cache for 1 hour
 def classify_branded_campaigns(bulk_data, client_settings):
     """Classify campaigns as branded or non-branded based on targeting.
     Uses the global sales attribution choice from session state.
@@ -3263,14 +3408,13 @@ def classify_branded_campaigns(bulk_data, client_settings):
         Dictionary with 'Branded' and 'Non-Branded' DataFrames for each campaign type
     """
     classified = {
-        'Sponsored Products': {'Branded': [], 'Non-Branded': []},
-        'Sponsored Brands': {'Branded': [], 'Non-Branded': []},
-        'Sponsored Display': {'Branded': [], 'Non-Branded': []}
+        'Sponsored Products': {'Branded': None, 'Non-Branded': None},
+        'Sponsored Brands': {'Branded': None, 'Non-Branded': None},
+        'Sponsored Display': {'Branded': None, 'Non-Branded': None}
     }
     
-    branded_terms = client_settings.get('Branded Terms', [])
-    branded_asins = client_settings.get('Branded ASINs', [])
-    st.session_state.debug_messages.append(f"Classifying with Branded Terms: {branded_terms}") # Log branded terms
+    classifier = term_classifier(client_settings, st.session_state.get('sd_attribution_choice', 'Sales'))
+    st.session_state.debug_messages.append(f"Classifying with Branded Terms: {list(classifier.matcher.terms)}") # Log branded terms
     
     campaign_sheets = [
         'Sponsored Products Campaigns',
@@ -3317,92 +3461,32 @@ def classify_branded_campaigns(bulk_data, client_settings):
             sales_col = 'Sales'
 
         # Filter for rows where Entity is 'Keyword' or 'Product Targeting'
-        targets_df = df[df['Entity'].isin(['Keyword', 'Product Targeting'])]
+        targets_df = df[df['Entity'].isin(['Keyword', 'Product Targeting'])].copy()
         st.session_state.debug_messages.append(f"Processing {len(targets_df)} targeting rows in {sheet_name}")
 
-        for index, row in targets_df.iterrows(): # Use index for better logging
-            is_branded = False # Default
-            classification_reason = "No matching criteria"
-            # Safely get spend, convert to numeric, handle errors by coercing to NaN, then fill NaN with 0
-            spend_val = row.get('Spend', 0)
-            row_spend = pd.to_numeric(spend_val, errors='coerce')
-            if pd.isna(row_spend):
-                row_spend = 0 # Replace NaN with 0
-
-            # Keyword targeting check
-            if pd.notna(row.get('Keyword Text')):
-                keyword = str(row['Keyword Text']).lower()
-                match_found = False
-                for brand_term in branded_terms:
-                    # Ensure brand_term is not None or empty before checking
-                    if brand_term and isinstance(brand_term, str) and brand_term.lower() in keyword:
-                        is_branded = True
-                        match_found = True
-                        classification_reason = f"Keyword '{keyword}' matched term '{brand_term}'"
-                        break # Stop checking terms once a match is found
-                if not match_found:
-                     classification_reason = f"Keyword '{keyword}' did not match any branded terms."
-                # Log keyword check result regardless of match
-                st.session_state.debug_messages.append(f"  Row Index: {index}, Type: Keyword, Target: '{keyword}', Spend: {row_spend:.2f}, IsBranded: {is_branded}, Reason: {classification_reason}")
-
-            # Product targeting check
-            elif pd.notna(row.get('Product Targeting Expression') or row.get('Targeting Expression')):
-                 target_expr_val = row.get('Product Targeting Expression') or row.get('Targeting Expression')
-                 target_expr = str(target_expr_val) # Ensure string conversion
-                 # Ensure asin is not None or empty before checking
-                 asin_match_found = any(asin and isinstance(asin, str) and asin in target_expr for asin in branded_asins)
-                 expanded_present = 'expanded' in target_expr.lower()
-                 exact_product_present = 'exact-product' in target_expr.lower()
-                  
-                 # Check if this is a Sponsored Display campaign
-                 is_sponsored_display = 'Sponsored Display' in sheet_name
-                  
-                 # Special case for Sponsored Display with exact-product targeting
-                 if is_sponsored_display and exact_product_present:
-                     is_branded = True
-                     classification_reason = f"Target '{target_expr}' contains 'exact-product' in Sponsored Display campaign (Branded)"
-                 elif asin_match_found and not expanded_present:
-                     is_branded = True
-                     classification_reason = f"Target '{target_expr}' matched a branded ASIN and not 'expanded'"
-                 elif asin_match_found and expanded_present:
-                      classification_reason = f"Target '{target_expr}' matched ASIN but contained 'expanded' (Non-Branded)"
-                      is_branded = False # Explicitly set to False
-                 elif not asin_match_found:
-                      classification_reason = f"Target '{target_expr}' did not match any branded ASINs."
-                      is_branded = False # Explicitly set to False
-                 else: # Should not happen based on logic, but good fallback
-                      classification_reason = f"Target '{target_expr}' - unusual case"
-                      is_branded = False # Default to Non-Branded
-                 # Log product target check result
-                 st.session_state.debug_messages.append(f"  Row Index: {index}, Type: Product Target, Target: '{target_expr}', Spend: {row_spend:.2f}, IsBranded: {is_branded}, Reason: {classification_reason}")
+        is_branded, reason = classify_targets(
+            targets_df, classifier, sponsored_display='Sponsored Display' in sheet_name
+        )
+        targets_df['Spend'] = pd.to_numeric(targets_df['Spend'], errors='coerce').fillna(0)
+        targets_df['Is_Branded'] = is_branded
+        targets_df['Branded_Reason'] = reason
+        reason_counts = {code: int(n) for code, n in reason.value_counts().items() if n}
+        st.session_state.debug_messages.append(f"  {sheet_name}: {int(is_branded.sum())} branded / {int((~is_branded).sum())} non-branded targets, reasons: {reason_counts}")
 
-            else:
-                # Row has a Bid but neither Keyword nor Product Target? Log this edge case.
-                classification_reason = "Row has Bid but no Keyword/Product Target text"
-                st.session_state.debug_messages.append(f"  Row Index: {index}, Type: Unknown/No Target, Spend: {row_spend:.2f}, IsBranded: {is_branded}, Reason: {classification_reason}")
-                is_branded = False # Default to Non-Branded if unclear
-
-            campaign_type = sheet_name.replace(' Campaigns', '')
-            key = 'Branded' if is_branded else 'Non-Branded'
-            # Make sure the row being appended has the numeric spend
-            row_copy = row.copy()
-            row_copy['Spend'] = row_spend
-            classified[campaign_type][key].append(row_copy)
-    
-    # Convert lists to DataFrames
+        campaign_type = sheet_name.replace(' Campaigns', '')
+        classified[campaign_type]['Branded'] = targets_df[is_branded]
+        classified[campaign_type]['Non-Branded'] = targets_df[~is_branded]
+    
+    # Summarise each Branded / Non-Branded frame
     for campaign_type in classified:
         for brand_type in classified[campaign_type]: # 'Branded' or 'Non-Branded'
-            rows = classified[campaign_type][brand_type]
-            # Check if we have any data to convert
-            if not rows:
+            df = classified[campaign_type][brand_type]
+            # Check if we have any data
+            if not isinstance(df, pd.DataFrame) or df.empty:
                 st.session_state.debug_messages.append(f"  No data for {brand_type} in {campaign_type}. Creating empty DataFrame.")
                 classified[campaign_type][brand_type] = pd.DataFrame()
                 continue
             
-            # Convert list of rows to DataFrame
-            df = pd.DataFrame(rows)
-            classified[campaign_type][brand_type] = df
-            
             st.session_state.debug_messages.append(f"  Processing {brand_type} ({len(df)} rows) for {campaign_type}")
 
             # Aggregate Spend
@@ -3444,7 +3528,7 @@ def classify_branded_campaigns(bulk_data, client_settings):
 
     return classified
 
-@st.cache_data(ttl=3600, show_spinner="Calculating KPIs...")  # Cache for 1 hour
+@instrumented_cache_data(ttl=3600, show_spinner="Calculating KPIs...")  # Cache for 1 hour
 def calculate_branded_kpis(classified_campaigns):
     """Calculate KPIs for branded vs non-branded campaigns.
     
@@ -3536,7 +3620,17 @@ def calculate_branded_kpis(classified_campaigns):
     
     return kpis
 
-@st.cache_data(ttl=3600, show_spinner="Analyzing targeting performance...", hash_funcs={"_thread.RLock": lambda _: None})  # Cache for 1 hour
+# Logic version of each analysis cached in the SQLite store. Bump an entry whenever
+# the code that computes that analysis changes its output: results cached under
+# any other version are never served and are dropped the next time it is cached.
+ANALYSIS_LOGIC_VERSIONS = {
+    'targeting_performance': 1,
+    'search_term_data': 1,
+    'campaign_performance_data': 1,
+}
+
+@scoped_config('client_config', 'targeting_performance', context=session_sd_attribution)
+@instrumented_cache_data(ttl=3600, show_spinner="Analyzing targeting performance...", hash_funcs={"_thread.RLock": lambda _: None, BulkWorkbook: BulkWorkbook.cache_token, ScopedConfig: ScopedConfig.cache_token})  # Cache for 1 hour
 def get_targeting_performance_data(bulk_data, client_config):
     # Include the Sales Attribution choice in the cache key
     import re  # Import re module at the top of the function
@@ -3555,12 +3649,17 @@ def get_targeting_performance_data(bulk_data, client_config):
     # Check for cached analysis result
     client_name = client_config.get('client_name', 'unknown')
     analysis_input = {
-        'bulk_data_hash': hash(str(bulk_data)),
-        'client_config_hash': hash(str(client_config)),
+        'bulk_data_hash': bulk_fingerprint(bulk_data),
+        'client_config_hash': scoped_config_fingerprint(client_config, 'targeting_performance'),
         'sd_attribution': sd_attribution
     }
     
-    cached_result = db_manager.get_cached_analysis_result(client_name, 'targeting_performance', analysis_input)
+    # Reuse the background precompute if it is computing this analysis right now
+    wait_for_precompute('targeting_performance')
+    cached_result = db_manager.get_cached_analysis_result(
+        client_name, 'targeting_performance', analysis_input,
+        logic_version=ANALYSIS_LOGIC_VERSIONS['targeting_performance']
+    )
     if cached_result:
         track_cache_hit("targeting_performance_analysis")
         st.session_state.debug_messages.append("Retrieved cached targeting performance analysis")
@@ -3569,12 +3668,10 @@ def get_targeting_performance_data(bulk_data, client_config):
         track_cache_miss("targeting_performance_analysis")
 
     # --- Configuration Extraction ---
-    # Safely extract branded terms (lowercase)
-    branded_terms = [str(term).strip().lower() for term in client_config.get('branded_keywords', []) if str(term).strip()] if client_config.get('branded_keywords') else []
-
-    # Safely extract branded ASINs (uppercase) from the correct source: branded_asins_data
-    branded_asins_data = client_config.get('branded_asins_data', {})
-    branded_asins = {str(asin).strip().upper() for asin in branded_asins_data.keys() if str(asin).strip()} # Use a set for faster lookups
+    # Branded terms (lowercase) and ASINs (uppercase); each distinct target is classified once per client config
+    classifier = term_classifier(client_config, sd_attribution)
+    branded_terms = classifier.matcher.terms
+    branded_asins = classifier.matcher.asin_set
     
     # Extract campaign product groups for filtering
     campaign_product_groups = {}
@@ -3654,9 +3751,6 @@ def get_targeting_performance_data(bulk_data, client_config):
             "[Targeting Perf] No sheets with targeting rows detected; relying on Search Term data only."
         )
 
-    # Precompile ASIN regex for efficiency
-    asin_regex = re.compile(r'(B[0-9A-Z]{9})')
-
     for sheet_name in targeting_sheets:
         if sheet_name not in bulk_data or bulk_data[sheet_name].empty:
             st.session_state.debug_messages.append(f"Skipping sheet: {sheet_name} (Not found or empty)")
@@ -3667,13 +3761,8 @@ def get_targeting_performance_data(bulk_data, client_config):
         sb_sheet = ('brand' in sheet_name.lower()) or ('sb' in sheet_name.lower())
         st.session_state.debug_messages.append(f"Processing sheet: {sheet_name} with {len(df)} rows")
 
-        # Dynamically find column names (case-insensitive)
-        def find_col(potential_names):
-            for name in potential_names:
-                col = next((c for c in df.columns if c.strip().lower() == name.lower()), None)
-                if col:
-                    return col
-            return None
+        # Dynamically find column names (case-insensitive, indexed once per frame)
+        find_col = column_resolver(df).get
 
         entity_col = find_col(['Entity'])
         # Column mapping depends on whether we're using Campaign sheets or Search Term Reports
@@ -3947,16 +4036,17 @@ def get_targeting_performance_data(bulk_data, client_config):
 
             # --- Classification Logic ---
             target_lower = target_str.lower() # For keyword matching
+            term_info = classifier.classify(target_str)
             is_branded = False # Reset for each target
                             
             if entity_type == 'keyword':
                 # Exact match check first for branded terms
-                if target_lower in branded_terms:
+                if term_info.exact_term:
                     is_branded = True
                     classification_reason = f"Keyword '{target_str}' exactly matched a branded term."
                 else:
                     # Check if any branded term is a substring (e.g., "brand shoe" contains "brand")
-                    if any(term in target_lower for term in branded_terms):
+                    if term_info.term is not None:
                          is_branded = True
                          classification_reason = f"Keyword '{target_str}' contained a branded term."
                     else:
@@ -3998,7 +4088,7 @@ def get_targeting_performance_data(bulk_data, client_config):
                         classification_reason = f"Target '{target_str}' has Targeting Type 'Auto' for SP. Classified as 'Auto' target."
                 # Continue with normal product targeting logic if not exact-product
                 else:
-                    found_asins = set(asin_regex.findall(target_str.upper())) # Use set for uniqueness
+                    found_asins = set(term_info.asins) # Use set for uniqueness
 
                     if found_asins:
                         # Check if ALL found ASINs are in the defined branded ASIN list
@@ -4022,7 +4112,7 @@ def get_targeting_performance_data(bulk_data, client_config):
                     else:
                         # If the target string doesn't contain any recognizable ASINs
                         # Check if it contains any branded *terms* as a fallback (e.g., targeting categories)
-                        if any(term in target_lower for term in branded_terms):
+                        if term_info.term is not None:
                             is_branded = True
                             classification_reason = f"Product Target '{target_str}' (no ASINs found) contained a branded term."
                         else:
@@ -4041,10 +4131,8 @@ def get_targeting_performance_data(bulk_data, client_config):
                 
                 # Rule 2: Check ASIN targets against Branded ASINs for both Targeting and Search Term Performance
                 # This applies to both Target column (Targeting Performance) and Search Term column (Search Term Performance)
-                asin_pattern_companion = re.compile(r'(B[0-9A-Z]{9})', re.IGNORECASE)
-                
                 # Check Target column for ASINs
-                target_asins = set(asin_pattern_companion.findall(target_str.upper()))
+                target_asins = set(classifier.classify(target_str).asins)
                 if target_asins:
                     # Check if any of the ASINs found are branded
                     branded_asins_found = target_asins.intersection(branded_asins)
@@ -4056,7 +4144,7 @@ def get_targeting_performance_data(bulk_data, client_config):
             # --- Universal ASIN Classification Safety Check ---
             # Final check to ensure any target containing ONLY branded ASINs is classified as Branded
             if not is_branded:  # Only apply if not already branded
-                all_asins_in_target = set(asin_regex.findall(target_str.upper()))
+                all_asins_in_target = set(classifier.classify(target_str).asins)
                 if all_asins_in_target and all_asins_in_target.issubset(branded_asins) and 'expanded' not in target_str.lower():
                     is_branded = True
                     classification_reason = f'Safety Check: Target {target_str} contains ONLY branded ASIN(s): {all_asins_in_target}'
@@ -4303,11 +4391,15 @@ def get_targeting_performance_data(bulk_data, client_config):
 
     # Cache the analysis result
     result = (branded_targets_df, non_branded_targets_df)
-    db_manager.cache_analysis_result(client_name, 'targeting_performance', analysis_input, result)
+    db_manager.cache_analysis_result(
+        client_name, 'targeting_performance', analysis_input, result,
+        logic_version=ANALYSIS_LOGIC_VERSIONS['targeting_performance']
+    )
 
     return branded_targets_df, non_branded_targets_df
 
-@st.cache_data(ttl=3600, show_spinner="Processing data...", hash_funcs={"_thread.RLock": lambda _: None})  # Cache for 1 hour
+@scoped_config('client_config', 'search_term_data', context=session_sd_attribution)
+@instrumented_cache_data(ttl=3600, show_spinner="Processing data...", hash_funcs={"_thread.RLock": lambda _: None, BulkWorkbook: BulkWorkbook.cache_token, ScopedConfig: ScopedConfig.cache_token})  # Cache for 1 hour
 def get_search_term_data(bulk_data, client_config=None):
     # Include the Sales Attribution choice in the cache key
     sd_attribution = st.session_state.get('sd_attribution_choice', 'Sales')
@@ -4316,19 +4408,24 @@ def get_search_term_data(bulk_data, client_config=None):
     # Extracts and processes search term data from bulk advertising files.
     # Handles both Sponsored Products and Sponsored Brands search terms.
     # Classifies search terms as Branded or Non-Branded based on client configuration.
-    if not bulk_data or not isinstance(bulk_data, dict):
+    if not bulk_data or not isinstance(bulk_data, Mapping):
         return pd.DataFrame()
 
     # Check for cached analysis result
     if client_config:
         client_name = client_config.get('client_name', 'unknown')
         analysis_input = {
-            'bulk_data_hash': hash(str(bulk_data)),
-            'client_config_hash': hash(str(client_config)),
+            'bulk_data_hash': bulk_fingerprint(bulk_data),
+            'client_config_hash': scoped_config_fingerprint(client_config, 'search_term_data'),
             'sd_attribution': sd_attribution
         }
         
-        cached_result = db_manager.get_cached_analysis_result(client_name, 'search_term_data', analysis_input)
+        # Reuse the background precompute if it is computing this analysis right now
+        wait_for_precompute('search_term_data')
+        cached_result = db_manager.get_cached_analysis_result(
+            client_name, 'search_term_data', analysis_input,
+            logic_version=ANALYSIS_LOGIC_VERSIONS['search_term_data']
+        )
         if cached_result is not None:
             st.session_state.debug_messages.append("Retrieved cached search term data analysis")
             return cached_result
@@ -4459,20 +4556,15 @@ def get_search_term_data(bulk_data, client_config=None):
             st.session_state.debug_messages.append(f"[Search Term Performance] Populated Target column from Keyword Text")
         
         # Helper function to safely convert values to float
-        def safe_convert_to_float(val):
-            if pd.isna(val):
-                return 0.0
-            try:
-                # Remove any non-numeric characters except decimal point
-                return float(str(val).replace('$', '').replace(',', '').replace('%', ''))
-            except:
-                return 0.0
+        def to_float_series(values):
+            # Metrics are typed at ingest; this only cleans text left in untyped columns
+            return to_numeric_clean(values).fillna(0).astype(float)
                 
         # Calculate metrics if possible
         if 'Clicks' in search_df.columns and 'Spend' in search_df.columns and search_df['Clicks'].sum() > 0:
             # Apply safe conversion to ensure numeric values
-            spend_values = search_df['Spend'].apply(safe_convert_to_float)
-            clicks_values = search_df['Clicks'].apply(safe_convert_to_float)
+            spend_values = to_float_series(search_df['Spend'])
+            clicks_values = to_float_series(search_df['Clicks'])
             search_df['CPC'] = spend_values / clicks_values.replace(0, float('nan'))
             # Replace NaN with 0
             search_df['CPC'] = search_df['CPC'].fillna(0)
@@ -4492,8 +4584,8 @@ def get_search_term_data(bulk_data, client_config=None):
             search_df['Ad Sales'] = search_df[sales_col]
             
             # Apply safe conversion to numeric values
-            spend_values = search_df['Spend'].apply(safe_convert_to_float)
-            sales_values = search_df['Ad Sales'].apply(safe_convert_to_float)
+            spend_values = to_float_series(search_df['Spend'])
+            sales_values = to_float_series(search_df['Ad Sales'])
             
             # Calculate ACoS
             search_df['ACoS'] = (spend_values / sales_values.replace(0, float('nan')) * 100).fillna(0)
@@ -4501,41 +4593,41 @@ def get_search_term_data(bulk_data, client_config=None):
             search_df['ACoS'] = search_df['ACoS'].apply(lambda x: round(float(x), 2) if pd.notnull(x) else 0)
             
             # Calculate CVR (Conversion Rate)
-            orders_values = search_df['Orders'].apply(safe_convert_to_float)
-            clicks_values = search_df['Clicks'].apply(safe_convert_to_float)
+            orders_values = to_float_series(search_df['Orders'])
+            clicks_values = to_float_series(search_df['Clicks'])
             search_df['CVR'] = (orders_values / clicks_values.replace(0, float('nan')) * 100).fillna(0)
             # Format CVR as percentage with 2 decimal places
-            search_df['CVR'] = search_df['CVR'].apply(lambda x: round(float(x), 2) if pd.notnull(x) else 0)
+            search_df['CVR'] = search_df['CVR'].fillna(0).round(2)
             
             # Calculate CTR (Click-Through Rate)
-            clicks_values = search_df['Clicks'].apply(safe_convert_to_float)
-            impressions_values = search_df['Impressions'].apply(safe_convert_to_float)
+            clicks_values = to_float_series(search_df['Clicks'])
+            impressions_values = to_float_series(search_df['Impressions'])
             search_df['CTR'] = (clicks_values / impressions_values.replace(0, float('nan')) * 100).fillna(0)
             # Format CTR as percentage with 2 decimal places
-            search_df['CTR'] = search_df['CTR'].apply(lambda x: round(float(x), 2) if pd.notnull(x) else 0)
+            search_df['CTR'] = search_df['CTR'].fillna(0).round(2)
             
             # Calculate ROAS
-            sales_values = search_df['Ad Sales'].apply(safe_convert_to_float)
-            spend_values = search_df['Spend'].apply(safe_convert_to_float)
+            sales_values = to_float_series(search_df['Ad Sales'])
+            spend_values = to_float_series(search_df['Spend'])
             search_df['ROAS'] = (sales_values / spend_values.replace(0, float('nan'))).fillna(0)
             # Format ROAS with 2 decimal places
-            search_df['ROAS'] = search_df['ROAS'].apply(lambda x: round(float(x), 2) if pd.notnull(x) else 0)
+            search_df['ROAS'] = search_df['ROAS'].fillna(0).round(2)
             
             # Calculate AOV (Average Order Value)
-            sales_values = search_df['Ad Sales'].apply(safe_convert_to_float)
-            orders_values = search_df['Orders'].apply(safe_convert_to_float)
+            sales_values = to_float_series(search_df['Ad Sales'])
+            orders_values = to_float_series(search_df['Orders'])
             search_df['AOV'] = (sales_values / orders_values.replace(0, float('nan'))).fillna(0)
             # Format AOV with 2 decimal places
-            search_df['AOV'] = search_df['AOV'].apply(lambda x: round(float(x), 2) if pd.notnull(x) else 0)
+            search_df['AOV'] = search_df['AOV'].fillna(0).round(2)
             
             # Format CPC with 2 decimal places
             if 'CPC' in search_df.columns:
-                search_df['CPC'] = search_df['CPC'].apply(lambda x: round(float(x), 2) if pd.notnull(x) else 0)
+                search_df['CPC'] = search_df['CPC'].fillna(0).round(2)
                 
             # Ensure all numeric columns are properly formatted
             for col in ['Spend', 'Ad Sales', 'Orders', 'Impressions', 'Clicks']:
                 if col in search_df.columns:
-                    search_df[col] = search_df[col].apply(safe_convert_to_float)
+                    search_df[col] = to_float_series(search_df[col])
             
             # Add product group information to search terms
             # Only populate if there are actually product groups defined in Campaign Tagging
@@ -4608,13 +4700,13 @@ def get_search_term_data(bulk_data, client_config=None):
             continue
             
         # Filter for relevant entities (targeting)
-        entity_col = next((c for c in df.columns if c.lower() == 'entity'), None)
+        entity_col = resolve_column(df, 'entity')
         if entity_col:
             valid_entities = ['product targeting', 'product target', 'contextual targeting', 'audience targeting']
             entity_mask = df[entity_col].fillna('').astype(str).str.strip().str.lower().apply(
                 lambda x: any(entity in x for entity in valid_entities)
             )
-            state_col = next((c for c in df.columns if c.lower() == 'state'), None)
+            state_col = resolve_column(df, 'state')
             df_filtered = df
             if state_col:
                 df_filtered = df[entity_mask]
@@ -4664,7 +4756,7 @@ def get_search_term_data(bulk_data, client_config=None):
             sd_entry['Campaign Type'] = 'Sponsored Display'
             
             # Extract match type if available
-            match_type_col = next((c for c in df.columns if c.lower() == 'match type'), None)
+            match_type_col = resolve_column(df, 'match type')
             if match_type_col and pd.notna(row.get(match_type_col)):
                 sd_entry['Match Type'] = row.get(match_type_col)
             else:
@@ -4679,7 +4771,7 @@ def get_search_term_data(bulk_data, client_config=None):
                     sd_entry['Match Type'] = 'Product Target'
             
             # Determine Target Type based on the specified logic
-            targeting_type_col = next((c for c in df.columns if c.lower() == 'targeting type'), None)
+            targeting_type_col = resolve_column(df, 'targeting type')
             if targeting_type_col and pd.notna(row.get(targeting_type_col)) and str(row.get(targeting_type_col)).strip().lower() == 'auto':
                 sd_entry['Target Type'] = 'Auto'
             elif 'retargeting' in str(sd_entry.get('Match Type', '')).lower():
@@ -4693,7 +4785,7 @@ def get_search_term_data(bulk_data, client_config=None):
             
             # Extract performance metrics
             for metric in ['Impressions', 'Clicks', 'Spend', 'Orders']:
-                metric_col = next((c for c in df.columns if c.lower() == metric.lower()), None)
+                metric_col = resolve_column(df, metric)
                 if metric_col and pd.notna(row.get(metric_col)):
                     try:
                         sd_entry[metric] = float(str(row.get(metric_col)).replace('$', '').replace(',', ''))
@@ -4710,7 +4802,7 @@ def get_search_term_data(bulk_data, client_config=None):
                 sales_patterns = ['Sales', 'Total Sales', 'Sales (Views & Clicks)', 'Total Sales (Views & Clicks)']
                 
             for pattern in sales_patterns:
-                col = next((c for c in df.columns if c.lower() == pattern.lower()), None)
+                col = resolve_column(df, pattern)
                 if col and pd.notna(row.get(col)):
                     sales_col = col
                     break
@@ -4809,83 +4901,30 @@ def get_search_term_data(bulk_data, client_config=None):
         combined_df['Is_Branded'] = False  # Default to Non-Branded
         
         # Get branded terms and ASINs from client config if available
-        branded_terms = []
-        branded_asins = set()
-        
+        classifier = term_classifier(client_config, st.session_state.get('sd_attribution_choice', 'Sales'))
+        branded_asins = classifier.matcher.asin_set
         if client_config is not None:
-            # Extract branded terms (case-insensitive) - check both key formats
-            if 'Branded Terms' in client_config:
-                if isinstance(client_config['Branded Terms'], list):
-                    branded_terms = [str(term).strip().lower() for term in client_config['Branded Terms'] if str(term).strip()]
-                elif isinstance(client_config['Branded Terms'], str):
-                    branded_terms = [str(term).strip().lower() for term in client_config['Branded Terms'].split(',') if str(term).strip()]
-            # Fallback to legacy key name if the new format isn't found
-            elif 'branded_keywords' in client_config:
-                branded_terms = [str(term).strip().lower() for term in client_config.get('branded_keywords', []) 
-                                if str(term).strip()]
-            
-            # Extract branded ASINs (uppercase for consistency) - use correct data source
-            branded_asins = set()
-            
-            # Primary source: branded_asins_data (current format)
-            if 'branded_asins_data' in client_config:
-                branded_asins_data = client_config.get('branded_asins_data', {})
-                branded_asins = {str(asin).strip().upper() for asin in branded_asins_data.keys() if str(asin).strip()}
-            # Fallback to old format for backward compatibility
-            elif 'Branded ASINs' in client_config:
-                if isinstance(client_config['Branded ASINs'], list):
-                    branded_asins = {str(asin).strip().upper() for asin in client_config['Branded ASINs'] if str(asin).strip()}
-                elif isinstance(client_config['Branded ASINs'], str):
-                    branded_asins = {str(asin).strip().upper() for asin in client_config['Branded ASINs'].split(',') if str(asin).strip()}
-            
-            st.session_state.debug_messages.append(f"[Search Term Classification] Found {len(branded_terms)} branded terms and {len(branded_asins)} branded ASINs")
-        
-        # Compile regex for finding ASINs (starting with B0 and 10 characters long)
-        asin_pattern = re.compile(r'(B[0-9A-Z]{9})', re.IGNORECASE)
-        
-        # Classify each search term (enhanced to check both search term and target)
-        for idx, row in combined_df.iterrows():
-            search_term = str(row['Search Term']).strip() if pd.notna(row['Search Term']) else ''
-            target = str(row.get('Target', '')).strip() if pd.notna(row.get('Target')) else ''
-            
-            # Skip empty search terms
-            if not search_term:
-                continue
-                
-            is_branded = False
-            
-            # Check if the search term contains an ASIN
-            asin_matches = asin_pattern.findall(search_term.upper())
-            
-            if asin_matches:
-                # Check if any of the ASINs found are branded
-                for asin in asin_matches:
-                    if asin.upper() in branded_asins:
-                        is_branded = True
-                        st.session_state.debug_messages.append(f"[Search Term Classification] Term '{search_term}' classified as Branded (contains branded ASIN {asin})")
-                        break
-            
-            # Also check if the target contains branded ASINs
-            if not is_branded and target:
-                target_asin_matches = asin_pattern.findall(target.upper())
-                for asin in target_asin_matches:
-                    if asin.upper() in branded_asins:
-                        is_branded = True
-                        st.session_state.debug_messages.append(f"[Search Term Classification] Term '{search_term}' classified as Branded (target '{target}' contains branded ASIN {asin})")
-                        break
-            
-            # Check if the search term contains any branded terms
-            if not is_branded:
-                search_term_lower = search_term.lower()
-                for term in branded_terms:
-                    if term.lower() in search_term_lower:
-                        is_branded = True
-                        st.session_state.debug_messages.append(f"[Search Term Classification] Term '{search_term}' classified as Branded (contains branded term '{term}')")
-                        break
-            
-            # Set the classification
-            if is_branded:
-                combined_df.at[idx, 'Is_Branded'] = True
+            st.session_state.debug_messages.append(f"[Search Term Classification] Found {len(classifier.matcher.terms)} branded terms and {len(branded_asins)} branded ASINs")
+        
+        # Classify every search term at once (checks both the search term and its target)
+        def _stripped_text(col):
+            if col not in combined_df.columns:
+                return pd.Series('', index=combined_df.index)
+            values = combined_df[col].astype(object)
+            return values.where(values.notna(), '').astype(str).str.strip()
+        
+        search_terms = _stripped_text('Search Term')
+        targets = _stripped_text('Target')
+        has_search_term = search_terms.ne('')  # Empty search terms stay Non-Branded
+        asin_in_search_term = has_search_term & classifier.mask(search_terms, 'branded_asins')
+        asin_in_target = has_search_term & ~asin_in_search_term & targets.ne('') & classifier.mask(targets, 'branded_asins')
+        term_in_search_term = has_search_term & ~asin_in_search_term & ~asin_in_target & classifier.mask(search_terms, 'term')
+        combined_df['Is_Branded'] = asin_in_search_term | asin_in_target | term_in_search_term
+        st.session_state.debug_messages.append(
+            f"[Search Term Classification] Branded by ASIN in search term: {int(asin_in_search_term.sum())}, "
+            f"by ASIN in target: {int(asin_in_target.sum())}, by branded term: {int(term_in_search_term.sum())}"
+        )
+        st.session_state.debug_messages.append(f"[Search Term Classification] Term cache: {classifier.stats()}")
         
         # --- COMPANION EXPORTS SPECIAL LOGIC FOR SEARCH TERMS ---
         # For Companion Exports, apply additional classification rules
@@ -4910,8 +4949,7 @@ def get_search_term_data(bulk_data, client_config=None):
                 
                 # Rule 2: Check Search Term for ASINs against Branded ASINs
                 if not combined_df.at[idx, 'Is_Branded']:  # Only check if not already branded
-                    asin_pattern_companion = re.compile(r'(B[0-9A-Z]{9})', re.IGNORECASE)
-                    search_term_asins = set(asin_pattern_companion.findall(search_term.upper()))
+                    search_term_asins = set(classifier.classify(search_term).asins)
                     
                     if search_term_asins:
                         # Check if any of the ASINs found are branded
@@ -4929,6 +4967,9 @@ def get_search_term_data(bulk_data, client_config=None):
         non_branded_count = len(combined_df) - branded_count
         st.session_state.debug_messages.append(f"[Search Term Classification] Results: {branded_count} Branded terms, {non_branded_count} Non-Branded terms")
         
+        # Match Type is rewritten row by row below; a categorical column only accepts known values
+        combined_df = release_categoricals(combined_df)
+        
         # Update Target Type for Sponsored Display remarketing campaigns based on Is_Branded classification
         sd_remarketing_updates = 0
         if 'Campaign Type' in combined_df.columns and 'Target Type' in combined_df.columns:
@@ -5166,11 +5207,14 @@ def get_search_term_data(bulk_data, client_config=None):
             
     # Cache the analysis result
     if client_config:
-        db_manager.cache_analysis_result(client_name, 'search_term_data', analysis_input, combined_df)
+        db_manager.cache_analysis_result(
+            client_name, 'search_term_data', analysis_input, combined_df,
+            logic_version=ANALYSIS_LOGIC_VERSIONS['search_term_data']
+        )
     
     return combined_df
         
-@st.cache_data(ttl=3600, show_spinner="Generating word cloud...")  # Cache for 1 hour
+@instrumented_cache_data(ttl=3600, show_spinner="Generating word cloud...")  # Cache for 1 hour
 def generate_search_term_wordcloud(search_terms_df, filter_type='all', remove_asins=False):
     """
     Generates a word cloud visualization from search term data.
@@ -5282,7 +5326,8 @@ def generate_search_term_wordcloud(search_terms_df, filter_type='all', remove_as
     
     return fig
 
-@st.cache_data(ttl=3600, show_spinner="Processing campaign performance data...", hash_funcs={"_thread.RLock": lambda _: None})
+@scoped_config('client_config', 'campaign_performance_data', context=session_sd_attribution)
+@instrumented_cache_data(ttl=3600, show_spinner="Processing campaign performance data...", hash_funcs={"_thread.RLock": lambda _: None, BulkWorkbook: BulkWorkbook.cache_token, ScopedConfig: ScopedConfig.cache_token})
 def get_campaign_performance_data(bulk_data, client_config=None):
     """
     Extracts and processes campaign-level performance data from bulk advertising files.
@@ -5295,18 +5340,23 @@ def get_campaign_performance_data(bulk_data, client_config=None):
     Returns:
         DataFrame with campaign performance metrics
     """
-    if not bulk_data or not isinstance(bulk_data, dict):
+    if not bulk_data or not isinstance(bulk_data, Mapping):
         return pd.DataFrame()
 
     # Check for cached analysis result
     if client_config:
         client_name = client_config.get('client_name', 'unknown')
         analysis_input = {
-            'bulk_data_hash': hash(str(bulk_data)),
-            'client_config_hash': hash(str(client_config))
+            'bulk_data_hash': bulk_fingerprint(bulk_data),
+            'client_config_hash': scoped_config_fingerprint(client_config, 'campaign_performance_data')
         }
         
-        cached_result = db_manager.get_cached_analysis_result(client_name, 'campaign_performance_data', analysis_input)
+        # Reuse the background precompute if it is computing this analysis right now
+        wait_for_precompute('campaign_performance_data')
+        cached_result = db_manager.get_cached_analysis_result(
+            client_name, 'campaign_performance_data', analysis_input,
+            logic_version=ANALYSIS_LOGIC_VERSIONS['campaign_performance_data']
+        )
         if cached_result is not None:
             st.session_state.debug_messages.append("Retrieved cached campaign performance data analysis")
             return cached_result
@@ -5319,20 +5369,13 @@ def get_campaign_performance_data(bulk_data, client_config=None):
     def safe_convert_to_float(val):
         if pd.isna(val):
             return 0.0
+        if isinstance(val, (int, float, np.number)):
+            return float(val)
         try:
             return float(str(val).replace('$', '').replace(',', '').replace('%', ''))
         except:
             return 0.0
     
-    # Helper function to find column case-insensitively
-    def find_column(df, column_names):
-        df_columns_lower = [col.lower() for col in df.columns]
-        for name in column_names:
-            for i, col_lower in enumerate(df_columns_lower):
-                if col_lower == name.lower():
-                    return df.columns[i]
-        return None
-    
     # Process each sheet in bulk data
     for sheet_name, df in bulk_data.items():
         if not isinstance(df, pd.DataFrame) or df.empty:
@@ -5366,7 +5409,7 @@ def get_campaign_performance_data(bulk_data, client_config=None):
             st.session_state.debug_messages.append(f"Sheet {sheet_name}: Using companion data - {len(campaign_rows)} rows (no Entity filtering needed)")
         else:
             # Traditional bulk data processing with Entity filtering
-            entity_col = find_column(df, ['Entity'])
+            entity_col = resolve_column(df, ['Entity'])
             if not entity_col:
                 st.session_state.debug_messages.append(f"Skipping sheet {sheet_name} - no Entity column found")
                 continue
@@ -5382,12 +5425,12 @@ def get_campaign_performance_data(bulk_data, client_config=None):
             st.session_state.debug_messages.append(f"Sheet {sheet_name}: Found {len(campaign_rows)} Campaign entity rows out of {len(df)} total rows")
         
         # Find required columns - now using campaign_rows instead of df
-        campaign_col = find_column(campaign_rows, ['Campaign Name (Informational Only)', 'Campaign Name', 'Campaign'])
-        product_col = find_column(campaign_rows, ['Product'])
-        spend_col = find_column(campaign_rows, ['Spend'])
-        clicks_col = find_column(campaign_rows, ['Clicks'])
-        orders_col = find_column(campaign_rows, ['Orders'])
-        campaign_state_col = find_column(campaign_rows, ['Campaign State (Informational Only)', 'Campaign State'])
+        campaign_col = resolve_column(campaign_rows, ['Campaign Name (Informational Only)', 'Campaign Name', 'Campaign'])
+        product_col = resolve_column(campaign_rows, ['Product'])
+        spend_col = resolve_column(campaign_rows, ['Spend'])
+        clicks_col = resolve_column(campaign_rows, ['Clicks'])
+        orders_col = resolve_column(campaign_rows, ['Orders'])
+        campaign_state_col = resolve_column(campaign_rows, ['Campaign State (Informational Only)', 'Campaign State'])
         
         # Determine sales column based on attribution choice and product type
         sales_col = None
@@ -5397,7 +5440,7 @@ def get_campaign_performance_data(bulk_data, client_config=None):
             
             if is_companion:
                 # For companion data, check the 'kind' column
-                kind_col = find_column(campaign_rows, ['kind', 'Campaign Type Raw'])
+                kind_col = resolve_column(campaign_rows, ['kind', 'Campaign Type Raw'])
                 if kind_col and not campaign_rows[kind_col].empty:
                     kind_values = campaign_rows[kind_col].dropna().unique()
                     for kind in kind_values:
@@ -5414,11 +5457,11 @@ def get_campaign_performance_data(bulk_data, client_config=None):
                             break
             
             if is_sponsored_display:
-                sales_col = find_column(campaign_rows, ['Sales (Views & Clicks)', 'Sales'])
+                sales_col = resolve_column(campaign_rows, ['Sales (Views & Clicks)', 'Sales'])
             else:
-                sales_col = find_column(campaign_rows, ['Sales'])
+                sales_col = resolve_column(campaign_rows, ['Sales'])
         else:
-            sales_col = find_column(campaign_rows, ['Sales'])
+            sales_col = resolve_column(campaign_rows, ['Sales'])
         
         if not campaign_col or not sales_col or not spend_col:
             st.session_state.debug_messages.append(f"Skipping sheet {sheet_name} - missing required columns (Campaign: {campaign_col}, Sales: {sales_col}, Spend: {spend_col})")
@@ -5429,7 +5472,7 @@ def get_campaign_performance_data(bulk_data, client_config=None):
         
         if is_companion:
             # For companion data, use the 'kind' column
-            kind_col = find_column(campaign_rows, ['kind', 'Campaign Type Raw'])
+            kind_col = resolve_column(campaign_rows, ['kind', 'Campaign Type Raw'])
             if kind_col and not campaign_rows[kind_col].empty:
                 kind_values = campaign_rows[kind_col].dropna().unique()
                 for kind in kind_values:
@@ -5520,7 +5563,7 @@ def get_campaign_performance_data(bulk_data, client_config=None):
         'Orders': 'sum'
     }
     
-    grouped_df = df.groupby(groupby_cols, as_index=False).agg(agg_dict)
+    grouped_df = df.groupby(groupby_cols, as_index=False, observed=True).agg(agg_dict)
     
     # Recalculate derived metrics after aggregation
     grouped_df['ACoS'] = grouped_df.apply(
@@ -5553,10 +5596,83 @@ def get_campaign_performance_data(bulk_data, client_config=None):
     
     # Cache the analysis result
     if client_config:
-        db_manager.cache_analysis_result(client_name, 'campaign_performance_data', analysis_input, grouped_df)
+        db_manager.cache_analysis_result(
+            client_name, 'campaign_performance_data', analysis_input, grouped_df,
+            logic_version=ANALYSIS_LOGIC_VERSIONS['campaign_performance_data']
+        )
     
     return grouped_df 
 
+def schedule_analysis_precompute():
+    """Queue the heavy audit analyses for the session's bulk data and client on the background worker.
+
+    Targeting runs first and is published to the session the way the targeting
+    section does, since search term matching reads it from there. Analyses go
+    through their st.cache_data wrappers (without spinners), so the sections'
+    first calls are st.cache_data hits.
+    """
+    bulk_data = st.session_state.get('bulk_data')
+    client_config = st.session_state.get('client_config')
+    if not bulk_data or not client_config:
+        return None
+
+    def targeting(results):
+        with quiet_cache_calls():
+            branded_df, non_branded_df = get_targeting_performance_data(bulk_data, client_config)
+        if st.session_state.get('bulk_data') is bulk_data:
+            st.session_state.branded_targets_df = branded_df
+            st.session_state.non_branded_targets_df = non_branded_df
+            st.session_state.all_targets_df = pd.concat([branded_df, non_branded_df], ignore_index=True)
+        return branded_df, non_branded_df
+
+    def search_terms(results):
+        with quiet_cache_calls():
+            return get_search_term_data(bulk_data, client_config)
+
+    def campaign_performance(results):
+        with quiet_cache_calls():
+            return get_campaign_performance_data(bulk_data, client_config)
+
+    def word_clouds(results):
+        # Same frames the word cloud tabs pass (with "Remove ASINs" unticked), so the tabs hit st.cache_data
+        search_term_df = results.get('search_term_data')
+        if search_term_df is None or search_term_df.empty:
+            return None
+        if 'Is_Branded' in search_term_df.columns:
+            term_dfs = {
+                'all': search_term_df,
+                'branded': search_term_df[search_term_df['Is_Branded'] == True],
+                'non-branded': search_term_df[search_term_df['Is_Branded'] == False],
+            }
+        else:
+            term_dfs = {'all': search_term_df}
+        for term_type, term_df in term_dfs.items():
+            if not term_df.empty:
+                plt.close(generate_search_term_wordcloud(term_df, filter_type=term_type, remove_asins=False))
+
+    job = schedule_precompute([
+        PrecomputeTask('targeting_performance', 'Targeting performance', targeting, needs_session=True),
+        PrecomputeTask('search_term_data', 'Search terms', search_terms, needs_session=True),
+        PrecomputeTask('campaign_performance_data', 'Campaign performance', campaign_performance, needs_session=True),
+        PrecomputeTask('search_term_wordcloud', 'Word clouds', word_clouds),
+    ])
+    st.session_state.debug_messages.append(f"[Precompute] Queued {len(job.tasks)} analyses in the background")
+    return job
+
+def render_precompute_progress():
+    """Sidebar progress of the session's background precompute job."""
+    progress = precompute_progress()
+    if not progress or progress['cancelled']:
+        return
+    if not progress['finished']:
+        current = f" ({progress['current']})" if progress['current'] else ""
+        st.progress(progress['done'] / max(progress['total'], 1),
+                    text=f"Preparing analyses: {progress['done']}/{progress['total']}{current}")
+    elif progress['errors']:
+        st.caption(f"⚠️ Background analysis failed for: {', '.join(progress['errors'])}")
+    else:
+        st.caption(f"✓ Analyses ready ({progress['seconds']:.1f}s)")
+
 # --- UI Functions ---
 # --- Main App Logic ---
 
@@ -6427,8 +6543,10 @@ with st.sidebar:
                         if client_file.exists():
                             client_file.unlink()  # Delete the file
                             
-                            # Clear caches to immediately refresh the client list
-                            clear_caches()
+                            # Refresh the client list and drop the deleted client's cached data
+                            get_existing_clients.clear()
+                            _load_client_config_from_file.clear()
+                            db_manager.clear_client_cache(deleted_client_name)
                             
                             # Reset session state
                             if 'selected_client_name' in st.session_state and st.session_state.selected_client_name == st.session_state.client_to_delete:
@@ -6740,6 +6858,7 @@ if st.session_state.client_config:
         client_settings_btn = st.button("Client Settings Center", use_container_width=True)
         advertising_audit_btn = st.button("Advertising Audit", use_container_width=True)
         advertiser_actions_btn = st.button("Advertiser Actions", use_container_width=True)
+        render_precompute_progress()
         
         # Session Management Section
         st.markdown("---")
@@ -6750,6 +6869,8 @@ if st.session_state.client_config:
             st.session_state.show_save_modal = False
         if 'show_load_modal' not in st.session_state:
             st.session_state.show_load_modal = False
+        if 'show_compare_modal' not in st.session_state:
+            st.session_state.show_compare_modal = False
         
         # Save Audit Button
         col_save, col_load = st.columns(2)
@@ -6763,6 +6884,10 @@ if st.session_state.client_config:
                 st.session_state.show_load_modal = True
                 st.rerun()
         
+        if st.button("📊 Compare Audits", use_container_width=True, help="Compare two saved audit sessions"):
+            st.session_state.show_compare_modal = True
+            st.rerun()
+        
         # Version display at bottom of sidebar
         st.markdown("---")
         st.markdown(f"<small style='color: #888; text-align: center; display: block;'>v{APP_VERSION}</small>", unsafe_allow_html=True)
@@ -6801,6 +6926,14 @@ if st.session_state.client_config:
                         height=80
                     )
                     
+                    save_as_delta = st.checkbox(
+                        "Save only changes since the last full session",
+                        key="session_save_delta",
+                        help="Stores just the campaigns, ad groups and targets that were added, removed or changed "
+                             "since the client's latest full session. Loads exactly like a full session; every "
+                             f"{DELTA_REBASE_EVERY + 1}th session is saved in full."
+                    )
+                    
                     # Show what will be saved
                     st.markdown("**This session will include:**")
                     data_types = []
@@ -6823,7 +6956,7 @@ if st.session_state.client_config:
                         if st.button("💾 Save Session", use_container_width=True, type="primary"):
                             if session_name.strip():  # Ensure name is not empty
                                 client_name = st.session_state.client_config.get('client_name', '')
-                                if save_audit_session(client_name, session_name.strip(), description.strip()):
+                                if save_audit_session(client_name, session_name.strip(), description.strip(), delta=save_as_delta):
                                     st.success(f"Session '{session_name}' saved successfully!")
                                     st.session_state.show_save_modal = False
                                     # Clear temp values
@@ -6856,25 +6989,37 @@ if st.session_state.client_config:
                 st.markdown("---")
                 
                 client_name = st.session_state.client_config.get('client_name', '')
-                saved_sessions = get_saved_sessions(client_name)
+                total_sessions = count_saved_sessions(client_name)
+                
+                # Sorting and paging come from the session index; only one page is listed
+                sort_options = {
+                    "Newest first": ('timestamp', True),
+                    "Oldest first": ('timestamp', False),
+                    "Name (A-Z)": ('display_name', False),
+                }
+                sort_label = "Newest first"
+                page = 1
+                if total_sessions > 1:
+                    sort_col, page_col = st.columns(2)
+                    with sort_col:
+                        sort_label = st.selectbox("Sort sessions by:", list(sort_options), key="session_sort")
+                    if total_sessions > SESSION_PAGE_SIZE:
+                        with page_col:
+                            page_count = math.ceil(total_sessions / SESSION_PAGE_SIZE)
+                            if st.session_state.get('session_page', 1) > page_count:
+                                # Sessions were deleted since the page was chosen
+                                st.session_state.session_page = page_count
+                            page = st.number_input(f"Page (of {page_count}):", min_value=1, max_value=page_count,
+                                                   value=1, step=1, key="session_page")
+                sort_by, descending = sort_options[sort_label]
+                saved_sessions = get_saved_sessions(client_name, sort_by, descending,
+                                                    (int(page) - 1) * SESSION_PAGE_SIZE, SESSION_PAGE_SIZE)
                 
                 if saved_sessions:
                     st.markdown("**Select a session to load:**")
                     
                     # Session selection with better formatting
-                    session_options = []
-                    for session in saved_sessions:
-                        # Parse and format the date
-                        try:
-                            # Parse the created_date which is in format "YYYY-MM-DD HH:MM:SS"
-                            created_date = datetime.strptime(session['created_date'], '%Y-%m-%d %H:%M:%S')
-                            formatted_date = created_date.strftime('%m/%d/%y')
-                        except (ValueError, TypeError):
-                            # Fallback if date parsing fails
-                            formatted_date = "Unknown"
-                        
-                        option_text = f"{session['display_name']} - {formatted_date}"
-                        session_options.append(option_text)
+                    session_options = [_session_option_label(session) for session in saved_sessions]
                     
                     selected_index = st.selectbox(
                         "Available sessions:",
@@ -6895,6 +7040,8 @@ if st.session_state.client_config:
                         
                         st.markdown(f"📊 **Contains:** {', '.join(selected_session['data_types'])}")
                         st.markdown(f"📅 **Created:** {selected_session['created_date']}")
+                        if selected_session.get('delta_base'):
+                            st.caption(f"Stored as changes since {selected_session['delta_base'][:-len(SNAPSHOT_SUFFIX)]}")
                         
                         st.markdown("---")
                         
@@ -6927,6 +7074,51 @@ if st.session_state.client_config:
                         st.session_state.show_load_modal = False
                         st.rerun()
         
+        # Compare Modal
+        if st.session_state.show_compare_modal:
+            with st.container():
+                st.markdown("#### 📊 Compare Saved Sessions")
+                st.markdown("---")
+                
+                client_name = st.session_state.client_config.get('client_name', '')
+                saved_sessions = get_saved_sessions(client_name)
+                
+                if len(saved_sessions) >= 2:
+                    session_options = [_session_option_label(session) for session in saved_sessions]
+                    # Newest first, so the latest two sessions are compared by default
+                    previous_index = st.selectbox("Previous session:", range(len(session_options)), index=1,
+                                                  format_func=lambda x: session_options[x], key="compare_previous")
+                    current_index = st.selectbox("Current session:", range(len(session_options)), index=0,
+                                                 format_func=lambda x: session_options[x], key="compare_current")
+                    same_session = previous_index == current_index
+                    if same_session:
+                        st.warning("Choose two different sessions.")
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.button("📊 Compare", use_container_width=True, type="primary", disabled=same_session):
+                            previous_session = saved_sessions[previous_index]
+                            current_session = saved_sessions[current_index]
+                            st.session_state.session_comparison = {
+                                'client_name': client_name,
+                                'previous': previous_session['filename'],
+                                'previous_name': session_options[previous_index],
+                                'current': current_session['filename'],
+                                'current_name': session_options[current_index],
+                            }
+                            st.session_state.current_page = "session_comparison"
+                            st.session_state.show_compare_modal = False
+                            st.rerun()
+                    with col2:
+                        if st.button("❌ Cancel", use_container_width=True, key="compare_cancel"):
+                            st.session_state.show_compare_modal = False
+                            st.rerun()
+                else:
+                    st.info("📭 Save at least two sessions for this client to compare them.")
+                    if st.button("Close", use_container_width=True, key="compare_close"):
+                        st.session_state.show_compare_modal = False
+                        st.rerun()
+        
         # Add indicators for uploaded data
         st.markdown("")
         if 'bulk_data' in st.session_state and st.session_state.bulk_data:
@@ -7018,13 +7210,21 @@ if st.session_state.client_config:
                     if st.session_state.get('last_bulk_file_key') != file_key:
                         try:
                             with st.spinner('Processing bulk file...'):
-                                # Clear caches when new data is uploaded
-                                clear_caches()
                                 st.session_state.last_cache_refresh = datetime.now()
-                                processed_data = process_bulk_data(bulk_file_uploaded)
-                                st.session_state.bulk_data = processed_data
+                                # Reuse the copy other sessions already hold for the same file
+                                st.session_state.update(shared_data_store().share(
+                                    _shared_data_key('bulk', bulk_file_uploaded),
+                                    lambda: process_bulk_data(bulk_file_uploaded),
+                                    lambda view: {'bulk_data': view}
+                                ))
+                                processed_data = st.session_state.bulk_data
+                                if processed_data is not None:
+                                    # Per client, so it runs whether this session built the data or reused it.
+                                    # Product ads only live on campaign sheets, so search term sheets stay unparsed.
+                                    detect_and_persist_sku_asin_mappings(processed_data.subset(BULK_CAMPAIGN_SHEET_KEYS))
                                 st.session_state.is_companion_data = False
                                 st.session_state.last_bulk_file_key = file_key
+                                schedule_analysis_precompute()
                                 
                             st.success('✓ Bulk file processed successfully')
                         except Exception as e:
@@ -7061,14 +7261,17 @@ if st.session_state.client_config:
                         if st.session_state.get('last_companion_file_key') != file_key:
                             try:
                                 with st.spinner('Processing companion files...'):
-                                    # Clear caches when new data is uploaded
-                                    clear_caches()
                                     st.session_state.last_cache_refresh = datetime.now()
-                                    processed_data = process_companion_data(asin_file, search_term_file, targeting_file)
-                                    st.session_state.bulk_data = processed_data
+                                    st.session_state.update(shared_data_store().share(
+                                        _shared_data_key('companion', asin_file, search_term_file, targeting_file),
+                                        lambda: process_companion_data(asin_file, search_term_file, targeting_file),
+                                        lambda view: {'bulk_data': view}
+                                    ))
+                                    processed_data = st.session_state.bulk_data
                                     if processed_data is not None:
                                         st.session_state.is_companion_data = True
                                         st.session_state.last_companion_file_key = file_key
+                                        schedule_analysis_precompute()
                                 
                                 if processed_data:
                                     st.success('✓ Companion files processed successfully')
@@ -7131,10 +7334,12 @@ if st.session_state.client_config:
                 if st.session_state.get('last_sales_file_key') != file_key:
                     try:
                         with st.spinner('Processing sales report...'):
-                            # Clear caches when new data is uploaded
-                            clear_caches()
                             st.session_state.last_cache_refresh = datetime.now()
-                            processed_data = process_sales_report(sales_report_uploaded)
+                            processed_data = shared_data_store().share(
+                                _shared_data_key('sales_report', sales_report_uploaded),
+                                lambda: process_sales_report(sales_report_uploaded),
+                                lambda view: {'sales_report_data': view}
+                            )['sales_report_data']
                             
                             # Show detailed debugging info
                             if processed_data is not None:
@@ -7292,7 +7497,7 @@ if st.session_state.client_config:
             
             # Show bulk data structure if available
             if 'bulk_data' in st.session_state and st.session_state.get('bulk_data') is not None:
-                if isinstance(st.session_state.bulk_data, dict):
+                if isinstance(st.session_state.bulk_data, Mapping):
                     # Check for Search Term Reports
                     sp_search_term_sheet = None
                     sb_search_term_sheet = None
@@ -10226,7 +10431,9 @@ if st.session_state.client_config:
                 }
                 
                 # Process each sheet to extract campaigns with spend and state data
-                for sheet_name, df in st.session_state.bulk_data.items():
+                # (only the campaign sheets are read, so other sheets of a lazy workbook stay unparsed)
+                for sheet_name in [key for key in campaign_type_map if key in st.session_state.bulk_data]:
+                    df = st.session_state.bulk_data[sheet_name]
                     if sheet_name in campaign_type_map:
                         campaign_type = campaign_type_map[sheet_name]
                         
@@ -10649,11 +10856,19 @@ if st.session_state.client_config:
                                 else:
                                     # Get session data from filesystem
                                     filepath = os.path.join(CLIENT_SESSIONS_DIR, client_name, session['filename'])
-                                    if os.path.exists(filepath):
-                                        with open(filepath, 'r') as f:
+                                    if is_snapshot(filepath):
+                                        # Backups carry sessions as JSON documents so any version can import them
+                                        read_bytes, _ = _secure_bytes_io()
+                                        export_data['sessions'][client_name].append({
+                                            'filename': session['filename'][:-len(SNAPSHOT_SUFFIX)] + '.json',
+                                            'data': snapshot_document(filepath, read_bytes)
+                                        })
+                                    elif os.path.exists(filepath):
+                                        session_data = _read_json_secure(filepath)
+                                        if session_data is not None:
                                             export_data['sessions'][client_name].append({
                                                 'filename': session['filename'],
-                                                'data': json.load(f)
+                                                'data': session_data
                                             })
                     
                     # Create download button
@@ -10765,11 +10980,12 @@ if st.session_state.client_config:
                                             # Save to filesystem
                                             client_session_dir = ensure_session_directory(client_name)
                                             filepath = os.path.join(client_session_dir, filename)
-                                            with open(filepath, 'w') as f:
-                                                json.dump(session_data, f, indent=2)
+                                            _write_json_secure(filepath, session_data)
                                 
                                 # Clear caches
                                 clear_client_caches()
+                                # Imported sessions are indexed on the next listing
+                                _clear_session_listing()
                                 
                                 st.success("✅ Data imported successfully! Please refresh the page.")
                                 st.balloons()
@@ -12047,12 +12263,7 @@ if st.session_state.client_config:
             
             # Helpers
             def _find_col(df, include_tokens, exclude_tokens=None):
-                cols = list(df.columns)
-                for c in cols:
-                    name = str(c).lower()
-                    if all(tok in name for tok in include_tokens) and (not exclude_tokens or all(tok not in name for tok in exclude_tokens)):
-                        return c
-                return None
+                return column_resolver(df).find(include_tokens, exclude_tokens or ())
 
             def _campaign_name_col(df):
                 info = _find_col(df, ["campaign name", "informational"])  # Prefer informational
@@ -12529,7 +12740,7 @@ if st.session_state.client_config:
                 actual_col = col
                 if col == 'Campaign Name':
                     # Find the Campaign Name (Informational Only) column using case-insensitive search
-                    info_col = next((c for c in df.columns if 'campaign name' in c.lower() and 'informational' in c.lower()), None)
+                    info_col = column_resolver(df).find(['campaign name', 'informational'])
                     if info_col:
                         actual_col = info_col
                 
@@ -12719,7 +12930,7 @@ if st.session_state.client_config:
                 if min_spend_threshold is not None:
                     df = df[df['Spend'] >= min_spend_threshold]
                 # Determine campaign type (case-insensitive search for campaign name column)
-                camp_col = next((col for col in df.columns if 'campaign name' in col.lower() and 'informational' in col.lower()), None)
+                camp_col = column_resolver(df).find(['campaign name', 'informational'])
                 if camp_col:
                     df['Type'] = np.where(df[camp_col].astype(str).str.contains("VCPM", case=False, na=False), "VCPM", "Other")
                     # Store campaign name for later reference
@@ -12811,7 +13022,7 @@ if st.session_state.client_config:
                 df = apply_guardrails(df, increase_percent, decrease_percent, adjust_based_on_increase, adjust_based_on_decrease)
                 
                 # --- Branding Classification ---
-                camp_col_name = next((col for col in df.columns if 'campaign name' in col.lower() and 'informational' in col.lower()), None)
+                camp_col_name = column_resolver(df).find(['campaign name', 'informational'])
                 if camp_col_name:
                     df['Branding_Category'] = df[camp_col_name].apply(classify_branding)
                 else:
@@ -12819,7 +13030,7 @@ if st.session_state.client_config:
 
                 # Enforce minimum bids exactly as in original
                 # Get the campaign name column (case-insensitive)
-                camp_col = next((col for col in df.columns if 'campaign name' in col.lower() and 'informational' in col.lower()), None)
+                camp_col = column_resolver(df).find(['campaign name', 'informational'])
                 
                 # Check for SBV or Video in campaign names if the column exists
                 has_sbv_or_video = False
@@ -13248,7 +13459,7 @@ if st.session_state.client_config:
                         df = bulk_data[sheet_name]
                         if not df.empty:
                             # Find campaign name column (case-insensitive)
-                            camp_col = next((col for col in df.columns if 'campaign name' in col.lower() and 'informational' in col.lower()), None)
+                            camp_col = column_resolver(df).find(['campaign name', 'informational'])
                             if camp_col:
                                 # Check if any campaign names contain "VCPM" (case-insensitive)
                                 if df[camp_col].astype(str).str.contains('VCPM', case=False, na=False).any():
@@ -13521,7 +13732,7 @@ if st.session_state.client_config:
                                 display_df = top_increases.copy()
                                 
                                 # Use Campaign Name (Informational Only) if available, otherwise fall back to Campaign Name (case-insensitive)
-                                info_col = next((col for col in display_df.columns if 'campaign name' in col.lower() and 'informational' in col.lower()), None)
+                                info_col = column_resolver(display_df).find(['campaign name', 'informational'])
                                 if info_col:
                                     display_df['Campaign Name'] = display_df[info_col]
                                 
@@ -13567,7 +13778,7 @@ if st.session_state.client_config:
                                 display_df = top_decreases.copy()
                                 
                                 # Use Campaign Name (Informational Only) if available, otherwise fall back to Campaign Name (case-insensitive)
-                                info_col = next((col for col in display_df.columns if 'campaign name' in col.lower() and 'informational' in col.lower()), None)
+                                info_col = column_resolver(display_df).find(['campaign name', 'informational'])
                                 if info_col:
                                     display_df['Campaign Name'] = display_df[info_col]
                                 
@@ -15042,7 +15253,7 @@ if st.session_state.client_config:
                                         else:
                                             st.session_state.debug_messages.append("[Advanced Finder] No Ad Group column found")
                                     
-                                    grouped = df_loc.groupby(groupby_cols, as_index=False).agg(agg_dict)
+                                    grouped = df_loc.groupby(groupby_cols, as_index=False, observed=True).agg(agg_dict)
                                     st.session_state.debug_messages.append(f"[Advanced Finder] Post-groupby: {len(grouped)} rows, groupby_cols: {groupby_cols}")
                                     
                                     if 'Sales' in grouped.columns and 'Spend' in grouped.columns:
@@ -15276,26 +15487,13 @@ if st.session_state.client_config:
                 cand_df = cand_df[~mask_exclude]
             # Add Classification column (Branded/Non-Branded)
             if not cand_df.empty:
-                client_cfg = st.session_state.get('client_config', {}) or {}
-                branded_terms = [str(term).strip().lower() for term in client_cfg.get('branded_keywords', []) if str(term).strip()]
-                branded_asins = {str(a).strip().upper() for a in (client_cfg.get('branded_asins_data', {}) or {}).keys()}
-                def _classify_row(r):
-                    text = str(r.get('Text','')).strip()
-                    kind = r.get('Kind','Keyword')
-                    if kind == 'ASIN':
-                        m = re.search(r'B0[A-Za-z0-9]{8}', text, flags=re.I)
-                        if m and m.group(0).upper() in branded_asins:
-                            return 'Branded'
-                        return 'Non-Branded'
-                    if kind == 'Keyword':
-                        low = text.lower()
-                        if any(t and t in low for t in branded_terms):
-                            return 'Branded'
-                        return 'Non-Branded'
-                    if kind == 'Category':
-                        return 'Non-Branded'
-                    return 'Non-Branded'
-                cand_df['Classification'] = cand_df.apply(_classify_row, axis=1)
+                # Same memoized classifier as the audit sections: branded ASINs for ASIN targets, branded terms for keywords
+                classifier = term_classifier(st.session_state.get('client_config', {}) or {}, st.session_state.get('sd_attribution_choice', 'Sales'))
+                cand_text = cand_df['Text'].astype(str).str.strip()
+                cand_kind = cand_df['Kind'].fillna('Keyword') if 'Kind' in cand_df.columns else pd.Series('Keyword', index=cand_df.index)
+                cand_branded = ((cand_kind == 'ASIN') & classifier.mask(cand_text, 'branded_asins')) | \
+                               ((cand_kind == 'Keyword') & classifier.mask(cand_text, 'term'))
+                cand_df['Classification'] = np.where(cand_branded, 'Branded', 'Non-Branded')
                 # Present Ad Sales alias
                 cand_df['Ad Sales'] = cand_df.get('Sales', 0.0)
                 # Ensure Found Via column exists for display
@@ -15456,10 +15654,7 @@ if st.session_state.client_config:
                 
                 st.dataframe(display_cand_df, use_container_width=True, height=220)
                 if st.button("Add Candidates", key="cc_add_cands"):
-                    # Classify branding using client settings
-                    client_cfg = st.session_state.get('client_config', {}) or {}
-                    branded_terms = [str(term).strip().lower() for term in client_cfg.get('branded_keywords', []) if str(term).strip()]
-                    branded_asins = {str(a).strip().upper() for a in client_cfg.get('branded_asins_data', {}).keys()}
+                    # Branding comes from the Classification column set by the shared classifier above
                     # Only add candidates that have nonzero Spend or Ad Sales
                     cand_df_add = cand_df.copy()
                     if 'Spend' in cand_df_add.columns or 'Ad Sales' in cand_df_add.columns:
@@ -15502,17 +15697,7 @@ if st.session_state.client_config:
                     for _, r in cand_df_add.iterrows():
                         text = str(r['Text']).strip()
                         kind = r['Kind']
-                        branding = 'Non'
-                        if kind == 'ASIN':
-                            m = re.search(r'B0[A-Za-z0-9]{8}', text, flags=re.I)
-                            if m and m.group(0).upper() in branded_asins:
-                                branding = 'Brand'
-                        elif kind == 'Keyword':
-                            low = text.lower()
-                            if any(t and t in low for t in branded_terms):
-                                branding = 'Brand'
-                        elif kind == 'Category':
-                            branding = 'Non'
+                        branding = 'Brand' if r.get('Classification') == 'Branded' else 'Non'
                         # Determine Found Via to persist: prefer row value, else compute default based on toggles
                         fv_val = str(r.get('Found Via', '') or '').strip()
                         if not fv_val:
@@ -15624,11 +15809,7 @@ if st.session_state.client_config:
                     if not lines:
                         st.info("No targets entered.")
                     else:
-                        # Gather client settings
-                        client_cfg = st.session_state.get('client_config', {}) or {}
-                        branded_asins_map = client_cfg.get('branded_asins_data', {}) or {}
-                        branded_terms_list = client_cfg.get('branded_terms', []) or client_cfg.get('branded_keywords', []) or []
-                        branded_terms_list = [str(t).strip().lower() for t in branded_terms_list if str(t).strip()]
+                        classifier = term_classifier(st.session_state.get('client_config', {}) or {}, st.session_state.get('sd_attribution_choice', 'Sales'))
 
                         new_rows = []
                         for raw in lines:
@@ -15637,17 +15818,10 @@ if st.session_state.client_config:
                             # Determine kind (ASIN vs Keyword)
                             if 'B0' in upper:
                                 kind = 'ASIN'
-                                # Try to extract canonical ASIN token for branding check
-                                asin_token = None
-                                for tok in upper.replace('"',' ').replace("'", ' ').split():
-                                    if tok.startswith('B0') and len(tok) >= 10:
-                                        asin_token = tok[:10]
-                                        break
-                                branding = 'Brand' if (asin_token and asin_token in set(map(str.upper, branded_asins_map.keys()))) else 'Non'
+                                branding = 'Brand' if classifier.classify(text).branded_asins else 'Non'
                             else:
                                 kind = 'Keyword'
-                                low = text.lower()
-                                branding = 'Brand' if any(t and t in low for t in branded_terms_list) else 'Non'
+                                branding = 'Brand' if classifier.classify(text).term else 'Non'
 
                             new_rows.append({
                                 'Text': text,
@@ -19797,18 +19971,24 @@ if st.session_state.client_config:
                 4. Upload the file to Amazon Ads to apply changes
                 """)
 
+    elif st.session_state.current_page == "session_comparison":
+        display_session_comparison()
+
     elif st.session_state.current_page == "advertising_audit":
         # Check if settings have been updated and refresh data if needed
         if st.session_state.get('settings_updated', False):
-            # Clear any cached targeting data to force recalculation
-            if 'targeting_data' in st.session_state:
-                del st.session_state.targeting_data
-            if 'branded_targets_df' in st.session_state:
-                del st.session_state.branded_targets_df
-            if 'non_branded_targets_df' in st.session_state:
-                del st.session_state.non_branded_targets_df
-            if 'classified_campaigns' in st.session_state:
-                del st.session_state.classified_campaigns
+            # Clear cached data derived from the settings that changed to force recalculation
+            affected = st.session_state.pop('settings_affected_analyses', None)
+            if affected is None or 'targeting_performance' in affected:
+                if 'targeting_data' in st.session_state:
+                    del st.session_state.targeting_data
+                if 'branded_targets_df' in st.session_state:
+                    del st.session_state.branded_targets_df
+                if 'non_branded_targets_df' in st.session_state:
+                    del st.session_state.non_branded_targets_df
+            if affected is None or 'classify_branded_campaigns' in affected:
+                if 'classified_campaigns' in st.session_state:
+                    del st.session_state.classified_campaigns
             
             # Reset the flag
             st.session_state.settings_updated = False
@@ -19863,8 +20043,7 @@ if st.session_state.client_config:
                 # Store the selection in session state for global access
                 if 'sd_attribution_choice' not in st.session_state or st.session_state.sd_attribution_choice != sd_attribution_choice:
                     st.session_state.sd_attribution_choice = sd_attribution_choice
-                    clear_caches()
-                    st.session_state.debug_messages.append(f"Attribution model changed to: {sd_attribution_choice}, caches cleared")
+                    st.session_state.debug_messages.append(f"Attribution model changed to: {sd_attribution_choice}")
                     st.rerun()
 
             with sales_col:
@@ -19910,8 +20089,7 @@ if st.session_state.client_config:
             # Store the selection in session state for global access
             if 'sd_attribution_choice' not in st.session_state or st.session_state.sd_attribution_choice != sd_attribution_choice:
                 st.session_state.sd_attribution_choice = sd_attribution_choice
-                clear_caches()
-                st.session_state.debug_messages.append(f"Attribution model changed to: {sd_attribution_choice}, caches cleared")
+                st.session_state.debug_messages.append(f"Attribution model changed to: {sd_attribution_choice}")
                 st.rerun()
             
             # For companion data, still show the sales metric selector if available
@@ -20065,33 +20243,6 @@ if st.session_state.client_config:
                 sales_patterns = ['Sales', 'Total Sales', '7 Day Total Sales']
                 orders_patterns = ['Orders', '7 Day Total Orders (#)']
                 
-                # Define the Helper Function HERE
-                def find_col_pattern(df_cols, patterns, case_sensitive=False):
-                    """Finds the first matching column name from a list."""
-                    # First try exact matches
-                    for pattern in patterns:
-                        if pattern in df_cols:
-                            return pattern
-                    
-                    # Then try case-insensitive if allowed
-                    if not case_sensitive:
-                        df_cols_lower = [col.lower() for col in df_cols]
-                        for pattern in patterns:
-                            pattern_lower = pattern.lower()
-                            if pattern_lower in df_cols_lower:
-                                idx = df_cols_lower.index(pattern_lower)
-                                return df_cols[idx]  # Return original case
-                        
-                    # Finally try partial matches
-                    for pattern in patterns:
-                        pattern_lower = pattern.lower()
-                        for col in df_cols:
-                            if pattern_lower in col.lower():
-                                return col
-                    
-                    # If no match found
-                    return None
-                
                 # --- 1. Aggregate Ad Data from Specific Campaign Sheets ---
                 ad_spend_col = 'Spend'
                 ad_imp_col = 'Impressions'
@@ -20122,8 +20273,8 @@ if st.session_state.client_config:
                             current_sales_patterns = sales_patterns
                         
                         # Find the appropriate columns in this sheet
-                        sheet_sales_col = find_col_pattern(df_sheet.columns, current_sales_patterns)
-                        sheet_orders_col = find_col_pattern(df_sheet.columns, orders_patterns)
+                        sheet_sales_col = column_resolver(df_sheet).match(current_sales_patterns)
+                        sheet_orders_col = column_resolver(df_sheet).match(orders_patterns)
                         
                         # Check if required columns exist
                         missing_cols = [col for col in [ad_spend_col, ad_imp_col, ad_clicks_col] if col not in df_sheet.columns]
@@ -20237,8 +20388,8 @@ if st.session_state.client_config:
                         if 'selected_total_sales_metric' in st.session_state and st.session_state.selected_total_sales_metric in sales_df.columns:
                             total_sales_col = st.session_state.selected_total_sales_metric
                         else:
-                            total_sales_col = find_col_pattern(sales_df.columns, ['Total Sales'])
-                        sessions_col = find_col_pattern(sales_df.columns, ['Sessions'])
+                            total_sales_col = column_resolver(sales_df).match(['Total Sales'])
+                        sessions_col = column_resolver(sales_df).match(['Sessions'])
                         
                         # Calculate total sales revenue
                         if total_sales_col:
@@ -20663,90 +20814,18 @@ if st.session_state.client_config:
                             search_term_df = get_search_term_data(bulk_data, st.session_state.client_config)
                             
                             if not search_term_df.empty:
-                                # Check if 'Is Branded' column exists, if not, add it based on client configuration
-                                if 'Is Branded' not in search_term_df.columns:
-                                    st.session_state.debug_messages.append(f"[Branded Performance] 'Is Branded' column not found in search term data, adding it")
-                                    
-                                    # Get branded terms and ASINs from client config
-                                    client_config = st.session_state.client_config
-                                    branded_terms = []
-                                    branded_asins = []
-                                    
-                                    if client_config:
-                                        # Extract branded terms from client config (handling different possible formats)
-                                        if 'Branded Terms' in client_config:
-                                            if isinstance(client_config['Branded Terms'], list):
-                                                branded_terms = client_config['Branded Terms']
-                                            elif isinstance(client_config['Branded Terms'], str):
-                                                branded_terms = [term.strip() for term in client_config['Branded Terms'].split(',')]
-                                        
-                                        # Extract branded ASINs from the correct source: branded_asins_data
-                                        branded_asins_data = client_config.get('branded_asins_data', {})
-                                        branded_asins = [str(asin).strip().upper() for asin in branded_asins_data.keys() if str(asin).strip()]
-                                        
-                                        # Fallback: check old format for backward compatibility
-                                        if not branded_asins and 'Branded ASINs' in client_config:
-                                            if isinstance(client_config['Branded ASINs'], list):
-                                                branded_asins = [str(asin).strip().upper() for asin in client_config['Branded ASINs'] if str(asin).strip()]
-                                            elif isinstance(client_config['Branded ASINs'], str):
-                                                branded_asins = [asin.strip().upper() for asin in client_config['Branded ASINs'].split(',') if asin.strip()]
-                                    
-                                    # Function to check if a search term contains any branded terms
-                                    def is_branded_term(term):
-                                        if pd.isna(term) or not isinstance(term, str):
-                                            return False
-                                        
-                                        term_lower = term.lower()
-                                        
-                                        # Check if term contains any branded terms
-                                        for branded_term in branded_terms:
-                                            if branded_term and isinstance(branded_term, str) and branded_term.lower() in term_lower:
-                                                return True
-                                        
-                                        # Check if term contains any branded ASINs (using uppercase comparison for ASINs)
-                                        for branded_asin in branded_asins:
-                                            if branded_asin and isinstance(branded_asin, str) and branded_asin in term.upper():
-                                                return True
-                                        
-                                        return False
-                                    
-                                    # Apply the function to classify search terms
+                                # get_search_term_data classifies every row; fill the column from the shared classifier if not
+                                branded_column = 'Is_Branded'
+                                if branded_column not in search_term_df.columns:
+                                    classifier = term_classifier(st.session_state.client_config, st.session_state.get('sd_attribution_choice', 'Sales'))
                                     search_term_col = 'Search Term' if 'Search Term' in search_term_df.columns else 'Customer Search Term'
+                                    is_branded = pd.Series(False, index=search_term_df.index)
                                     if search_term_col in search_term_df.columns:
-                                        # Enhanced classification: check both search term and target for branded content
-                                        def classify_search_term_row(row):
-                                            search_term = row.get(search_term_col, '')
-                                            target = row.get('Target', '')
-                                            
-                                            # Check if search term is branded
-                                            if is_branded_term(search_term):
-                                                return True
-                                            
-                                            # Check if target contains branded ASINs
-                                            if target and isinstance(target, str) and not pd.isna(target):
-                                                target_upper = target.upper()
-                                                for branded_asin in branded_asins:
-                                                    if branded_asin and isinstance(branded_asin, str) and branded_asin in target_upper:
-                                                        return True
-                                            
-                                            return False
-                                        
-                                        search_term_df['Is Branded'] = search_term_df.apply(classify_search_term_row, axis=1)
-                                    else:
-                                        # If no search term column found, default all to non-branded
-                                        search_term_df['Is Branded'] = False
-                                        st.session_state.debug_messages.append(f"[Branded Performance] No search term column found in data")
-                                
-                                # Check which column name is being used for branding classification
-                                if 'Is_Branded' in search_term_df.columns:
-                                    branded_column = 'Is_Branded'
-                                elif 'Is Branded' in search_term_df.columns:
-                                    branded_column = 'Is Branded'
-                                else:
-                                    # If neither column exists, add it with default values
-                                    search_term_df['Is Branded'] = False
-                                    branded_column = 'Is Branded'
-                                    st.session_state.debug_messages.append(f"[Branded Performance] No branding column found, defaulting all to non-branded")
+                                        is_branded |= classifier.mask(search_term_df[search_term_col].fillna('').astype(str))
+                                    if 'Target' in search_term_df.columns:
+                                        is_branded |= classifier.mask(search_term_df['Target'].fillna('').astype(str), 'branded_asins')
+                                    search_term_df[branded_column] = is_branded
+                                    st.session_state.debug_messages.append(f"[Branded Performance] 'Is_Branded' column not found in search term data, classified {len(search_term_df)} rows")
                                 
                                 # Split into branded and non-branded using the correct column
                                 branded_targets_df = search_term_df[search_term_df[branded_column] == True].copy()
@@ -22610,7 +22689,7 @@ if st.session_state.client_config:
                                 df['Orders_num'] = pd.to_numeric(df['Orders'].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
 
                                 # Group by Match Type and count rows meeting thresholds
-                                grp = df.groupby('Match Type', dropna=False)
+                                grp = df.groupby('Match Type', dropna=False, observed=True)
                                 clicks_counts = grp.apply(lambda g: (g['Clicks_num'] >= 1).sum())
                                 orders_counts = grp.apply(lambda g: (g['Orders_num'] >= 1).sum())
 
@@ -23063,7 +23142,7 @@ if st.session_state.client_config:
                                 else:
                                     tmp['__Orders_num'] = 0
 
-                                agg = tmp.groupby(['Campaign', 'Target', 'Match Type'], dropna=False).agg({
+                                agg = tmp.groupby(['Campaign', 'Target', 'Match Type'], dropna=False, observed=True).agg({
                                     '__Spend_num': 'sum',
                                     '__AdSales_num': 'sum',
                                     '__Orders_num': 'sum'
@@ -24834,7 +24913,7 @@ if st.session_state.client_config:
                                                 range_df['Ad_Sales_numeric'] = safe_convert_to_numeric(range_df['Ad Sales'])
                                                 
                                                 # Group by selected columns
-                                                grouped_df = range_df.groupby(groupby_cols).agg({
+                                                grouped_df = range_df.groupby(groupby_cols, observed=True).agg({
                                                     'Spend_numeric': 'sum',
                                                     'Ad_Sales_numeric': 'sum',
                                                     'Impressions': 'sum',
@@ -25180,7 +25259,7 @@ if st.session_state.client_config:
                                                     range_df['Ad_Sales_numeric'] = safe_convert_to_numeric(range_df['Ad Sales'])
                                                     
                                                     # Group by selected columns
-                                                    grouped_df = range_df.groupby(groupby_cols).agg({
+                                                    grouped_df = range_df.groupby(groupby_cols, observed=True).agg({
                                                         'Spend_numeric': 'sum',
                                                         'Ad_Sales_numeric': 'sum',
                                                         'Impressions': 'sum',
@@ -25679,10 +25758,10 @@ if st.session_state.current_page == "advertising_audit":
         df_numeric = df.copy()
         for col in ['Spend', 'Impressions', 'Clicks', 'Orders']:
             if col in df_numeric.columns:
-                df_numeric[col] = pd.to_numeric(df_numeric[col].astype(str).str.replace('[$,%]', '', regex=True), errors='coerce').fillna(0)
+                df_numeric[col] = to_numeric_clean(df_numeric[col]).fillna(0)
     
         if sales_col:
-            df_numeric[sales_col] = pd.to_numeric(df_numeric[sales_col].astype(str).str.replace('[$,%]', '', regex=True), errors='coerce').fillna(0)
+            df_numeric[sales_col] = to_numeric_clean(df_numeric[sales_col]).fillna(0)
     
         # Calculate metrics
         group_spend = df_numeric['Spend'].sum() if 'Spend' in df_numeric.columns else 0
@@ -25734,8 +25813,8 @@ if st.session_state.current_page == "advertising_audit":
         if df.empty:
             return df
     
-        # Create a clean copy of the dataframe
-        df_fmt = df.copy()
+        # Create a clean copy of the dataframe (plain columns, so NaN can be filled with 0 below)
+        df_fmt = release_categoricals(df.copy())
     
         # Ensure ACoS column is present and numeric before formatting
         df_fmt = ensure_acos_column(df_fmt)
@@ -25919,7 +25998,7 @@ if st.session_state.current_page == "advertising_audit":
                 st.session_state.debug_messages.append("[SD Categorization] Added missing 'Match Type' column")
     
         # Find the Targeting Expression column (case-insensitive)
-        te_col = next((c for c in df.columns if c.strip().lower() == 'targeting expression'), None)
+        te_col = resolve_column(df, 'targeting expression')
         if not te_col:
             if 'debug_messages' in st.session_state:
                 st.session_state.debug_messages.append(f"[SD Categorization] No 'Targeting Expression' column found. Available columns: {list(df.columns)}")
@@ -26009,7 +26088,7 @@ if st.session_state.current_page == "advertising_audit":
                     return 'Category Targeting'
             # Enhanced detection for Auto targeting in SD campaigns
             if 'auto' in expr.lower() or 'targeting type' in str(row.get('Targeting Type', '')).lower():
-                targeting_type_col = next((c for c in df.columns if c.strip().lower() == 'targeting type'), None)
+                targeting_type_col = resolve_column(df, 'targeting type')
                 if targeting_type_col and pd.notna(row.get(targeting_type_col)) and str(row.get(targeting_type_col)).strip().lower() == 'auto':
                     category_counts['Product Target'] += 1
                     return 'Product Target'  # SD Auto campaigns are typically Product Targeting
@@ -26096,7 +26175,7 @@ if st.session_state.current_page == "advertising_audit":
                 # Calculate account totals for percentage calculations
                 all_total_spend = normalized_df['Spend'].sum()
                 all_total_sales = normalized_df['Sales'].sum()
-                mt_all = normalized_df.groupby(match_type_col).apply(lambda x: kpi_agg(x, all_total_spend, all_total_sales), include_groups=False).reset_index()
+                mt_all = normalized_df.groupby(match_type_col, observed=True).apply(lambda x: kpi_agg(x, all_total_spend, all_total_sales), include_groups=False).reset_index()
                 expected_match_types = [
                     "Exact", "Phrase", "Broad", "Auto", "Product Target", "Category Targeting",
                     "Remarketing - Branded", "Remarketing - Competitor"
@@ -26263,7 +26342,7 @@ if st.session_state.current_page == "advertising_audit":
                 # Calculate account totals for percentage calculations
                 b_total_spend = normalized_df['Spend'].sum()
                 b_total_sales = normalized_df['Sales'].sum()
-                mt_b = normalized_df.groupby(match_type_col).apply(lambda x: kpi_agg(x, b_total_spend, b_total_sales), include_groups=False).reset_index()
+                mt_b = normalized_df.groupby(match_type_col, observed=True).apply(lambda x: kpi_agg(x, b_total_spend, b_total_sales), include_groups=False).reset_index()
                 expected_match_types = [
                     "Exact", "Phrase", "Broad", "Auto", "Product Target", "Category Targeting",
                     "Remarketing - Branded", "Remarketing - Competitor"
@@ -26390,7 +26469,7 @@ if st.session_state.current_page == "advertising_audit":
                 # Calculate account totals for percentage calculations
                 nb_total_spend = normalized_df['Spend'].sum()
                 nb_total_sales = normalized_df['Sales'].sum()
-                mt_nb = normalized_df.groupby(match_type_col).apply(lambda x: kpi_agg(x, nb_total_spend, nb_total_sales), include_groups=False).reset_index()
+                mt_nb = normalized_df.groupby(match_type_col, observed=True).apply(lambda x: kpi_agg(x, nb_total_spend, nb_total_sales), include_groups=False).reset_index()
                 expected_match_types = [
                     "Exact", "Phrase", "Broad", "Auto", "Product Target", "Category Targeting",
                     "Remarketing - Branded", "Remarketing - Competitor"
@@ -26693,7 +26772,7 @@ if st.session_state.current_page == "advertising_audit":
                     total_sales = df['Sales'].sum() if 'Sales' in df.columns else 0
                 
                     # Aggregate data by Product
-                    ad_df = df.groupby('Product').apply(lambda x: kpi_agg(x, total_spend, total_sales), include_groups=False).reset_index() if not df.empty else pd.DataFrame(columns=['Product'])
+                    ad_df = df.groupby('Product', observed=True).apply(lambda x: kpi_agg(x, total_spend, total_sales), include_groups=False).reset_index() if not df.empty else pd.DataFrame(columns=['Product'])
                 
                     # Debug the dataframe structure
                     if 'debug_messages' in st.session_state:
@@ -27114,7 +27193,7 @@ if st.session_state.current_page == "advertising_audit":
                 total_sales = df['Sales'].sum() if 'Sales' in df.columns else 0
             
                 # Aggregate data by Product
-                ad_df = df.groupby('Product').apply(lambda x: kpi_agg(x, total_spend, total_sales), include_groups=False).reset_index() if not df.empty else pd.DataFrame(columns=['Product'])
+                ad_df = df.groupby('Product', observed=True).apply(lambda x: kpi_agg(x, total_spend, total_sales), include_groups=False).reset_index() if not df.empty else pd.DataFrame(columns=['Product'])
                 ad_df = ad_df.set_index('Product') if not ad_df.empty else pd.DataFrame(index=expected_ad_types)
                 ad_df = ad_df.reindex(expected_ad_types, fill_value=0).reset_index().rename(columns={"index": 'Product'})
                 ad_df_fmt = format_agg_table(ad_df, index_col='Product')
@@ -27265,7 +27344,7 @@ if st.session_state.current_page == "advertising_audit":
                 # Calculate account totals for percentage calculations
                 nb_ad_total_spend = nb_ad['Spend'].sum() if 'Spend' in nb_ad.columns else 0
                 nb_ad_total_sales = nb_ad['Sales'].sum() if 'Sales' in nb_ad.columns else 0
-                ad_nb = nb_ad.groupby('Product').apply(lambda x: kpi_agg(x, nb_ad_total_spend, nb_ad_total_sales), include_groups=False).reset_index() if not nb_ad.empty else pd.DataFrame(columns=['Product'])
+                ad_nb = nb_ad.groupby('Product', observed=True).apply(lambda x: kpi_agg(x, nb_ad_total_spend, nb_ad_total_sales), include_groups=False).reset_index() if not nb_ad.empty else pd.DataFrame(columns=['Product'])
                 ad_nb = ad_nb.set_index('Product') if not ad_nb.empty else pd.DataFrame(index=expected_ad_types)
                 ad_nb = ad_nb.reindex(expected_ad_types, fill_value=0).reset_index().rename(columns={"index": 'Product'})
                 ad_nb_fmt = format_agg_table(ad_nb, index_col='Product')
@@ -27700,7 +27779,7 @@ if st.session_state.current_page == "advertising_audit":
             if 'Ad Type & Match Type' in all_combined.columns:
                 all_combined_total_spend = all_combined['Spend'].sum() if not all_combined.empty else 0
                 all_combined_total_sales = all_combined['Sales'].sum() if not all_combined.empty else 0
-                combined_all = all_combined.groupby('Ad Type & Match Type').apply(lambda x: kpi_agg(x, all_combined_total_spend, all_combined_total_sales), include_groups=False).reset_index() if not all_combined.empty else pd.DataFrame(columns=['Ad Type & Match Type'])
+                combined_all = all_combined.groupby('Ad Type & Match Type', observed=True).apply(lambda x: kpi_agg(x, all_combined_total_spend, all_combined_total_sales), include_groups=False).reset_index() if not all_combined.empty else pd.DataFrame(columns=['Ad Type & Match Type'])
                 combined_all = combined_all.set_index('Ad Type & Match Type') if not combined_all.empty else pd.DataFrame(index=expected_adtype_matchtypes)
                 combined_all = combined_all.reindex(expected_adtype_matchtypes, fill_value=0).reset_index().rename(columns={"index": 'Ad Type & Match Type'})
                 combined_all_fmt = format_agg_table(combined_all, index_col='Ad Type & Match Type')
@@ -27808,7 +27887,7 @@ if st.session_state.current_page == "advertising_audit":
             if 'Ad Type & Match Type' in b_combined.columns:
                 b_combined_total_spend = b_combined['Spend'].sum() if not b_combined.empty else 0
                 b_combined_total_sales = b_combined['Sales'].sum() if not b_combined.empty else 0
-                combined_b = b_combined.groupby('Ad Type & Match Type').apply(lambda x: kpi_agg(x, b_combined_total_spend, b_combined_total_sales), include_groups=False).reset_index() if not b_combined.empty else pd.DataFrame(columns=['Ad Type & Match Type'])
+                combined_b = b_combined.groupby('Ad Type & Match Type', observed=True).apply(lambda x: kpi_agg(x, b_combined_total_spend, b_combined_total_sales), include_groups=False).reset_index() if not b_combined.empty else pd.DataFrame(columns=['Ad Type & Match Type'])
                 combined_b = combined_b.set_index('Ad Type & Match Type') if not combined_b.empty else pd.DataFrame(index=expected_adtype_matchtypes)
                 combined_b = combined_b.reindex(expected_adtype_matchtypes, fill_value=0).reset_index().rename(columns={"index": 'Ad Type & Match Type'})
                 combined_b_fmt = format_agg_table(combined_b, index_col='Ad Type & Match Type')
@@ -27910,7 +27989,7 @@ if st.session_state.current_page == "advertising_audit":
                 # Calculate account totals for percentage calculations
                 nb_combined_total_spend = nb_combined['Spend'].sum() if not nb_combined.empty else 0
                 nb_combined_total_sales = nb_combined['Sales'].sum() if not nb_combined.empty else 0
-                combined_nb = nb_combined.groupby('Ad Type & Match Type').apply(lambda x: kpi_agg(x, nb_combined_total_spend, nb_combined_total_sales), include_groups=False).reset_index() if not nb_combined.empty else pd.DataFrame(columns=['Ad Type & Match Type'])
+                combined_nb = nb_combined.groupby('Ad Type & Match Type', observed=True).apply(lambda x: kpi_agg(x, nb_combined_total_spend, nb_combined_total_sales), include_groups=False).reset_index() if not nb_combined.empty else pd.DataFrame(columns=['Ad Type & Match Type'])
                 expected_adtype_matchtypes = [
                     "Sponsored Products - Exact", "Sponsored Products - Phrase", "Sponsored Products - Broad", "Sponsored Products - Auto", "Sponsored Products - Product Target", "Sponsored Products - Category Target",
                     "Sponsored Brands - Exact", "Sponsored Brands - Phrase", "Sponsored Brands - Broad", "Sponsored Brands - Product Target", "Sponsored Brands - Category Target",
@@ -28088,7 +28167,7 @@ if st.session_state.current_page == "advertising_audit":
                 brand_split_total_sales = brand_split_combined['Sales'].sum() if not brand_split_combined.empty else 0
                 
                 # Group by the combined column and aggregate
-                combined_brand_split = brand_split_combined.groupby('Brand + Ad Type & Match Type').apply(
+                combined_brand_split = brand_split_combined.groupby('Brand + Ad Type & Match Type', observed=True).apply(
                     lambda x: kpi_agg(x, brand_split_total_spend, brand_split_total_sales), 
                     include_groups=False
                 ).reset_index() if not brand_split_combined.empty else pd.DataFrame(columns=['Brand + Ad Type & Match Type'])
@@ -28332,7 +28411,7 @@ if st.session_state.current_page == "advertising_audit":
                         return
                     
                     # Aggregate across all selected product groups (or all data if none selected)
-                    agg_data = filtered_data.groupby(['Ad Type', 'Match Cat']).agg({
+                    agg_data = filtered_data.groupby(['Ad Type', 'Match Cat'], observed=True).agg({
                         'Spend': 'sum',
                         'Ad Sales': 'sum',
                         'Clicks': 'sum',
@@ -28358,10 +28437,10 @@ if st.session_state.current_page == "advertising_audit":
                     agg_data['CVR'] = agg_data.apply(lambda row: (row['Orders'] / row['Clicks']) * 100 if row['Clicks'] > 0 else 0, axis=1)
                     
                     # Create pivot tables for spend (background) and ROAS (text/border)
-                    pv_spend = agg_data.pivot_table(index='Ad Type', columns='Match Cat', values='Spend', aggfunc='sum', fill_value=0)
+                    pv_spend = agg_data.pivot_table(index='Ad Type', columns='Match Cat', values='Spend', aggfunc='sum', fill_value=0, observed=True)
                     pv_spend = pv_spend.reindex(index=y_cats, columns=x_cats).fillna(0)
                     
-                    pv_roas = agg_data.pivot_table(index='Ad Type', columns='Match Cat', values='ROAS', aggfunc='mean', fill_value=0)
+                    pv_roas = agg_data.pivot_table(index='Ad Type', columns='Match Cat', values='ROAS', aggfunc='mean', fill_value=0, observed=True)
                     pv_roas = pv_roas.reindex(index=y_cats, columns=x_cats).fillna(0)
                     
                     # Calculate account average ROAS for the current tab using filtered_data (before grouping)
@@ -28713,7 +28792,7 @@ if st.session_state.current_page == "advertising_audit":
                 bulk_data = st.session_state.get('bulk_data')
                 sales_df = st.session_state.get('sales_report_data')
                 client_cfg = st.session_state.get('client_config') or {}
-                if isinstance(bulk_data, dict) or isinstance(sales_df, pd.DataFrame):
+                if isinstance(bulk_data, Mapping) or isinstance(sales_df, pd.DataFrame):
                     try:
                         sd_attr_choice = st.session_state.get('sd_attribution_choice', 'Sales')
                         st.session_state.asin_perf_df = compute_asin_performance(
@@ -28808,7 +28887,7 @@ if st.session_state.current_page == "advertising_audit":
                                                 return
 
                                             # Aggregate by Ad Type x Match Cat
-                                            agg_data = filtered_data.groupby(['Ad Type', 'Match Cat']).agg({
+                                            agg_data = filtered_data.groupby(['Ad Type', 'Match Cat'], observed=True).agg({
                                                 'Spend': 'sum',
                                                 'Ad Sales': 'sum',
                                                 'Clicks': 'sum',
@@ -28827,9 +28906,9 @@ if st.session_state.current_page == "advertising_audit":
                                             agg_data['CPC'] = agg_data.apply(lambda row: row['Spend'] / row['Clicks'] if row['Clicks'] > 0 else 0, axis=1)
                                             agg_data['CVR'] = agg_data.apply(lambda row: (row['Orders'] / row['Clicks']) * 100 if row['Clicks'] > 0 else 0, axis=1)
 
-                                            pv_spend = agg_data.pivot_table(index='Ad Type', columns='Match Cat', values='Spend', aggfunc='sum', fill_value=0)
+                                            pv_spend = agg_data.pivot_table(index='Ad Type', columns='Match Cat', values='Spend', aggfunc='sum', fill_value=0, observed=True)
                                             pv_spend = pv_spend.reindex(index=y_cats, columns=x_cats).fillna(0)
-                                            pv_roas = agg_data.pivot_table(index='Ad Type', columns='Match Cat', values='ROAS', aggfunc='mean', fill_value=0)
+                                            pv_roas = agg_data.pivot_table(index='Ad Type', columns='Match Cat', values='ROAS', aggfunc='mean', fill_value=0, observed=True)
                                             pv_roas = pv_roas.reindex(index=y_cats, columns=x_cats).fillna(0)
 
                                             total_spend = filtered_data['Spend'].sum()
@@ -29742,41 +29821,15 @@ if st.session_state.current_page == "advertising_audit":
             total_sales_col = None
             if isinstance(sales_df, pd.DataFrame):
                 # Define the helper function for finding columns
-                def find_col_pattern(df_cols, patterns, case_sensitive=False):
-                    """Finds the first matching column name from a list."""
-                    # First try exact matches
-                    for pattern in patterns:
-                        if pattern in df_cols:
-                            return pattern
-                
-                    # Then try case-insensitive if allowed
-                    if not case_sensitive:
-                        df_cols_lower = [col.lower() for col in df_cols]
-                        for pattern in patterns:
-                            pattern_lower = pattern.lower()
-                            if pattern_lower in df_cols_lower:
-                                idx = df_cols_lower.index(pattern_lower)
-                                return df_cols[idx]  # Return original case
-                    
-                    # Finally try partial matches
-                    for pattern in patterns:
-                        pattern_lower = pattern.lower()
-                        for col in df_cols:
-                            if pattern_lower in col.lower():
-                                return col
-                
-                    # If no match found
-                    return None
             
                 # Use user-selected Total Sales metric if available, otherwise fall back to default search
                 if 'selected_total_sales_metric' in st.session_state and st.session_state.selected_total_sales_metric in sales_df.columns:
                     total_sales_col = st.session_state.selected_total_sales_metric
                 else:
-                    total_sales_col = find_col_pattern(sales_df.columns, ['Total Sales'])
+                    total_sales_col = column_resolver(sales_df).match(['Total Sales'])
 
                 # Also detect Sessions/Glance Views column for later use
-                sessions_col = find_col_pattern(
-                    sales_df.columns,
+                sessions_col = column_resolver(sales_df).match(
                     ['Sessions', 'Glance Views', 'Detail Page Views']
                 )
             else:
@@ -29835,10 +29888,11 @@ if st.session_state.current_page == "advertising_audit":
                     if isinstance(_bulk_df, pd.DataFrame) and not _bulk_df.empty:
                         dfb = _bulk_df.copy()
                         cols = list(dfb.columns)
+                        col_lookup = column_resolver(dfb)
                         # Find ASIN column (prefer exact 'ASIN', then 'ASIN (Informational Only)', else first contains 'asin')
-                        asin_col = next((c for c in cols if c.lower() == 'asin'), None)
+                        asin_col = col_lookup.get('asin')
                         if asin_col is None:
-                            asin_col = next((c for c in cols if c.lower() == 'asin (informational only)'), None)
+                            asin_col = col_lookup.get('asin (informational only)')
                         if asin_col is None:
                             asin_like = [c for c in cols if 'asin' in c.lower()]
                             asin_col = asin_like[0] if asin_like else None
@@ -29848,16 +29902,16 @@ if st.session_state.current_page == "advertising_audit":
                             dfb['ASIN_STD'] = dfb[asin_col].astype(str).str.strip().str.upper()
 
                         # Normalize selector columns
-                        prod_col = next((c for c in cols if c.lower() == 'product'), None)
-                        entity_col = next((c for c in cols if c.lower() == 'entity'), None)
-                        spend_col = next((c for c in cols if c.lower() == 'spend'), None)
-                        clicks_col = next((c for c in cols if c.lower() == 'clicks'), None)
-                        orders_col = next((c for c in cols if c.lower() == 'orders'), None)
-                        imps_col = next((c for c in cols if c.lower() == 'impressions'), None)
+                        prod_col = col_lookup.get('product')
+                        entity_col = col_lookup.get('entity')
+                        spend_col = col_lookup.get('spend')
+                        clicks_col = col_lookup.get('clicks')
+                        orders_col = col_lookup.get('orders')
+                        imps_col = col_lookup.get('impressions')
 
                         # Sales columns
-                        sales_col = next((c for c in cols if c.lower() == 'sales'), None)
-                        sd_vc_col = next((c for c in cols if 'sales (views & clicks)' in c.lower()), None)
+                        sales_col = col_lookup.get('sales')
+                        sd_vc_col = col_lookup.find('sales (views & clicks)')
 
                         mask = (dfb['ASIN_STD'].astype(str).str.len() > 0)
                         if entity_col is not None:
@@ -30567,12 +30621,8 @@ if st.session_state.current_page == "advertising_audit":
                         if isinstance(_sales_df, pd.DataFrame) and ('ASIN' in _sales_df.columns):
                             # Detect a sessions-like column (Sessions or Glance Views/Detail Page Views)
                             _cols = list(_sales_df.columns)
-                            _sess_col = None
                             # Priority: Sessions > Glance Views > Detail Page Views > any column containing 'glance'
-                            for _cand in ['Sessions', 'Glance Views', 'Detail Page Views']:
-                                if any(c.lower() == _cand.lower() for c in _cols):
-                                    _sess_col = next(c for c in _cols if c.lower() == _cand.lower())
-                                    break
+                            _sess_col = resolve_column(_sales_df, ['Sessions', 'Glance Views', 'Detail Page Views'])
                             if _sess_col is None:
                                 _glance_matches = [c for c in _cols if 'glance' in c.lower()]
                                 if _glance_matches:
@@ -35790,10 +35840,14 @@ with st.expander("📊 Application Information", expanded=False):
             if has_bulk_data:
                 st.success("✅ **Advertising Data Loaded**")
                 # Count campaigns and ad types
-                if isinstance(st.session_state.bulk_data, dict):
+                if isinstance(st.session_state.bulk_data, Mapping):
                     campaign_count = 0
                     ad_types = set()
-                    for sheet_name, df in st.session_state.bulk_data.items():
+                    info_sheets = st.session_state.bulk_data
+                    if isinstance(info_sheets, BulkWorkbook):
+                        # Summarise parsed sheets only so this panel never forces a sheet to load
+                        info_sheets = info_sheets.loaded_items()
+                    for sheet_name, df in info_sheets.items():
                         if isinstance(df, pd.DataFrame) and 'Campaign Name' in df.columns:
                             campaign_count += len(df['Campaign Name'].unique())
                         if isinstance(df, pd.DataFrame) and 'Product' in df.columns:
@@ -35803,6 +35857,11 @@ with st.expander("📊 Application Information", expanded=False):
                     st.write(f"• **{campaign_count:,} campaigns** across **{len(ad_types)} ad types**")
                     if ad_types:
                         st.write(f"• Ad types: {', '.join(sorted(ad_types))}")
+                    if isinstance(st.session_state.bulk_data, BulkWorkbook):
+                        untouched = st.session_state.bulk_data.untouched_sheets()
+                        st.write(f"• Sheets parsed: {len(st.session_state.bulk_data.loaded_sheets())} of {len(st.session_state.bulk_data)}")
+                        if untouched:
+                            st.write(f"• Never read this session: {', '.join(untouched)}")
                 
                 # Check for companion data
                 is_companion = st.session_state.get('is_companion_data', False)
@@ -35881,6 +35940,67 @@ with st.expander("📊 Application Information", expanded=False):
     
 
     
+    # === CACHE PERFORMANCE ===
+    cache_metric_rows = cache_metrics.snapshot()
+    if cache_metric_rows:
+        st.markdown("---")
+        st.markdown("#### ⚡ Cache Performance")
+        st.caption("Lookups per cached function and tier since this app process started (all sessions).")
+        
+        metrics_df = pd.DataFrame(cache_metric_rows)
+        metrics_df['MB Read'] = metrics_df['bytes_read'] / (1024 * 1024)
+        metrics_df['MB Written'] = metrics_df['bytes_written'] / (1024 * 1024)
+        metrics_df = metrics_df.rename(columns={
+            'name': 'Function', 'tier': 'Tier', 'hits': 'Hits', 'misses': 'Misses',
+            'hit_rate': 'Hit Rate %', 'p50_ms': 'p50 ms', 'p95_ms': 'p95 ms',
+            'total_seconds': 'Total s', 'codec_seconds': 'Encode/Decode s'
+        })[['Function', 'Tier', 'Hits', 'Misses', 'Hit Rate %', 'p50 ms', 'p95 ms', 'Total s',
+            'MB Read', 'MB Written', 'Encode/Decode s']]
+        st.dataframe(metrics_df.round(2), use_container_width=True, hide_index=True)
+        
+        db_cache_stats = db_manager.get_cache_stats()
+        if db_cache_stats:
+            st.write(
+                f"**Memory tier**: {db_cache_stats['memory_mb']:.1f} / {db_cache_stats['memory_budget_mb']:.0f} MB "
+                f"({db_cache_stats['memory_entries']} entries) · "
+                f"**SQLite tier**: {db_cache_stats['cache_size_mb']:.1f} / {db_cache_stats['cache_budget_mb']:.0f} MB "
+                f"({db_cache_stats['total_client_entries'] + db_cache_stats['total_analysis_entries']} entries)"
+            )
+            shared_stats = shared_data_store().stats()
+            db_cache_stats['shared_datasets'] = shared_stats
+            st.write(
+                f"**Shared datasets**: {shared_stats['datasets']} loaded once for {shared_stats['sessions']} session(s) "
+                f"({shared_stats['bytes'] / (1024 * 1024):.1f} MB; {shared_stats['reuses']} loads reused another session's copy)"
+            )
+            maintenance = db_cache_stats.get('last_maintenance')
+            if maintenance:
+                if maintenance['error']:
+                    st.caption(f"Last cache maintenance ({maintenance['started_at']}) failed: {maintenance['error']}")
+                else:
+                    st.caption(
+                        f"Last cache maintenance ({maintenance['started_at']}): "
+                        f"{sum(maintenance['rows_deleted'].values())} entries older than {maintenance['days_old']} days removed "
+                        f"({maintenance['bytes_deleted'] / (1024 * 1024):.1f} MB), {maintenance['evicted']} evicted over budget "
+                        f"({maintenance.get('bytes_evicted', 0) / (1024 * 1024):.1f} MB), "
+                        f"file {maintenance['file_bytes_reclaimed'] / (1024 * 1024):.1f} MB smaller, "
+                        f"{maintenance['seconds']:.1f}s in the background"
+                    )
+        
+        st.download_button(
+            label="⬇️ Export Cache Metrics (JSON)",
+            data=cache_metrics.to_json({'tiers': db_cache_stats, 'session': get_cache_stats()}),
+            file_name=f"cache_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            key="cache_metrics_export_btn"
+        )
+        if st.session_state.get('client_config'):
+            if st.button("🔄 Refresh Cached Analyses", key="refresh_cached_analyses_btn",
+                         help="Recompute this client's analyses instead of reusing cached results"):
+                clear_caches()
+                st.session_state.last_cache_refresh = datetime.now()
+                schedule_analysis_precompute()
+                st.rerun()
+    
     # === TECHNICAL INFORMATION FOR DEBUGGING ===
     if st.session_state.get('debug', False):
         st.markdown("---")
@@ -36102,7 +36222,11 @@ with st.expander("📊 Application Information", expanded=False):
     # Display bulk file structure if available
     if 'bulk_data' in st.session_state and st.session_state.bulk_data:
         st.markdown("#### Bulk File Structure:")
-        for sheet_name, df in st.session_state.bulk_data.items():
+        structure_sheets = st.session_state.bulk_data
+        if isinstance(structure_sheets, BulkWorkbook):
+            # Parsed sheets only: this runs on every rerun and must not force sheets to load
+            structure_sheets = structure_sheets.loaded_items()
+        for sheet_name, df in structure_sheets.items():
             if isinstance(df, pd.DataFrame) and not df.empty:
                 st.markdown(f"**Sheet: {sheet_name}** ({len(df)} rows, {len(df.columns)} columns)")
                 st.markdown("Sample columns: " + ", ".join(list(df.columns)[:10]) + (" ..." if len(df.columns) > 10 else ""))
@@ -36158,9 +36282,13 @@ add_debug_msg("SYSTEM", f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M
 # Add information about loaded data
 try:
     if 'bulk_data' in st.session_state and st.session_state.bulk_data is not None:
-        if isinstance(st.session_state.bulk_data, dict):
+        if isinstance(st.session_state.bulk_data, Mapping):
             bulk_info = []
-            for sheet_name, df in st.session_state.bulk_data.items():
+            debug_sheets = st.session_state.bulk_data
+            if isinstance(debug_sheets, BulkWorkbook):
+                # Parsed sheets only, as above
+                debug_sheets = debug_sheets.loaded_items()
+            for sheet_name, df in debug_sheets.items():
                 if isinstance(df, pd.DataFrame):
                     bulk_info.append(f"{sheet_name}: {df.shape[0]} rows, {df.shape[1]} columns")
             if bulk_info:
@@ -36215,8 +36343,12 @@ try:
     # Check bulk file for ASIN columns
     if 'bulk_data' in st.session_state and st.session_state.bulk_data is not None:
         try:
-            if isinstance(st.session_state.bulk_data, dict):
-                for sheet_name, df in st.session_state.bulk_data.items():
+            if isinstance(st.session_state.bulk_data, Mapping):
+                debug_sheets = st.session_state.bulk_data
+                if isinstance(debug_sheets, BulkWorkbook):
+                    # Parsed sheets only, as above
+                    debug_sheets = debug_sheets.loaded_items()
+                for sheet_name, df in debug_sheets.items():
                     if isinstance(df, pd.DataFrame):
                         # Check for ASIN columns
                         asin_cols = [col for col in df.columns if 'asin' in col.lower()]
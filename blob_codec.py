@@ -0,0 +1,333 @@
+"""Serialization codecs for blobs stored in the SQLite cache.
+
+Every blob written by ``encode`` starts with a short header naming the codec
+that produced it, so the codec can change without invalidating older rows:
+
+    MAGIC (4 bytes) | codec tag (1 byte) | codec payload
+
+DataFrames, and tuples/lists/dicts holding DataFrames (bulk data, analysis
+results), are written as Arrow IPC streams with zstd buffer
+compression. Anything else is pickled and compressed with a fast general
+codec. Rows written before the header existed are gzip-compressed pickles and
+still decode.
+"""
+import gzip
+import io
+import json
+import pickle
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except Exception:
+    pa = None
+
+MAGIC = b'ADB\x01'
+GZIP_MAGIC = b'\x1f\x8b'
+HEADER_SIZE = len(MAGIC) + 1
+
+# Arrow buffer compression for frames, general compression for pickles
+FRAME_COMPRESSION = 'zstd'
+GENERAL_COMPRESSION = 'zstd'
+ZLIB_LEVEL = 1
+
+# Schema metadata key listing object columns whose missing values were NaN (not None)
+NAN_COLUMNS_METADATA_KEY = b'blob_codec.nan_columns'
+
+_SIZE = struct.Struct('<Q')
+_ENTRY_HEADER = struct.Struct('<cIQ')  # entry kind, key length, payload length
+_CONTAINER_HEADER = struct.Struct('<cI')  # container kind, entry count
+
+_CONTAINER_FRAME = b'F'
+_CONTAINER_TUPLE = b'T'
+_CONTAINER_LIST = b'L'
+_CONTAINER_DICT = b'D'
+
+_ENTRY_ARROW = b'A'
+_ENTRY_PICKLED = b'P'
+
+
+class CodecError(ValueError):
+    """Raised when a blob cannot be decoded."""
+
+
+class Codec(ABC):
+    """One serialization format, identified in the blob header by ``tag``."""
+
+    name = ''
+    tag = b''
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def accepts(self, value: Any) -> bool:
+        return True
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def decode(self, payload: memoryview) -> Any:
+        ...
+
+
+class PickleCodec(Codec):
+    """Pickle (highest protocol) compressed with zstd/lz4 through pyarrow."""
+
+    def __init__(self, tag: bytes, compression: str):
+        self.tag = tag
+        self.compression = compression
+        self.name = f"pickle+{compression}"
+
+    @property
+    def available(self) -> bool:
+        return pa is not None and pa.Codec.is_available(self.compression)
+
+    def encode(self, value: Any) -> bytes:
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        compressed = pa.compress(raw, codec=self.compression, asbytes=True)
+        return _SIZE.pack(len(raw)) + compressed
+
+    def decode(self, payload: memoryview) -> Any:
+        if pa is None:
+            raise CodecError(f"{self.name} blobs need pyarrow")
+        (raw_size,) = _SIZE.unpack_from(payload)
+        raw = pa.decompress(payload[_SIZE.size:], decompressed_size=raw_size,
+                            codec=self.compression, asbytes=False)
+        return pickle.loads(raw)
+
+
+class ZlibPickleCodec(Codec):
+    """Pickle compressed with zlib at a low level; used when pyarrow is missing."""
+
+    name = 'pickle+zlib'
+    tag = b'Z'
+
+    def encode(self, value: Any) -> bytes:
+        return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ZLIB_LEVEL)
+
+    def decode(self, payload: memoryview) -> Any:
+        return pickle.loads(zlib.decompress(payload))
+
+
+def _is_string_type(arrow_type) -> bool:
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type) or pa.types.is_null(arrow_type)
+
+
+def _nan_marked(values: np.ndarray) -> Optional[bool]:
+    """For an object column: True if its missing values are all NaN, False if all None
+    (or there are none), None if they are mixed or of another kind (pd.NA, NaT)."""
+    missing = pd.isna(values)
+    if not missing.any():
+        return False
+    missing_values = values[missing]
+    nones = np.fromiter((v is None for v in missing_values), dtype=bool, count=len(missing_values))
+    if nones.all():
+        return False
+    if nones.any():
+        return None
+    if all(isinstance(v, float) for v in missing_values):
+        return True
+    return None
+
+
+class ArrowFramesCodec(Codec):
+    """DataFrames (alone or inside a tuple, list or str-keyed dict) as Arrow IPC streams.
+
+    Frames are only written this way when they round-trip exactly: string
+    column names, no duplicated columns, a non-object index, and object
+    columns that hold only text. Other frames and non-frame values inside a
+    container are pickled entry by entry.
+    """
+
+    name = f"arrow-ipc+{FRAME_COMPRESSION}"
+    tag = b'A'
+
+    def __init__(self, general: Codec):
+        self.general = general
+
+    @property
+    def available(self) -> bool:
+        return pa is not None and pa.Codec.is_available(FRAME_COMPRESSION) and self.general.available
+
+    def accepts(self, value: Any) -> bool:
+        if isinstance(value, pd.DataFrame):
+            return True
+        if isinstance(value, (tuple, list)):
+            return any(isinstance(v, pd.DataFrame) for v in value)
+        if isinstance(value, dict):
+            return (all(isinstance(k, str) for k in value)
+                    and any(isinstance(v, pd.DataFrame) for v in value.values()))
+        return False
+
+    def _frame_table(self, df: pd.DataFrame):
+        """Arrow table for ``df``, or None if it would not round-trip exactly."""
+        if not df.columns.is_unique or not all(isinstance(c, str) for c in df.columns):
+            return None
+        if df.index.dtype == object or isinstance(df.index, pd.MultiIndex):
+            return None
+        if df.attrs:
+            # attrs hold in-memory helpers (e.g. the column resolver), not data
+            df = df.copy(deep=False)
+            df.attrs = {}
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=None)
+        except (pa.ArrowException, ValueError, TypeError):
+            return None
+        nan_columns = []
+        for position, dtype in enumerate(df.dtypes):
+            if dtype != object:
+                continue
+            if not _is_string_type(table.schema.field(position).type):
+                return None
+            nan_marked = _nan_marked(df.iloc[:, position].to_numpy())
+            if nan_marked is None:
+                return None
+            if nan_marked:
+                nan_columns.append(position)
+        if nan_columns:
+            metadata = dict(table.schema.metadata or {})
+            metadata[NAN_COLUMNS_METADATA_KEY] = json.dumps(nan_columns).encode('ascii')
+            table = table.replace_schema_metadata(metadata)
+        return table
+
+    def _encode_frame(self, df: pd.DataFrame) -> Optional[bytes]:
+        table = self._frame_table(df)
+        if table is None:
+            return None
+        sink = pa.BufferOutputStream()
+        options = pa.ipc.IpcWriteOptions(compression=FRAME_COMPRESSION)
+        with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    @staticmethod
+    def _decode_frame(payload: memoryview) -> pd.DataFrame:
+        table = pa.ipc.open_stream(pa.py_buffer(payload)).read_all()
+        metadata = table.schema.metadata or {}
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        nan_columns = metadata.get(NAN_COLUMNS_METADATA_KEY)
+        if nan_columns:
+            for position in json.loads(nan_columns):
+                values = df.iloc[:, position].to_numpy(dtype=object, copy=True)
+                values[pd.isna(values)] = np.nan
+                df.isetitem(position, values)
+        return df
+
+    def _entries(self, value: Any) -> Tuple[bytes, List[Tuple[str, Any]]]:
+        if isinstance(value, pd.DataFrame):
+            return _CONTAINER_FRAME, [('', value)]
+        if isinstance(value, tuple):
+            return _CONTAINER_TUPLE, [('', v) for v in value]
+        if isinstance(value, list):
+            return _CONTAINER_LIST, [('', v) for v in value]
+        return _CONTAINER_DICT, list(value.items())
+
+    def encode(self, value: Any) -> bytes:
+        kind, entries = self._entries(value)
+        out = io.BytesIO()
+        out.write(_CONTAINER_HEADER.pack(kind, len(entries)))
+        for key, entry in entries:
+            payload = self._encode_frame(entry) if isinstance(entry, pd.DataFrame) else None
+            entry_kind = _ENTRY_ARROW
+            if payload is None:
+                payload = self.general.encode(entry)
+                entry_kind = _ENTRY_PICKLED
+            key_bytes = key.encode('utf-8')
+            out.write(_ENTRY_HEADER.pack(entry_kind, len(key_bytes), len(payload)))
+            out.write(key_bytes)
+            out.write(payload)
+        return out.getvalue()
+
+    def decode(self, payload: memoryview) -> Any:
+        if pa is None:
+            raise CodecError(f"{self.name} blobs need pyarrow")
+        kind, count = _CONTAINER_HEADER.unpack_from(payload)
+        offset = _CONTAINER_HEADER.size
+        entries = []
+        for _ in range(count):
+            entry_kind, key_size, size = _ENTRY_HEADER.unpack_from(payload, offset)
+            offset += _ENTRY_HEADER.size
+            key = bytes(payload[offset:offset + key_size]).decode('utf-8')
+            offset += key_size
+            body = payload[offset:offset + size]
+            offset += size
+            if entry_kind == _ENTRY_ARROW:
+                entries.append((key, self._decode_frame(body)))
+            else:
+                entries.append((key, self.general.decode(body)))
+        if kind == _CONTAINER_FRAME:
+            return entries[0][1]
+        if kind == _CONTAINER_TUPLE:
+            return tuple(v for _, v in entries)
+        if kind == _CONTAINER_LIST:
+            return [v for _, v in entries]
+        if kind == _CONTAINER_DICT:
+            return dict(entries)
+        raise CodecError(f"Unknown container kind {kind!r}")
+
+
+_CODECS: Dict[bytes, Codec] = {}
+# Codecs tried in order when encoding; the first available one that accepts the value wins
+_ENCODE_ORDER: List[Codec] = []
+
+
+def register_codec(codec: Codec, preferred: bool = False) -> None:
+    """Make ``codec`` available for decoding and, if available here, for encoding."""
+    if len(codec.tag) != 1:
+        raise ValueError("Codec tags are a single byte")
+    _CODECS[codec.tag] = codec
+    if preferred:
+        _ENCODE_ORDER.insert(0, codec)
+    else:
+        _ENCODE_ORDER.append(codec)
+
+
+_general_codec = PickleCodec(b'S', GENERAL_COMPRESSION)
+_zlib_codec = ZlibPickleCodec()
+register_codec(ArrowFramesCodec(_general_codec if _general_codec.available else _zlib_codec))
+register_codec(_general_codec)
+register_codec(PickleCodec(b'L', 'lz4'))
+register_codec(_zlib_codec)
+
+
+def encode(value: Any) -> bytes:
+    """Serialize ``value`` with the first codec that accepts it."""
+    for codec in _ENCODE_ORDER:
+        if codec.available and codec.accepts(value):
+            return MAGIC + codec.tag + codec.encode(value)
+    raise CodecError("No codec available")
+
+
+def codec_name(blob: bytes) -> str:
+    """Name of the codec a blob was written with ('gzip-pickle' for legacy rows)."""
+    if blob[:len(MAGIC)] == MAGIC:
+        codec = _CODECS.get(bytes(blob[len(MAGIC):HEADER_SIZE]))
+        return codec.name if codec else 'unknown'
+    if blob[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+        return 'gzip-pickle'
+    return 'unknown'
+
+
+def decode(blob: bytes) -> Any:
+    """Inverse of ``encode``; also reads legacy gzip-compressed pickles.
+
+    ``blob`` may be any bytes-like object (e.g. a bytearray from a decrypted file).
+    """
+    if blob[:len(MAGIC)] == MAGIC:
+        tag = bytes(blob[len(MAGIC):HEADER_SIZE])
+        codec = _CODECS.get(tag)
+        if codec is None:
+            raise CodecError(f"Unknown codec tag {tag!r}")
+        return codec.decode(memoryview(blob)[HEADER_SIZE:])
+    if blob[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+        return pickle.loads(gzip.decompress(blob))
+    raise CodecError("Unrecognized blob format")
@@ -0,0 +1,341 @@
+"""Branded / non-branded classification of bulk targeting rows and search terms.
+
+A client's branded terms and ASINs are compiled once into a ``BrandedMatcher``
+(a trie-shaped regex run by the C regex engine), so checking a keyword, target
+or search term is one pass over the text however many brand variants the
+client has. ``client_branded_matcher`` hands out one shared matcher per client
+config.
+
+``TermClassifier`` memoizes the verdict for each distinct search term, keyword
+or target string (per client, branded-config fingerprint and attribution), so
+the sections that classify the same strings again only pay for a dict lookup.
+
+``classify_targets`` classifies whole columns at once: keyword rows are
+branded when their text contains a branded term, product targeting rows when
+their expression contains a branded ASIN (and is not an 'expanded' target).
+Sponsored Display exact-product targets are always branded.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import FrozenSet, Iterable, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from column_schema import column_resolver
+
+# Reason codes, one per classification outcome
+REASON_KEYWORD_TERM = 'keyword_matched_term'
+REASON_KEYWORD_NO_MATCH = 'keyword_no_match'
+REASON_SD_EXACT_PRODUCT = 'sd_exact_product'
+REASON_ASIN_MATCH = 'asin_matched'
+REASON_ASIN_EXPANDED = 'asin_matched_expanded'
+REASON_ASIN_NO_MATCH = 'asin_no_match'
+REASON_NO_TARGET = 'no_target'
+
+REASON_CODES = [
+    REASON_KEYWORD_TERM,
+    REASON_KEYWORD_NO_MATCH,
+    REASON_SD_EXACT_PRODUCT,
+    REASON_ASIN_MATCH,
+    REASON_ASIN_EXPANDED,
+    REASON_ASIN_NO_MATCH,
+    REASON_NO_TARGET,
+]
+
+PRODUCT_EXPRESSION_COLUMNS = ['Product Targeting Expression', 'Targeting Expression']
+
+ASIN_PATTERN = re.compile(r'B[0-9A-Z]{9}')
+
+# Term-level reasons, in order of precedence
+TERM_REASON_BRANDED_ASIN = 'branded_asin'
+TERM_REASON_EXACT_TERM = 'exact_term'
+TERM_REASON_BRANDED_TERM = 'branded_term'
+TERM_REASON_NO_MATCH = 'no_match'
+
+# Distinct strings memoized per client before the cache starts over
+MAX_TERM_CACHE_ENTRIES = 500000
+MAX_TERM_CLASSIFIERS = 8
+
+
+def _trie_regex(words: Iterable[str]) -> Optional['re.Pattern']:
+    """Regex matching any of ``words``, with shared prefixes merged into one branch."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    if not trie:
+        return None
+
+    def build(node) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        ends_here = '' in node
+        if len(branches) == 1 and not ends_here:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')' + ('?' if ends_here else '')
+
+    return re.compile(build(trie))
+
+
+def _split_setting(value) -> list:
+    """Config value that may be a list or a comma separated string, as a list."""
+    if isinstance(value, str):
+        return value.split(',')
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return []
+
+
+class BrandedMatcher:
+    """One client's branded terms and ASINs, compiled for repeated matching.
+
+    Terms are lower-cased and ASINs upper-cased; duplicates and blanks are
+    dropped, configured order is kept.
+    """
+
+    __slots__ = ('terms', 'asins', 'asin_set', 'fingerprint', '_term_set', '_term_regex')
+
+    def __init__(self, terms: Iterable = (), asins: Iterable = ()):
+        self.terms = tuple(dict.fromkeys(t for t in (str(x).strip().lower() for x in terms if x is not None) if t))
+        self.asins = tuple(dict.fromkeys(a for a in (str(x).strip().upper() for x in asins if x is not None) if a))
+        self.asin_set = frozenset(self.asins)
+        self.fingerprint = hashlib.md5(
+            '\n'.join(sorted(self.terms)).encode('utf-8') + b'\0' + '\n'.join(sorted(self.asins)).encode('utf-8')
+        ).hexdigest()
+        self._term_set = frozenset(self.terms)
+        self._term_regex = _trie_regex(self.terms)
+
+    def __bool__(self) -> bool:
+        return bool(self.terms or self.asins)
+
+    def is_term(self, text: str) -> bool:
+        """``text`` is exactly one of the branded terms (case-insensitive)."""
+        return text.lower() in self._term_set
+
+    def find_term(self, text: str) -> Optional[str]:
+        """A branded term contained in ``text`` (case-insensitive), else None."""
+        if self._term_regex is None:
+            return None
+        match = self._term_regex.search(text.lower())
+        return match.group(0) if match else None
+
+    def contains_term(self, text: str) -> bool:
+        return self.find_term(text) is not None
+
+    def contains_asin(self, text: str) -> bool:
+        """A branded ASIN appears anywhere in ``text``, even inside a longer token."""
+        return any(asin in text for asin in self.asins)
+
+    def find_asins(self, text: str) -> Set[str]:
+        """Every ASIN-shaped token in ``text``, upper-cased."""
+        return set(ASIN_PATTERN.findall(text.upper()))
+
+
+@lru_cache(maxsize=32)
+def _cached_matcher(terms: Tuple[str, ...], asins: Tuple[str, ...]) -> BrandedMatcher:
+    return BrandedMatcher(terms, asins)
+
+
+def branded_matcher(terms: Iterable = (), asins: Iterable = ()) -> BrandedMatcher:
+    """Shared matcher for these terms and ASINs; built once, then reused."""
+    return _cached_matcher(
+        tuple(str(t) for t in (terms or ()) if t is not None),
+        tuple(str(a) for a in (asins or ()) if a is not None),
+    )
+
+
+def client_branded_matcher(client_config) -> BrandedMatcher:
+    """Shared matcher for a client config.
+
+    Terms come from the 'branded_keywords' list the client settings edit, or
+    the legacy 'Branded Terms' setting (list or comma separated) for configs
+    without it; ASINs from 'branded_asins_data' or the older 'Branded ASINs'
+    setting.
+    """
+    if not client_config:
+        return branded_matcher()
+    if 'branded_keywords' in client_config:
+        terms = _split_setting(client_config.get('branded_keywords'))
+    else:
+        terms = _split_setting(client_config.get('Branded Terms'))
+    if 'branded_asins_data' in client_config:
+        asins = list((client_config.get('branded_asins_data') or {}).keys())
+    else:
+        asins = _split_setting(client_config.get('Branded ASINs'))
+    return branded_matcher(terms, asins)
+
+
+class TermClassification(NamedTuple):
+    """Branded verdict for one search term, keyword or target string."""
+    is_branded: bool
+    asins: FrozenSet[str]          # ASIN-shaped tokens in the text, upper-cased
+    branded_asins: FrozenSet[str]  # the ones that are branded
+    term: Optional[str]            # a branded term contained in the text
+    exact_term: bool               # the text is itself a branded term
+    reason: str
+
+
+class TermClassifier:
+    """Memoized ``TermClassification`` per normalized text for one branded config.
+
+    Text is normalized by stripping and lower-casing, so the same term typed
+    in different case is classified once.
+    """
+
+    def __init__(self, matcher: BrandedMatcher, max_entries: int = MAX_TERM_CACHE_ENTRIES):
+        self.matcher = matcher
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+
+    @staticmethod
+    def normalize(text) -> str:
+        if text is None or (isinstance(text, float) and text != text):
+            return ''
+        return str(text).strip().lower()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def classify(self, text) -> TermClassification:
+        key = self.normalize(text)
+        result = self._cache.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = self._classify(key)
+        if len(self._cache) >= self.max_entries:
+            self._cache.clear()
+        self._cache[key] = result
+        return result
+
+    def _classify(self, key: str) -> TermClassification:
+        asins = frozenset(ASIN_PATTERN.findall(key.upper()))
+        branded_asins = asins & self.matcher.asin_set
+        term = self.matcher.find_term(key)
+        exact_term = self.matcher.is_term(key)
+        if branded_asins:
+            reason = TERM_REASON_BRANDED_ASIN
+        elif exact_term:
+            reason = TERM_REASON_EXACT_TERM
+        elif term is not None:
+            reason = TERM_REASON_BRANDED_TERM
+        else:
+            reason = TERM_REASON_NO_MATCH
+        return TermClassification(bool(branded_asins) or term is not None, asins, branded_asins, term, exact_term, reason)
+
+    def mask(self, values: pd.Series, field: str = 'is_branded') -> pd.Series:
+        """Boolean Series: is ``field`` of each value's classification set?
+
+        Each distinct value is classified (or looked up) once; rows are then
+        filled in with a vectorized map.
+        """
+        if values.empty:
+            return pd.Series(False, index=values.index)
+        values = values.astype(object)
+        lookup = {value: bool(getattr(self.classify(value), field)) for value in pd.unique(values)}
+        return values.map(lookup).fillna(False).astype(bool)
+
+    def stats(self) -> dict:
+        return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+
+_term_classifiers: 'OrderedDict[tuple, TermClassifier]' = OrderedDict()
+_term_classifiers_lock = threading.Lock()
+
+
+def term_classifier(client_config, attribution: Optional[str] = None) -> TermClassifier:
+    """The shared memoizing classifier for a client config and attribution choice.
+
+    Keyed by client name, the fingerprint of the branded terms and ASINs and
+    the attribution, so editing the branded settings starts a fresh cache.
+    """
+    matcher = client_branded_matcher(client_config)
+    client_name = (client_config or {}).get('client_name') if isinstance(client_config, dict) else None
+    key = (client_name, matcher.fingerprint, attribution)
+    with _term_classifiers_lock:
+        classifier = _term_classifiers.get(key)
+        if classifier is None:
+            classifier = TermClassifier(matcher)
+            _term_classifiers[key] = classifier
+            while len(_term_classifiers) > MAX_TERM_CLASSIFIERS:
+                _term_classifiers.popitem(last=False)
+        else:
+            _term_classifiers.move_to_end(key)
+    return classifier
+
+
+def _present(series: pd.Series) -> pd.Series:
+    """Mask of values that are set: not missing and not an empty string."""
+    return series.notna() & series.astype(str).ne('')
+
+
+def target_expression(df: pd.DataFrame) -> pd.Series:
+    """Product targeting expression per row.
+
+    'Product Targeting Expression' where it is set, otherwise 'Targeting
+    Expression'; NaN when neither is.
+    """
+    expression = pd.Series(np.nan, index=df.index, dtype=object)
+    for name in reversed(PRODUCT_EXPRESSION_COLUMNS):
+        col = column_resolver(df).get(name)
+        if col is None:
+            continue
+        values = df[col].astype(object)
+        expression = values.where(_present(values), expression)
+    return expression
+
+
+def classify_targets(df: pd.DataFrame, classifier: TermClassifier,
+                     sponsored_display: bool = False) -> Tuple[pd.Series, pd.Series]:
+    """Classify Keyword / Product Targeting rows as branded.
+
+    Returns ``(is_branded, reason)`` aligned with ``df.index``: a boolean Series
+    and a categorical Series of ``REASON_CODES``. Keyword text is checked for
+    branded terms, product expressions for branded ASINs.
+    """
+    kw_col = column_resolver(df).get('Keyword Text')
+    if kw_col is not None:
+        keyword = df[kw_col].astype(object)
+        is_keyword = keyword.notna()
+    else:
+        keyword = pd.Series(np.nan, index=df.index, dtype=object)
+        is_keyword = pd.Series(False, index=df.index)
+
+    expression = target_expression(df)
+    is_product = ~is_keyword & expression.notna()
+
+    term_match = classifier.mask(keyword[is_keyword], 'term').reindex(df.index, fill_value=False)
+
+    expression_text = expression[is_product].astype(str)
+    expression_lower = expression_text.str.lower()
+    # Substring test, not ASIN tokens: '..._B0ABC123XY' style expressions still match
+    asin_lookup = {value: classifier.matcher.contains_asin(value) for value in pd.unique(expression_text)}
+    asin_match = expression_text.map(asin_lookup).astype(bool).reindex(df.index, fill_value=False)
+    expanded = expression_lower.str.contains('expanded', regex=False).reindex(df.index, fill_value=False)
+    if sponsored_display:
+        exact_product = expression_lower.str.contains('exact-product', regex=False).reindex(df.index, fill_value=False)
+    else:
+        exact_product = pd.Series(False, index=df.index)
+
+    conditions = [
+        is_keyword & term_match,
+        is_keyword,
+        is_product & exact_product,
+        is_product & asin_match & ~expanded,
+        is_product & asin_match,
+        is_product,
+    ]
+    reason = np.select(conditions, REASON_CODES[:-1], default=REASON_NO_TARGET)
+    reason = pd.Series(pd.Categorical(reason, categories=REASON_CODES), index=df.index)
+    is_branded = reason.isin([REASON_KEYWORD_TERM, REASON_SD_EXACT_PRODUCT, REASON_ASIN_MATCH])
+    return is_branded, reason
@@ -0,0 +1,856 @@
+"""Streaming, lazily loaded reader for Amazon Ads bulk workbooks.
+
+Bulk files for large accounts run to hundreds of MB. Rather than letting
+``pd.read_excel`` materialise every cell of every sheet, this module walks each
+sheet with openpyxl's read-only ``iter_rows`` and builds the DataFrame in
+fixed-size chunks, keeping only the columns the dashboard reads and casting
+metric columns as each chunk is built. ``BulkWorkbook`` wraps this in a
+mapping that only parses a sheet the first time something asks for it, and can
+hand the heavy sheets to a process pool so they are parsed on several cores.
+Parsed sheets are kept in an on-disk Arrow ingest cache (``BulkIngestCache``),
+so re-opening the same file memory-maps sheets instead of parsing XML again.
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from itertools import count
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections.abc import MutableMapping
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from column_schema import apply_schema, column_resolver
+from data_fingerprint import value_fingerprint
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as pa_feather
+except Exception:
+    pa = None
+    pa_feather = None
+
+# Sheets whose names contain any of these tokens are never read
+EXCLUDED_SHEET_TOKENS = ('RAS', 'Portfolio')
+
+# Bulk export columns that no dashboard section reads (compared lower-case).
+# Dropping them at read time keeps ingest cost proportional to what we use.
+SKIPPED_COLUMNS = frozenset(col.lower() for col in [
+    'Native Language Keyword',
+    'Native Language Locale',
+    'Eligibility Status (Informational only)',
+    'Reason for Ineligibility (Informational only)',
+    'Resolved Product Targeting Expression (Informational only)',
+    'Resolved Targeting Expression (Informational only)',
+    'Campaign Serving Status (Informational only)',
+    'Ad Group State (Informational only)',
+    'Ad Format (Informational only)',
+    'Landing Page Type (Informational only)',
+    'Landing Page URL',
+    'Landing Page ASINs',
+    'Brand Entity ID',
+    'Brand Name',
+    'Brand Logo Asset ID',
+    'Brand Logo URL (Informational only)',
+    'Custom Image Asset ID',
+    'Video Media IDs',
+    'Creative Headline',
+    'Draft Campaign ID',
+    'End Date',
+])
+
+# Metric columns cast to numbers while each chunk is built
+NUMERIC_COLUMNS = (
+    'Impressions', 'Clicks', 'Spend', 'Orders', 'Total Sales', 'Sales', 'ROAS',
+    'Cost Per Click (CPC)', 'Click-Thru Rate (CTR)',
+    '7 Day Total Orders (#)', '7 Day Total Sales', 'Sales (Views & Clicks)'
+)
+
+DEFAULT_CHUNK_ROWS = 50000
+
+# Environment override for the number of ingest worker processes
+INGEST_WORKERS_ENV = 'BULK_INGEST_WORKERS'
+MAX_DEFAULT_INGEST_WORKERS = 8
+# Below this workbook size, starting worker processes costs more than it saves
+MIN_PARALLEL_SOURCE_BYTES = 2 * 1024 * 1024
+
+
+def is_excluded_sheet(sheet_name: str) -> bool:
+    """Return True for sheets the dashboard never reads (RAS, Portfolio)."""
+    return any(token in sheet_name for token in EXCLUDED_SHEET_TOKENS)
+
+
+def open_workbook(source: Any):
+    """Open a bulk workbook in read-only mode from a path, bytes or file-like object."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    elif hasattr(source, 'seek'):
+        source.seek(0)
+    return load_workbook(source, read_only=True, data_only=True, keep_links=False)
+
+
+def _header_names(header_row: Sequence[Any]) -> List[str]:
+    """Name header cells the same way pandas does (blank -> 'Unnamed: n', duplicates -> 'X.1')."""
+    names = []
+    seen = {}
+    for i, value in enumerate(header_row):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == '' else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _build_chunk(rows: List[tuple], columns: List[str], numeric_columns: Iterable[str]) -> pd.DataFrame:
+    """Turn a block of row tuples into a DataFrame with metric columns already numeric."""
+    chunk = pd.DataFrame.from_records(rows, columns=columns)
+    for col in numeric_columns:
+        if col in chunk.columns and chunk[col].dtype == object:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+    return chunk
+
+
+def read_sheet(workbook, sheet_name: str,
+               skip_columns: Optional[Iterable[str]] = SKIPPED_COLUMNS,
+               numeric_columns: Iterable[str] = NUMERIC_COLUMNS,
+               chunk_rows: int = DEFAULT_CHUNK_ROWS) -> pd.DataFrame:
+    """Stream one sheet into a DataFrame, projecting away skipped columns.
+
+    Rows are pulled with ``iter_rows(values_only=True)`` and converted in blocks of
+    ``chunk_rows`` so peak memory is bounded by the kept columns rather than the
+    whole sheet. Trailing blank rows are dropped, matching ``pd.read_excel``.
+    """
+    ws = workbook[sheet_name]
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+
+    names = _header_names(header)
+    skip = {c.lower() for c in skip_columns} if skip_columns else set()
+    keep_idx = [i for i, name in enumerate(names) if name.lower() not in skip]
+    columns = [names[i] for i in keep_idx]
+    if not keep_idx:
+        return pd.DataFrame()
+
+    numeric_columns = [c for c in numeric_columns if c in columns]
+    width = max(keep_idx) + 1
+    pick = itemgetter(*keep_idx)
+    single = len(keep_idx) == 1
+
+    chunks = []
+    buffer = []
+    pending_blank = []
+    for row in rows:
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+        values = (pick(row),) if single else pick(row)
+        if all(v is None or v == '' for v in values):
+            # Hold blank rows back until we know they are not trailing
+            pending_blank.append(values)
+            continue
+        if pending_blank:
+            buffer.extend(pending_blank)
+            pending_blank = []
+        buffer.append(values)
+        if len(buffer) >= chunk_rows:
+            chunks.append(_build_chunk(buffer, columns, numeric_columns))
+            buffer = []
+    if buffer:
+        chunks.append(_build_chunk(buffer, columns, numeric_columns))
+
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+    # Columns that were blank in some chunks come back as object; settle them once
+    df = df.infer_objects()
+    for col in df.columns[(df.dtypes == object).to_numpy()]:
+        if df[col].isna().all():
+            # Entirely blank columns read as NaN floats, as pd.read_excel does
+            df[col] = float('nan')
+    return df
+
+
+
+# --- Campaign sheet normalisation ---
+
+# Canonical keys the rest of the app reads campaign data from
+SP_CAMPAIGNS = 'Sponsored Products Campaigns'
+SB_CAMPAIGNS = 'Sponsored Brands Campaigns'
+SD_CAMPAIGNS = 'Sponsored Display Campaigns'
+SB_MULTI_CAMPAIGNS = 'SB Multi Ad Group Campaigns'
+CAMPAIGN_SHEET_KEYS = (SP_CAMPAIGNS, SB_CAMPAIGNS, SD_CAMPAIGNS)
+
+AUTO_TARGETING_EXPRESSIONS = {'loose-match', 'close-match', 'complements', 'compliments', 'substitutes'}
+
+
+def _noop_log(_msg: str) -> None:
+    pass
+
+
+def prepare_campaign_sheet(df: pd.DataFrame, sheet_name: str,
+                           log: Callable[[str], None] = _noop_log) -> pd.DataFrame:
+    """Apply the campaign-level cleaning every SP/SB/SD campaign sheet gets at ingest.
+
+    Coerces metric columns, standardises 'Campaign Name', tags 'Campaign Type' and
+    normalises Auto targeting rows. Returns a new DataFrame.
+    """
+    df = df.copy()
+
+    # Ensure required numeric columns exist and handle potential errors
+    for col_pattern in NUMERIC_COLUMNS:
+        if col_pattern in df.columns:
+            df[col_pattern] = pd.to_numeric(df[col_pattern], errors='coerce').fillna(0)
+
+    # Convert column names to strings
+    df.columns = df.columns.astype(str)
+
+    # Rename columns for consistency
+    # Do not rename 'Sales' to 'Total Sales' as these are different metrics
+    # 'Sales' in bulk file refers to ad-attributed sales
+    # 'Total Sales' should only come from the sales report
+    if 'Campaign' in df.columns and 'Campaign Name' not in df.columns:
+        df = df.rename(columns={'Campaign': 'Campaign Name'})
+
+    # Add campaign type efficiently
+    if 'Sponsored Product' in sheet_name:
+        campaign_type = 'SP'
+    elif 'Sponsored Brand' in sheet_name or sheet_name.lower() == SB_MULTI_CAMPAIGNS.lower():
+        campaign_type = 'SB'
+    elif 'Sponsored Display' in sheet_name:
+        campaign_type = 'SD'
+    else:
+        campaign_type = 'Unknown'
+
+    df['Campaign Type'] = campaign_type
+
+    # Fix Auto targeting classification for all campaign types
+    # When Targeting Type = 'Auto', ensure Match Type and Targeting Type are correctly set
+    if 'Targeting Type' in df.columns:
+        auto_mask = df['Targeting Type'].fillna('').astype(str).str.strip().str.lower() == 'auto'
+        if auto_mask.any():
+            # Ensure Match Type='Auto' and preserve/normalize Targeting Type; do not alter Entity
+            df.loc[auto_mask, 'Match Type'] = 'Auto'
+            df.loc[auto_mask, 'Targeting Type'] = 'Auto'  # Explicitly preserve Targeting Type
+            log(
+                f"[Auto Targeting Fix] Corrected {int(auto_mask.sum())} rows with Targeting Type='Auto' "
+                f"in {sheet_name} (set Match Type='Auto', Targeting Type='Auto'; Entity unchanged)"
+            )
+
+    # Additionally, precisely map SP Auto targets for bulk files
+    # Criteria: Product='Sponsored Products' AND Entity='Product Targeting' AND
+    # Product Targeting Expression in AUTO_TARGETING_EXPRESSIONS (case-insensitive)
+    if campaign_type == 'SP':
+        col_map = {c.lower(): c for c in df.columns}
+        product_col = col_map.get('product')
+        entity_col = col_map.get('entity')
+        pte_col = col_map.get('product targeting expression')
+        if product_col and entity_col and pte_col:
+            prod_ser = df[product_col].fillna('').astype(str).str.strip().str.lower()
+            entity_ser = df[entity_col].fillna('').astype(str).str.strip().str.lower()
+            pte_ser = df[pte_col].fillna('').astype(str).str.strip().str.lower()
+            mask = (
+                (prod_ser == 'sponsored products') &
+                (entity_ser == 'product targeting') &
+                (pte_ser.isin(AUTO_TARGETING_EXPRESSIONS))
+            )
+            if mask.any():
+                df.loc[mask, 'Match Type'] = 'Auto'
+                if 'Targeting Type' in df.columns:
+                    df.loc[mask, 'Targeting Type'] = 'Auto'
+                log(
+                    f"[Auto Target Mapping] Set Match Type='Auto' for {int(mask.sum())} SP rows based on Product='Sponsored Products', "
+                    f"Entity='Product Targeting' and PTE auto terms in {sheet_name}"
+                )
+
+    return df
+
+
+def plan_bulk_sheets(sheet_names: Sequence[str],
+                     log: Callable[[str], None] = _noop_log) -> Dict[str, Tuple[str, bool]]:
+    """Map bulk_data keys to (source sheet, needs campaign processing).
+
+    Campaign sheets are exposed under their canonical keys, matched
+    case-insensitively. When an 'SB Multi Ad Group Campaigns' sheet exists it
+    supplies the Sponsored Brands data and the original Multi sheet key is dropped
+    so SB is never double counted. RAS and Portfolio sheets are left out.
+    """
+    def find_actual_sheet_name(target_name):
+        target_lower = target_name.lower()
+        return next((name for name in sheet_names if name.lower() == target_lower), None)
+
+    sp_sheet = find_actual_sheet_name(SP_CAMPAIGNS)
+    sb_multi_sheet = find_actual_sheet_name(SB_MULTI_CAMPAIGNS)
+    sb_standard_sheet = find_actual_sheet_name(SB_CAMPAIGNS)
+    sd_sheet = find_actual_sheet_name(SD_CAMPAIGNS)
+
+    if sb_multi_sheet:
+        log("Found 'SB Multi Ad Group Campaigns' sheet - will use this for Sponsored Brands data")
+    if sb_standard_sheet:
+        if sb_multi_sheet:
+            log("Also found 'Sponsored Brands Campaigns' sheet - will be ignored in favor of Multi Ad Group data")
+        else:
+            log("Found 'Sponsored Brands Campaigns' sheet")
+
+    plan = {}
+    for sheet_name in sheet_names:
+        if is_excluded_sheet(sheet_name):
+            log(f"Skipping sheet: {sheet_name} (contains 'RAS' or 'Portfolio')")
+            continue
+        plan[sheet_name] = (sheet_name, False)
+
+    if sp_sheet:
+        plan[SP_CAMPAIGNS] = (sp_sheet, True)
+    if sb_multi_sheet:
+        # Represent SB data under the normalized key only to prevent double counting
+        plan[SB_CAMPAIGNS] = (sb_multi_sheet, True)
+        plan.pop(sb_multi_sheet, None)
+    elif sb_standard_sheet:
+        plan[SB_CAMPAIGNS] = (sb_standard_sheet, True)
+    if sd_sheet:
+        plan[SD_CAMPAIGNS] = (sd_sheet, True)
+    return plan
+
+
+def ingest_worker_count(configured: Any = None) -> int:
+    """Number of processes to parse bulk sheets with; 1 means serial.
+
+    Uses ``configured`` when given, then the BULK_INGEST_WORKERS environment
+    variable, then the CPU count (capped at 8). The PyInstaller build always
+    parses serially because frozen executables cannot safely spawn workers.
+    """
+    if getattr(sys, 'frozen', False):
+        return 1
+    if configured in (None, ''):
+        configured = os.environ.get(INGEST_WORKERS_ENV)
+    try:
+        workers = int(configured) if configured not in (None, '') else 0
+    except (TypeError, ValueError):
+        workers = 0
+    if workers <= 0:
+        workers = min(os.cpu_count() or 1, MAX_DEFAULT_INGEST_WORKERS)
+    return max(1, workers)
+
+
+def is_prefetch_sheet(key: str, is_campaign_sheet: bool) -> bool:
+    """Sheets worth parsing up front: the SP/SB/SD campaign sheets and search term reports."""
+    return is_campaign_sheet or 'search term' in key.lower()
+
+
+def _parse_sheet(workbook, sheet_name: str, is_campaign_sheet: bool,
+                 log: Callable[[str], None]) -> pd.DataFrame:
+    log(f"Processing sheet: {sheet_name}")
+    try:
+        df = read_sheet(workbook, sheet_name)
+    except Exception as e:
+        log(f"Error processing sheet {sheet_name}: {str(e)}")
+        return pd.DataFrame()
+    log(f"Added sheet {sheet_name} to bulk_data dictionary ({len(df)} rows, {len(df.columns)} columns)")
+    if is_campaign_sheet:
+        log(f"Applying campaign processing to sheet: {sheet_name}")
+        try:
+            df = prepare_campaign_sheet(df, sheet_name, log)
+            log(f"Applied campaign processing to {sheet_name}: {len(df)} rows")
+        except Exception as e:
+            log(f"Error applying campaign processing to sheet '{sheet_name}': {str(e)}")
+    # Typed once here; the ingest cache stores these dtypes as-is
+    return apply_schema(df)
+
+
+def _parse_sheet_in_worker(path: str, sheet_name: str,
+                           is_campaign_sheet: bool) -> Tuple[pd.DataFrame, List[str]]:
+    """Process-pool entry point: parse one sheet from the spilled workbook file.
+
+    Log lines are returned rather than emitted so the parent can replay them
+    into the session debug log.
+    """
+    messages: List[str] = []
+    workbook = open_workbook(path)
+    try:
+        df = _parse_sheet(workbook, sheet_name, is_campaign_sheet, messages.append)
+    finally:
+        workbook.close()
+    return df, messages
+
+
+# Edit revisions are unique across workbooks, so two session views with different edits never share a cache token
+_revisions = count(1)
+
+
+class BulkWorkbook(MutableMapping):
+    """Mapping of bulk_data sheet keys to DataFrames that parses each sheet on first access.
+
+    Behaves like the ``dict`` that ``process_bulk_data`` used to return, but a sheet
+    is only streamed from the workbook (and campaign-processed) the first time it is
+    read. Parsed sheets are cached for the life of the object, and
+    ``untouched_sheets()`` reports which ones a session never needed.
+    """
+
+    def __init__(self, source: bytes, plan: Dict[str, Tuple[str, bool]],
+                 log: Callable[[str], None] = _noop_log,
+                 ingest_cache: Optional['BulkIngestCache'] = None,
+                 source_hash: Optional[str] = None):
+        self._source = source
+        self._plan = dict(plan)
+        self._keys = list(plan)
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._accessed = set()
+        # Keys whose frame was assigned after opening rather than parsed from the source
+        self._replaced = set()
+        self._log = log
+        self._ingest_cache = ingest_cache
+        self._workbook = None
+        self._pending: Dict[str, Future] = {}
+        self._revision = 0
+        # The workbook a session view reads unedited sheets from (see session_view)
+        self._parent: Optional['BulkWorkbook'] = None
+        self._lock = threading.RLock()
+        self.source_hash = source_hash or hashlib.md5(source).hexdigest()
+        # True when the sheet index came from the ingest cache rather than the workbook
+        self.from_ingest_cache = False
+
+    @classmethod
+    def open(cls, source: Any, log: Callable[[str], None] = _noop_log,
+             ingest_cache: Optional['BulkIngestCache'] = None) -> 'BulkWorkbook':
+        """Index a bulk workbook without parsing any sheet data.
+
+        When ``ingest_cache`` already holds this file, the sheet index comes from its
+        manifest and sheets are read from the cache; otherwise parsed sheets are
+        added to it as they load.
+        """
+        if hasattr(source, 'read'):
+            source.seek(0)
+            source = source.read()
+        source_hash = hashlib.md5(source).hexdigest()
+        if ingest_cache is not None:
+            plan = ingest_cache.load_plan(source_hash)
+            if plan is not None:
+                log(f"[Bulk File Processing] Using ingest cache for {len(plan)} sheets ({source_hash[:8]})")
+                bulk_workbook = cls(source, plan, log=log, ingest_cache=ingest_cache, source_hash=source_hash)
+                bulk_workbook.from_ingest_cache = True
+                return bulk_workbook
+        workbook = open_workbook(source)
+        try:
+            sheet_names = workbook.sheetnames
+            log(f"[Bulk File Processing] Found {len(sheet_names)} sheets in bulk file: {', '.join(sheet_names)}")
+            non_empty = []
+            for sheet_name in sheet_names:
+                # The <dimension> tag is read without touching row data; unsized sheets are kept
+                max_row = workbook[sheet_name].max_row
+                if max_row is not None and max_row <= 1:
+                    log(f"Sheet {sheet_name} is empty, skipping")
+                    continue
+                non_empty.append(sheet_name)
+        finally:
+            workbook.close()
+        plan = plan_bulk_sheets(non_empty, log)
+        if ingest_cache is not None:
+            ingest_cache.save_plan(source_hash, plan)
+        return cls(source, plan, log=log, ingest_cache=ingest_cache, source_hash=source_hash)
+
+    # --- Mapping protocol ---
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        with self._lock:
+            self._accessed.add(key)
+            if key in self._frames:
+                return self._frames[key]
+            if key not in self._plan:
+                raise KeyError(key)
+            if self._parent is not None:
+                # Parsed once by the shared workbook; the view gets its own frame over the same columns
+                df = self._parent[key].copy(deep=False)
+            else:
+                df = self._load(key)
+            column_resolver(df)
+            self._frames[key] = df
+            self._release_if_complete()
+            return df
+
+    def __setitem__(self, key: str, value: pd.DataFrame) -> None:
+        with self._lock:
+            if key not in self._plan and key not in self._frames:
+                self._keys.append(key)
+            self._plan.pop(key, None)
+            self._discard_pending(key)
+            self._frames[key] = value
+            self._replaced.add(key)
+            self._revision = next(_revisions)
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            if key not in self._plan and key not in self._frames:
+                raise KeyError(key)
+            self._plan.pop(key, None)
+            self._discard_pending(key)
+            self._frames.pop(key, None)
+            self._replaced.discard(key)
+            self._keys.remove(key)
+            self._revision = next(_revisions)
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._plan or key in self._frames
+
+    def __repr__(self) -> str:
+        return (f"BulkWorkbook({self.source_hash[:8]}, {len(self._keys)} sheets, "
+                f"{len(self.loaded_sheets())} loaded, rev {self._revision})")
+
+    def __reduce__(self):
+        # Pickled copies (e.g. the SQLite cache) are plain, fully parsed dicts
+        return (dict, (self.to_dict(),))
+
+    # --- Lazy loading ---
+
+    def _load(self, key: str) -> pd.DataFrame:
+        if self._ingest_cache is not None:
+            df = self._ingest_cache.read_sheet(self.source_hash, key, log=self._log)
+            if df is not None:
+                return df
+        df = self._parse(key)
+        if self._ingest_cache is not None:
+            self._ingest_cache.write_sheet(self.source_hash, key, df, log=self._log)
+        return df
+
+    def _parse(self, key: str) -> pd.DataFrame:
+        sheet_name, is_campaign_sheet = self._plan[key]
+        future = self._pending.pop(key, None)
+        if future is not None:
+            try:
+                df, messages = future.result()
+                for message in messages:
+                    self._log(message)
+                return df
+            except Exception as e:
+                self._log(f"[Bulk File Processing] Parallel parse of {sheet_name} failed ({str(e)}), parsing serially")
+        if self._workbook is None:
+            self._workbook = open_workbook(self._source)
+        return _parse_sheet(self._workbook, sheet_name, is_campaign_sheet, self._log)
+
+    def read_columns(self, key: str, columns: Sequence[str]) -> pd.DataFrame:
+        """Just ``columns`` of one sheet (missing ones are ignored).
+
+        Served from the loaded frame when there is one, else straight from the
+        ingest cache without loading the rest of the sheet.
+        """
+        with self._lock:
+            if self._parent is not None and key not in self._frames and key in self._plan:
+                self._accessed.add(key)
+                return self._parent.read_columns(key, columns)
+            if key not in self._frames and key not in self._pending and self._ingest_cache is not None:
+                self._accessed.add(key)
+                df = self._ingest_cache.read_sheet(self.source_hash, key, columns=columns, log=self._log)
+                if df is not None:
+                    return df
+            df = self[key]
+            return df[[c for c in columns if c in df.columns]]
+
+    def prefetch(self, workers: int, keys: Optional[Iterable[str]] = None) -> List[str]:
+        """Start parsing sheets in ``workers`` processes; returns the keys submitted.
+
+        Defaults to the campaign and search term sheets. Results are collected when
+        a sheet is first read, so callers keep using the mapping as before. With
+        fewer than two workers or sheets, or a small workbook, nothing is submitted
+        and the sheets stay lazy.
+        """
+        with self._lock:
+            if self._parent is not None:
+                if keys is None:
+                    keys = [k for k, (_, is_campaign) in self._plan.items() if is_prefetch_sheet(k, is_campaign)]
+                return self._parent.prefetch(workers, [k for k in keys if k in self._plan])
+            if keys is None:
+                keys = [k for k, (_, is_campaign) in self._plan.items() if is_prefetch_sheet(k, is_campaign)]
+            keys = [k for k in keys if k in self._plan and k not in self._frames and k not in self._pending]
+            if self._ingest_cache is not None:
+                # Cached sheets are memory-mapped on access; only parse the rest
+                keys = [k for k in keys if not self._ingest_cache.has_sheet(self.source_hash, k)]
+            if workers < 2 or len(keys) < 2 or len(self._source) < MIN_PARALLEL_SOURCE_BYTES:
+                return []
+            # Workers read the workbook from disk instead of each receiving a pickled copy
+            fd, path = tempfile.mkstemp(prefix='bulk_ingest_', suffix='.xlsx')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(self._source)
+                # spawn: forking a threaded Streamlit server is not safe
+                executor = ProcessPoolExecutor(max_workers=min(workers, len(keys)),
+                                               mp_context=multiprocessing.get_context('spawn'))
+            except Exception as e:
+                self._log(f"[Bulk File Processing] Could not start ingest workers ({str(e)}), parsing serially")
+                _remove_quietly(path)
+                return []
+
+            remaining = [len(keys)]
+            remaining_lock = threading.Lock()
+
+            def _sheet_done(_future: Future) -> None:
+                with remaining_lock:
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        _remove_quietly(path)
+
+            for key in keys:
+                sheet_name, is_campaign_sheet = self._plan[key]
+                future = executor.submit(_parse_sheet_in_worker, path, sheet_name, is_campaign_sheet)
+                future.add_done_callback(_sheet_done)
+                self._pending[key] = future
+            # Workers exit once the submitted sheets are parsed
+            executor.shutdown(wait=False)
+            self._log(f"[Bulk File Processing] Parsing {len(keys)} sheets in {min(workers, len(keys))} worker processes")
+            return keys
+
+    def _release_if_complete(self) -> None:
+        if len(self._frames) < len(self._keys):
+            return
+        # Every sheet is parsed: the workbook handle is no longer needed
+        self.close()
+
+    def _discard_pending(self, key: str) -> None:
+        future = self._pending.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def close(self) -> None:
+        """Release the open read-only workbook, if any."""
+        with self._lock:
+            if self._workbook is not None:
+                self._workbook.close()
+                self._workbook = None
+
+    # --- Introspection ---
+
+    def pending_sheets(self) -> List[str]:
+        """Keys still being parsed by ingest workers."""
+        return [k for k in self._keys if k in self._pending and not self._pending[k].done()]
+
+    def loaded_sheets(self) -> List[str]:
+        """Keys whose DataFrames have been parsed (or assigned) so far."""
+        return [k for k in self._keys if k in self._frames]
+
+    def loaded_items(self) -> Dict[str, pd.DataFrame]:
+        """Parsed sheets only; does not parse anything or count as an access."""
+        with self._lock:
+            return {k: self._frames[k] for k in self._keys if k in self._frames}
+
+    def untouched_sheets(self) -> List[str]:
+        """Keys that nothing has read during this session."""
+        return [k for k in self._keys if k not in self._accessed]
+
+    def subset(self, keys: Iterable[str]) -> Dict[str, pd.DataFrame]:
+        """Plain dict of the given keys that exist, parsing them if needed."""
+        return {k: self[k] for k in keys if k in self}
+
+    def to_dict(self) -> Dict[str, pd.DataFrame]:
+        """Parse every sheet and return a plain dict copy."""
+        return {k: self[k] for k in self._keys}
+
+    def copy(self) -> Dict[str, pd.DataFrame]:
+        return self.to_dict()
+
+    def session_view(self) -> 'BulkWorkbook':
+        """A workbook of its own for one session, over this one's parsed data.
+
+        The view has its own sheet mapping: assigning or deleting sheets, or
+        adding columns to a sheet's frame, doesn't touch this workbook or other
+        views. Sheets not yet parsed are parsed once, here, and shared.
+        """
+        with self._lock:
+            view = object.__new__(type(self))
+            view.__dict__.update(self.__dict__)
+            view._parent = self._parent or self
+            view._plan = dict(self._plan)
+            view._keys = list(self._keys)
+            view._frames = {key: df.copy(deep=False) for key, df in self._frames.items()}
+            view._replaced = set(self._replaced)
+            view._accessed = set()
+            view._pending = {}
+            view._workbook = None
+            view._lock = threading.RLock()
+            return view
+
+    def cache_token(self) -> str:
+        """Cheap identity for st.cache_data hashing: source bytes plus local edits."""
+        return f"{self.source_hash}:{self._revision}"
+
+    def sheet_fingerprints(self) -> Dict[str, str]:
+        """Stable per-sheet content fingerprints, without parsing anything.
+
+        A sheet still as parsed from the upload is identified by the source bytes
+        and its key (the same bytes always parse to the same frame); a sheet that
+        was assigned later is content-hashed.
+        """
+        with self._lock:
+            keys = list(self._keys)
+            replaced = {k: self._frames[k] for k in self._replaced}
+        fingerprints = {}
+        for key in keys:
+            if key in replaced:
+                fingerprints[key] = value_fingerprint(replaced[key])
+            else:
+                fingerprints[key] = hashlib.md5(
+                    f"{self.source_hash}:{key}:{INGEST_CACHE_VERSION}".encode('utf-8')
+                ).hexdigest()
+        return fingerprints
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# --- On-disk ingest cache ---
+
+INGEST_CACHE_DIRNAME = 'ingest_cache'
+INGEST_CACHE_MANIFEST = 'manifest.json'
+INGEST_CACHE_VERSION = 2
+DEFAULT_INGEST_CACHE_ENTRIES = 10
+
+
+class BulkIngestCache:
+    """Per-sheet Arrow IPC cache of parsed bulk files, keyed by file content hash.
+
+    Layout: ``<root>/ingest_cache/<content hash>/manifest.json`` holds the sheet
+    plan (keys, order, source sheet) and each parsed sheet is an uncompressed
+    Feather v2 file next to it, so reads can memory-map just the sheets and
+    columns asked for. Sheets are written as they are parsed; missing ones are
+    parsed from the workbook as usual. Only the most recent entries are kept.
+    """
+
+    def __init__(self, root_dir: str, max_entries: int = DEFAULT_INGEST_CACHE_ENTRIES):
+        self.cache_dir = os.path.join(root_dir, INGEST_CACHE_DIRNAME)
+        self.max_entries = max_entries
+
+    @property
+    def available(self) -> bool:
+        return pa_feather is not None
+
+    def _entry_dir(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, content_hash)
+
+    def _sheet_path(self, content_hash: str, key: str) -> str:
+        # Sheet names can hold characters that are not valid in file names
+        return os.path.join(self._entry_dir(content_hash),
+                            hashlib.md5(key.encode('utf-8')).hexdigest() + '.arrow')
+
+    def load_plan(self, content_hash: str) -> Optional[Dict[str, Tuple[str, bool]]]:
+        """Sheet plan recorded for this file, or None if it has not been cached."""
+        if not self.available:
+            return None
+        manifest_path = os.path.join(self._entry_dir(content_hash), INGEST_CACHE_MANIFEST)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != INGEST_CACHE_VERSION:
+                return None
+            plan = {key: (sheet_name, bool(is_campaign)) for key, sheet_name, is_campaign in manifest['sheets']}
+            # Recency for pruning
+            os.utime(manifest_path, None)
+            return plan
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save_plan(self, content_hash: str, plan: Dict[str, Tuple[str, bool]]) -> None:
+        if not self.available:
+            return
+        try:
+            entry_dir = self._entry_dir(content_hash)
+            os.makedirs(entry_dir, exist_ok=True)
+            manifest = {
+                'version': INGEST_CACHE_VERSION,
+                'created_at': time.time(),
+                'sheets': [[key, sheet_name, is_campaign] for key, (sheet_name, is_campaign) in plan.items()],
+            }
+            _atomic_write_bytes(os.path.join(entry_dir, INGEST_CACHE_MANIFEST),
+                                json.dumps(manifest).encode('utf-8'))
+            self.prune(keep=content_hash)
+        except OSError:
+            pass
+
+    def has_sheet(self, content_hash: str, key: str) -> bool:
+        return self.available and os.path.exists(self._sheet_path(content_hash, key))
+
+    def read_sheet(self, content_hash: str, key: str, columns: Optional[Sequence[str]] = None,
+                   log: Callable[[str], None] = _noop_log) -> Optional[pd.DataFrame]:
+        """Memory-map one cached sheet (optionally only ``columns``); None on a miss."""
+        if not self.has_sheet(content_hash, key):
+            return None
+        path = self._sheet_path(content_hash, key)
+        try:
+            if columns is not None:
+                schema = pa.ipc.open_file(pa.memory_map(path, 'r')).schema
+                columns = [c for c in columns if c in schema.names]
+            table = pa_feather.read_table(path, columns=columns, memory_map=True)
+            # self_destruct frees each Arrow column as it is converted
+            df = table.to_pandas(split_blocks=True, self_destruct=True)
+            log(f"[Ingest Cache] Loaded {key} from cache ({len(df)} rows, {len(df.columns)} columns)")
+            return df
+        except Exception as e:
+            log(f"[Ingest Cache] Could not read cached {key}: {str(e)}")
+            return None
+
+    def write_sheet(self, content_hash: str, key: str, df: pd.DataFrame,
+                    log: Callable[[str], None] = _noop_log) -> bool:
+        if not self.available or not os.path.isdir(self._entry_dir(content_hash)):
+            return False
+        path = self._sheet_path(content_hash, key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if df.attrs:
+                # attrs hold in-memory helpers (e.g. the column resolver), not data
+                df = df.copy(deep=False)
+                df.attrs = {}
+            # Uncompressed so reads can map the file instead of decoding it
+            pa_feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            # Mixed-type object columns cannot be stored; the sheet is just parsed next time
+            log(f"[Ingest Cache] Not caching {key}: {str(e)}")
+            _remove_quietly(tmp_path)
+            return False
+
+    def prune(self, keep: Optional[str] = None) -> int:
+        """Drop all but the ``max_entries`` most recently used files; returns entries removed."""
+        try:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                manifest_path = os.path.join(self.cache_dir, name, INGEST_CACHE_MANIFEST)
+                try:
+                    entries.append((os.path.getmtime(manifest_path), name))
+                except OSError:
+                    entries.append((0.0, name))
+        except OSError:
+            return 0
+        entries.sort(reverse=True)
+        removed = 0
+        for _, name in entries[self.max_entries:]:
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            removed += 1
+        return removed
+
+
+def _atomic_write_bytes(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
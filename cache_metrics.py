@@ -0,0 +1,196 @@
+"""Per-function, per-tier cache instrumentation.
+
+Every cache lookup in the app is recorded here under the cached function (or
+cached data type) it serves and the tier that answered it:
+
+* ``st.cache_data`` - Streamlit's in-process memo of a decorated function
+* ``memory``        - DatabaseManager's in-process LRU
+* ``sqlite``        - the audit_cache.db blob tables
+* ``ingest_cache``  - memory-mapped Arrow sheets of a previously seen bulk file
+* ``compute``       - every tier missed and the function body ran
+
+For each (name, tier) pair we keep hit/miss counts, recent latencies (for
+p50/p95), bytes read and written, and time spent encoding/decoding blobs.
+Metrics are process-wide, so they cover every session served by this
+process, and can be exported as JSON from the Application Information panel.
+"""
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+TIER_STREAMLIT = 'st.cache_data'
+TIER_MEMORY = 'memory'
+TIER_SQLITE = 'sqlite'
+TIER_INGEST = 'ingest_cache'
+TIER_COMPUTE = 'compute'
+
+# Latency samples kept per (name, tier) for percentiles
+LATENCY_SAMPLES = 512
+
+
+class _Metric:
+    __slots__ = ('hits', 'misses', 'latencies', 'total_seconds', 'bytes_read', 'bytes_written',
+                 'codec_seconds')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.total_seconds = 0.0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.codec_seconds = 0.0
+
+
+class CacheMetrics:
+    """Thread-safe registry of cache lookups and writes."""
+
+    def __init__(self):
+        self._metrics: Dict[tuple, _Metric] = {}
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+
+    def _metric(self, name: str, tier: str) -> _Metric:
+        metric = self._metrics.get((name, tier))
+        if metric is None:
+            metric = self._metrics[(name, tier)] = _Metric()
+        return metric
+
+    def record(self, name: str, tier: str, hit: bool, seconds: float,
+               bytes_read: int = 0, codec_seconds: float = 0.0) -> None:
+        """One lookup of ``name`` in ``tier``: whether it hit and how long it took."""
+        with self._lock:
+            metric = self._metric(name, tier)
+            if hit:
+                metric.hits += 1
+            else:
+                metric.misses += 1
+            metric.latencies.append(seconds)
+            metric.total_seconds += seconds
+            metric.bytes_read += bytes_read
+            metric.codec_seconds += codec_seconds
+
+    def record_write(self, name: str, tier: str, bytes_written: int, codec_seconds: float = 0.0) -> None:
+        """A value of ``name`` stored in ``tier``."""
+        with self._lock:
+            metric = self._metric(name, tier)
+            metric.bytes_written += bytes_written
+            metric.codec_seconds += codec_seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+            self.started_at = datetime.now()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """One row per (name, tier), sorted by name then tier."""
+        with self._lock:
+            items = [(key, metric.hits, metric.misses, list(metric.latencies), metric.total_seconds,
+                      metric.bytes_read, metric.bytes_written, metric.codec_seconds)
+                     for key, metric in self._metrics.items()]
+        rows = []
+        for (name, tier), hits, misses, latencies, total, bytes_read, bytes_written, codec in sorted(items):
+            lookups = hits + misses
+            rows.append({
+                'name': name,
+                'tier': tier,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': (hits / lookups * 100) if lookups else 0.0,
+                'p50_ms': float(np.percentile(latencies, 50)) * 1000 if latencies else 0.0,
+                'p95_ms': float(np.percentile(latencies, 95)) * 1000 if latencies else 0.0,
+                'total_seconds': total,
+                'bytes_read': bytes_read,
+                'bytes_written': bytes_written,
+                'codec_seconds': codec,
+            })
+        return rows
+
+    def to_json(self, extra: Optional[Dict[str, Any]] = None) -> str:
+        """Snapshot as a JSON document, with optional extra sections (e.g. tier sizes)."""
+        payload = {
+            'collected_since': self.started_at.isoformat(timespec='seconds'),
+            'exported_at': datetime.now().isoformat(timespec='seconds'),
+            'metrics': self.snapshot(),
+        }
+        if extra:
+            payload.update(extra)
+        return json.dumps(payload, indent=2, default=str)
+
+
+cache_metrics = CacheMetrics()
+
+_call_state = threading.local()
+
+
+def mark_tier_served() -> None:
+    """Note that the memory or SQLite tier answered the instrumented call in progress."""
+    _call_state.served = True
+
+
+@contextmanager
+def quiet_cache_calls():
+    """Inside the block, instrumented functions on this thread skip their st.cache_data spinner.
+
+    For background threads that fill the same cache entries a page would use,
+    but must not draw into it.
+    """
+    outer = getattr(_call_state, 'quiet', False)
+    _call_state.quiet = True
+    try:
+        yield
+    finally:
+        _call_state.quiet = outer
+
+
+def instrumented_cache_data(**cache_kwargs) -> Callable:
+    """``st.cache_data(**cache_kwargs)`` that also records each call in ``cache_metrics``.
+
+    A call whose body did not run was answered by st.cache_data. A body that
+    returned a result from the memory/SQLite tiers (DatabaseManager calls
+    ``mark_tier_served``, and records those lookups itself) is not a
+    ``compute``; only a body that missed every tier is.
+    """
+    import streamlit as st
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            _call_state.ran = True
+            return func(*args, **kwargs)
+
+        cached = st.cache_data(**cache_kwargs)(body)
+        # Same function, so the same cache entries, without the spinner
+        quiet = st.cache_data(**{**cache_kwargs, 'show_spinner': False})(body)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            outer_ran = getattr(_call_state, 'ran', False)
+            outer_served = getattr(_call_state, 'served', False)
+            _call_state.ran = False
+            _call_state.served = False
+            start = time.perf_counter()
+            try:
+                return (quiet if getattr(_call_state, 'quiet', False) else cached)(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                ran, served = _call_state.ran, _call_state.served
+                _call_state.ran, _call_state.served = outer_ran, outer_served
+                if ran:
+                    cache_metrics.record(func.__name__, TIER_STREAMLIT, False, elapsed)
+                    if not served:
+                        cache_metrics.record(func.__name__, TIER_COMPUTE, False, elapsed)
+                else:
+                    cache_metrics.record(func.__name__, TIER_STREAMLIT, True, elapsed)
+
+        wrapper.clear = cached.clear
+        return wrapper
+
+    return decorator
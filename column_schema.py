@@ -0,0 +1,260 @@
+"""Column dtype schema and column name resolution for ingested data.
+
+Known columns are cast once, when a file is ingested (or a saved session is
+loaded), so sections can rely on numeric metrics and compact categorical
+dimensions instead of re-cleaning strings on every rerun. Each ingested frame
+also carries a ``ColumnResolver`` in ``df.attrs`` so sections look up column
+names case-insensitively without rescanning ``df.columns``.
+"""
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Dtype kinds
+CURRENCY = 'currency'  # float64: account totals sum thousands of rows and float32 drifts by cents
+RATE = 'rate'          # float32: per-row ratios and per-click values, never summed for totals
+COUNT = 'count'        # int32; float64 when values are missing or not whole numbers
+CATEGORY = 'category'  # low-cardinality text dimensions
+
+COLUMN_SCHEMA: Dict[str, str] = {
+    # Counts
+    'Impressions': COUNT,
+    'Clicks': COUNT,
+    'Orders': COUNT,
+    'Units': COUNT,
+    '7 Day Total Orders (#)': COUNT,
+    'Sessions': COUNT,
+    # Currency
+    'Spend': CURRENCY,
+    'Sales': CURRENCY,
+    'Ad Sales': CURRENCY,
+    'Total Sales': CURRENCY,
+    '7 Day Total Sales': CURRENCY,
+    'Sales (Views & Clicks)': CURRENCY,
+    'Bid': CURRENCY,
+    'Ad Group Default Bid': CURRENCY,
+    'Daily Budget': CURRENCY,
+    'Budget': CURRENCY,
+    # Rates
+    'ACOS': RATE,
+    'ACoS': RATE,
+    'ROAS': RATE,
+    'CPC': RATE,
+    'CTR': RATE,
+    'CVR': RATE,
+    'Cost Per Click (CPC)': RATE,
+    'Click-Thru Rate (CTR)': RATE,
+    'Click-through Rate': RATE,
+    'Conversion Rate': RATE,
+    # Dimensions
+    'Entity': CATEGORY,
+    'State': CATEGORY,
+    'Match Type': CATEGORY,
+    'Campaign Type': CATEGORY,
+    'Product': CATEGORY,
+    'Targeting Type': CATEGORY,
+}
+
+_INT32_MIN = np.iinfo(np.int32).min
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+def to_numeric_clean(series: pd.Series) -> pd.Series:
+    """Numeric view of a series; strips $, %, commas and whitespace from text values.
+
+    Already-numeric series are returned unchanged, so calling this on typed
+    columns costs nothing.
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    cleaned = series.astype(str).str.replace(r'[$,%£€\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def _cast_count(series: pd.Series) -> pd.Series:
+    values = to_numeric_clean(series)
+    if values.isna().any():
+        return values.astype(np.float64)
+    if len(values) and not pd.api.types.is_integer_dtype(values.dtype):
+        if not np.all(np.mod(values.to_numpy(dtype=np.float64), 1) == 0):
+            return values.astype(np.float64)
+    if len(values) and (values.min() < _INT32_MIN or values.max() > _INT32_MAX):
+        return values.astype(np.int64)
+    return values.astype(np.int32)
+
+
+def _cast_category(series: pd.Series) -> Optional[pd.Series]:
+    non_null = series.dropna()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        if '' in categories:
+            return None
+        return series.cat.add_categories([''])
+    if not all(isinstance(v, str) for v in non_null.unique()):
+        # Mixed or numeric codes: leave the column as it is
+        return None
+    # '' is always a category so fillna('') keeps working downstream
+    categories = sorted(set(non_null.unique()) | {''})
+    return pd.Categorical(series, categories=categories)
+
+
+def cast_column(series: pd.Series, kind: str) -> Optional[pd.Series]:
+    """Cast one column to its schema kind; None when it should be left as is."""
+    if kind == CURRENCY:
+        return to_numeric_clean(series).astype(np.float64)
+    if kind == RATE:
+        return to_numeric_clean(series).astype(np.float32)
+    if kind == COUNT:
+        return _cast_count(series)
+    if kind == CATEGORY:
+        return _cast_category(series)
+    return None
+
+
+def apply_schema(df: pd.DataFrame, schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Return ``df`` with every schema column cast to its dtype.
+
+    Columns not in the schema, and columns that cannot be cast cleanly, are
+    left untouched. Frames with duplicated column names are returned as they are.
+    """
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return df
+    schema = COLUMN_SCHEMA if schema is None else schema
+    if not df.columns.is_unique:
+        return df
+    casts = {}
+    for col in df.columns:
+        kind = schema.get(col)
+        if kind is None:
+            continue
+        try:
+            cast = cast_column(df[col], kind)
+        except (TypeError, ValueError):
+            cast = None
+        if cast is not None:
+            casts[col] = cast
+    if casts:
+        df = df.copy(deep=False)
+        for col, values in casts.items():
+            df[col] = values
+    column_resolver(df)
+    return df
+
+
+def release_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of ``df`` with categorical columns as plain object columns.
+
+    For frames that get new values written into dimension columns, or are filled
+    with non-text placeholders for display.
+    """
+    cat_cols = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not cat_cols:
+        return df
+    df = df.copy(deep=False)
+    for col in cat_cols:
+        df[col] = df[col].astype(object)
+    return df
+
+
+# --- Column name resolution ---
+
+COLUMN_RESOLVER_ATTR = 'column_resolver'
+
+Names = Union[str, Iterable[str]]
+
+
+def _normalize_name(name) -> str:
+    return str(name).strip().lower()
+
+
+class ColumnResolver:
+    """Case-insensitive name -> actual column index for one set of DataFrame columns.
+
+    Built once per frame and kept in ``df.attrs``; frames derived by row
+    filtering share it. Immutable, so copies made by pandas reuse the instance.
+    """
+
+    __slots__ = ('columns', '_lookup', '_normalized')
+
+    def __init__(self, columns: pd.Index):
+        self.columns = columns
+        self._normalized = [_normalize_name(c) for c in columns]
+        lookup = {}
+        for position, (name, col) in enumerate(zip(self._normalized, columns)):
+            lookup.setdefault(name, (position, col))
+        self._lookup = lookup
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __contains__(self, name) -> bool:
+        return _normalize_name(name) in self._lookup
+
+    def matches(self, columns: pd.Index) -> bool:
+        return columns is self.columns or (len(columns) == len(self.columns) and columns.equals(self.columns))
+
+    def get(self, names: Names, first_in_frame: bool = False):
+        """Actual column for the first of ``names`` present (case-insensitive), else None.
+
+        With ``first_in_frame`` the match that comes first in the frame wins
+        instead of the first name in ``names``.
+        """
+        if isinstance(names, str):
+            names = (names,)
+        best = None
+        for name in names:
+            hit = self._lookup.get(_normalize_name(name))
+            if hit is None:
+                continue
+            if not first_in_frame:
+                return hit[1]
+            if best is None or hit[0] < best[0]:
+                best = hit
+        return best[1] if best else None
+
+    def find(self, include: Names, exclude: Names = ()):
+        """First column (in frame order) whose name contains every ``include`` token and no ``exclude`` token."""
+        include = [include.lower()] if isinstance(include, str) else [t.lower() for t in include]
+        exclude = [exclude.lower()] if isinstance(exclude, str) else [t.lower() for t in exclude]
+        for name, col in zip(self._normalized, self.columns):
+            if all(t in name for t in include) and not any(t in name for t in exclude):
+                return col
+        return None
+
+    def match(self, patterns: Names):
+        """Column named like one of ``patterns``, else the first containing one of them (patterns in order)."""
+        if isinstance(patterns, str):
+            patterns = (patterns,)
+        exact = self.get(patterns)
+        if exact is not None:
+            return exact
+        for pattern in patterns:
+            col = self.find(pattern)
+            if col is not None:
+                return col
+        return None
+
+    def find_any(self, patterns: Names):
+        """First column (in frame order) whose name contains any of ``patterns``."""
+        patterns = [patterns.lower()] if isinstance(patterns, str) else [_normalize_name(p) for p in patterns]
+        for name, col in zip(self._normalized, self.columns):
+            if any(p in name for p in patterns):
+                return col
+        return None
+
+
+def column_resolver(df: pd.DataFrame) -> ColumnResolver:
+    """The frame's ColumnResolver, building (and attaching) it if the columns changed."""
+    resolver = df.attrs.get(COLUMN_RESOLVER_ATTR)
+    if not isinstance(resolver, ColumnResolver) or not resolver.matches(df.columns):
+        resolver = ColumnResolver(df.columns)
+        df.attrs[COLUMN_RESOLVER_ATTR] = resolver
+    return resolver
+
+
+def resolve_column(df: pd.DataFrame, names: Names, first_in_frame: bool = False):
+    """Actual column in ``df`` for the first of ``names`` present (case-insensitive), else None."""
+    return column_resolver(df).get(names, first_in_frame=first_in_frame)
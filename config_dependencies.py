@@ -0,0 +1,123 @@
+"""Which client settings each cached analysis reads.
+
+Cached analyses used to be keyed on the whole client config, so any settings
+edit (a goal, a product title, one campaign tag) recomputed every analysis.
+Each analysis here declares the settings it reads, and for the large ones the
+part it reads (the ASIN list of ``branded_asins_data``, the product group of
+each ``campaign_tags_data`` entry). Cache keys are built from that view only,
+and a settings change invalidates only the analyses whose view changed.
+"""
+import functools
+import inspect
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from data_fingerprint import config_fingerprint
+
+
+def _asin_list(value: Any) -> Any:
+    # Classification only needs which ASINs are branded, not their titles or SKUs
+    if isinstance(value, dict):
+        return sorted(value)
+    return value
+
+
+def _product_groups(value: Any) -> Any:
+    # Analyses group campaigns by their first tag (the product group)
+    if isinstance(value, dict):
+        return {str(campaign): (info.get('tag_1', '') if isinstance(info, dict) else info)
+                for campaign, info in value.items()}
+    return value
+
+
+# Setting -> projection of the part an analysis reads (None: the whole value)
+Dependencies = Dict[str, Optional[Callable[[Any], Any]]]
+
+BRANDED_SETTINGS: Dependencies = {
+    'client_name': None,
+    'Branded Terms': None,
+    'branded_keywords': None,
+    'Branded ASINs': None,
+    'branded_asins_data': _asin_list,
+}
+
+PRODUCT_GROUP_SETTINGS: Dependencies = {
+    'client_name': None,
+    'campaign_tags_data': _product_groups,
+}
+
+ANALYSIS_CONFIG_DEPENDENCIES: Dict[str, Dependencies] = {
+    'classify_branded_campaigns': BRANDED_SETTINGS,
+    'targeting_performance': {**BRANDED_SETTINGS, **PRODUCT_GROUP_SETTINGS},
+    'search_term_data': {**BRANDED_SETTINGS, **PRODUCT_GROUP_SETTINGS},
+    'campaign_performance_data': PRODUCT_GROUP_SETTINGS,
+}
+
+
+def config_view(config: Optional[dict], analysis: str) -> Optional[dict]:
+    """The part of ``config`` that ``analysis`` reads (absent settings stay absent)."""
+    if config is None:
+        return None
+    view = {}
+    for key, projection in ANALYSIS_CONFIG_DEPENDENCIES[analysis].items():
+        if key in config:
+            view[key] = projection(config[key]) if projection else config[key]
+    return view
+
+
+def scoped_config_fingerprint(config: Optional[dict], analysis: str) -> str:
+    """Fingerprint of the settings ``analysis`` depends on."""
+    return config_fingerprint(config_view(config, analysis))
+
+
+def affected_analyses(old_config: Optional[dict], new_config: Optional[dict],
+                      analyses: Optional[Iterable[str]] = None) -> List[str]:
+    """Analyses whose view of the settings differs between the two configs."""
+    analyses = ANALYSIS_CONFIG_DEPENDENCIES if analyses is None else analyses
+    return [analysis for analysis in analyses
+            if scoped_config_fingerprint(old_config, analysis) != scoped_config_fingerprint(new_config, analysis)]
+
+
+class ScopedConfig(dict):
+    """A client config that hashes (for st.cache_data) as only the settings one analysis reads.
+
+    Behaves exactly like the full config inside the analysis. ``context`` is
+    any other setting the analysis reads from outside its arguments; it is
+    part of the hash too.
+    """
+
+    def __init__(self, config: dict, analysis: str, context: Any = None):
+        super().__init__(config)
+        self.analysis = analysis
+        self.context = context
+
+    def cache_token(self) -> str:
+        token = f"{self.analysis}:{scoped_config_fingerprint(self, self.analysis)}"
+        return token if self.context is None else f"{token}:{self.context}"
+
+    def __reduce__(self):
+        return (ScopedConfig, (dict(self), self.analysis, self.context))
+
+
+def scoped_config(arg_name: str, analysis: str, context: Optional[Callable[[], Any]] = None) -> Callable:
+    """Pass argument ``arg_name`` to the decorated (cached) function as a ScopedConfig.
+
+    Goes above the cache decorator, whose ``hash_funcs`` must map ScopedConfig
+    to ``ScopedConfig.cache_token``. ``context`` is called on each call for the
+    value of the settings the analysis reads from elsewhere (session state).
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            config = bound.arguments.get(arg_name)
+            if isinstance(config, dict) and not isinstance(config, ScopedConfig):
+                bound.arguments[arg_name] = ScopedConfig(config, analysis, context() if context else None)
+            return func(*bound.args, **bound.kwargs)
+
+        if hasattr(func, 'clear'):
+            wrapper.clear = func.clear
+        return wrapper
+
+    return decorator
@@ -0,0 +1,95 @@
+"""Stable content fingerprints for DataFrames, bulk data and client configs.
+
+Analysis cache keys are built from these instead of ``hash(str(...))``: a
+frame's fingerprint covers every row (via ``pd.util.hash_pandas_object``), is
+the same across processes, and is computed once per frame object. Sheets of a
+``BulkWorkbook`` that still hold what was parsed from the upload are identified
+by the upload's bytes, so they never need hashing at all.
+"""
+import hashlib
+import json
+import threading
+import weakref
+from collections.abc import Mapping
+from typing import Any, Dict
+
+import pandas as pd
+
+_frame_fingerprints: Dict[int, tuple] = {}
+_frame_fingerprints_lock = threading.Lock()
+
+
+def _hash_column(series: pd.Series) -> bytes:
+    try:
+        hashed = pd.util.hash_pandas_object(series, index=False)
+    except TypeError:
+        # Unhashable cells (lists, dicts): hash their text form
+        hashed = pd.util.hash_pandas_object(series.astype(str), index=False)
+    return hashed.to_numpy().tobytes()
+
+
+def _compute_frame_fingerprint(df: pd.DataFrame) -> str:
+    digest = hashlib.md5()
+    digest.update(repr([(str(c), str(t)) for c, t in zip(df.columns, df.dtypes)]).encode('utf-8'))
+    digest.update(str(len(df)).encode('ascii'))
+    for position in range(df.shape[1]):
+        digest.update(_hash_column(df.iloc[:, position]))
+    return digest.hexdigest()
+
+
+def _forget(frame_id: int):
+    def callback(_ref):
+        with _frame_fingerprints_lock:
+            _frame_fingerprints.pop(frame_id, None)
+    return callback
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame's columns, dtypes and values (index ignored).
+
+    Memoized per frame object for as long as it is alive and its shape and
+    columns are unchanged; frames are treated as read-only once ingested.
+    """
+    frame_id = id(df)
+    with _frame_fingerprints_lock:
+        entry = _frame_fingerprints.get(frame_id)
+    if entry is not None:
+        ref, shape, columns, fingerprint = entry
+        if ref() is df and shape == df.shape and columns is df.columns:
+            return fingerprint
+    fingerprint = _compute_frame_fingerprint(df)
+    with _frame_fingerprints_lock:
+        _frame_fingerprints[frame_id] = (weakref.ref(df, _forget(frame_id)), df.shape, df.columns, fingerprint)
+    return fingerprint
+
+
+def value_fingerprint(value: Any) -> str:
+    """Fingerprint for any value that can appear in bulk data or a cache key."""
+    if isinstance(value, pd.DataFrame):
+        return frame_fingerprint(value)
+    if isinstance(value, pd.Series):
+        return frame_fingerprint(value.to_frame())
+    if isinstance(value, Mapping):
+        return bulk_fingerprint(value)
+    return config_fingerprint(value)
+
+
+def bulk_fingerprint(bulk_data: Any) -> str:
+    """Fingerprint of a bulk data mapping (sheet key -> DataFrame), order-independent."""
+    if bulk_data is None:
+        return 'none'
+    sheet_fingerprints = getattr(bulk_data, 'sheet_fingerprints', None)
+    if callable(sheet_fingerprints):
+        parts = sheet_fingerprints()
+    else:
+        parts = {str(key): value_fingerprint(value) for key, value in bulk_data.items()}
+    digest = hashlib.md5()
+    for key in sorted(parts):
+        digest.update(key.encode('utf-8') + b'\0' + parts[key].encode('ascii') + b'\n')
+    return digest.hexdigest()
+
+
+def config_fingerprint(config: Any) -> str:
+    """Stable hash of a JSON-like value such as a client config."""
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
@@ -3,16 +3,94 @@ import pandas as pd
 import json
 import hashlib
 import os
-import pickle
-import gzip
+import atexit
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from collections.abc import Mapping
+from typing import Dict, Any, Optional, List, Set
 import streamlit as st
 
+import blob_codec
+from cache_metrics import TIER_MEMORY, TIER_SQLITE, cache_metrics, mark_tier_served
+from memory_cache import MemoryLRU, memory_budget_bytes
+from data_fingerprint import frame_fingerprint, value_fingerprint
+
+# Connection pool settings
+SQLITE_POOL_SIZE = 8               # idle connections kept open for reuse
+SQLITE_BUSY_TIMEOUT_SECONDS = 30   # how long a writer waits for another writer
+SQLITE_STATEMENT_CACHE_SIZE = 128  # prepared statements kept per connection
+# last_accessed updates are queued and written together once this many are
+# pending, this many seconds have passed, or another write transaction runs
+TOUCH_BATCH_SIZE = 32
+TOUCH_FLUSH_SECONDS = 5.0
+
+# Byte budget for cached blobs (client_data + analysis_cache); AUDIT_CACHE_MAX_MB overrides it
+CACHE_BUDGET_ENV = 'AUDIT_CACHE_MAX_MB'
+DEFAULT_CACHE_BUDGET_MB = 2048
+# Eviction frees space down to this fraction of the budget, so it does not run on every write
+CACHE_EVICTION_TARGET = 0.8
+# Pages released per incremental_vacuum step; the write lock is dropped between steps
+VACUUM_STEP_PAGES = 2048
+# Tables whose blobs count against the budget, with their blob column
+BUDGETED_TABLES = {'client_data': 'processed_data', 'analysis_cache': 'result_data'}
+# Columns identifying a blob row; the memory tier uses (table, *key) as its key
+BLOB_KEY_COLUMNS = {
+    'client_data': ('client_name', 'data_type', 'file_hash'),
+    'analysis_cache': ('client_name', 'analysis_type', 'input_hash'),
+}
+# Access times for budgeted rows keep milliseconds so LRU order survives bursts of reads
+ACCESS_TIME_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+# Background maintenance: expired rows are deleted this many at a time, each batch
+# in its own short write transaction with a pause after it, at most once per interval
+EXPIRING_TABLES = ('data_cache', 'client_data', 'analysis_cache')
+CLEANUP_BATCH_ROWS = 200
+CLEANUP_BATCH_PAUSE_SECONDS = 0.05
+MAINTENANCE_INTERVAL_SECONDS = 6 * 60 * 60
+
+
+def _hash_logic_version(input_hash: str) -> int:
+    """Logic version encoded in an analysis input hash ('v3:<md5>' -> 3, bare md5 -> 0)."""
+    if input_hash.startswith('v') and ':' in input_hash:
+        return int(input_hash[1:input_hash.index(':')])
+    return 0
+
+
+def cache_budget_bytes(configured: Any = None) -> int:
+    """Cache budget in bytes from ``configured`` MB, the environment, or the default."""
+    if configured is None:
+        configured = os.environ.get(CACHE_BUDGET_ENV)
+    try:
+        megabytes = float(configured) if configured not in (None, '') else DEFAULT_CACHE_BUDGET_MB
+    except (TypeError, ValueError):
+        megabytes = DEFAULT_CACHE_BUDGET_MB
+    return max(0, int(megabytes * 1024 * 1024))
+
+
 class DatabaseManager:
-    """Manages SQLite database operations for caching processed data."""
+    """Manages SQLite database operations for caching processed data.
+    
+    Connections are pooled and opened in WAL mode, so readers never wait for
+    a writer storing a large blob, and a cache hit reuses an open connection
+    (and its prepared statements) instead of connecting again. A thread keeps
+    the same connection for the whole of an operation or ``batch()``.
+    
+    Cached blobs are kept under a byte budget: each row records its size and
+    when it was last read, and the least recently used rows are evicted once
+    the budget is exceeded. Freed pages are returned to the filesystem with
+    incremental vacuum steps rather than a full VACUUM.
+    
+    Decoded blobs are also kept in an in-process memory tier (``self.memory``)
+    keyed like their rows, so a repeat lookup skips the read and decode.
+    Writes go to both tiers; entries evicted from memory are still on disk.
     
-    def __init__(self, db_path: str = None):
+    Expired rows are removed by ``start_background_maintenance()`` on a
+    daemon thread, in small indexed batches, so no page load waits for it.
+    """
+    
+    def __init__(self, db_path: str = None, max_cache_mb: Optional[float] = None,
+                 max_memory_mb: Optional[float] = None):
         if db_path is None:
             # Use a safe location for the database
             import platform
@@ -39,139 +117,338 @@ class DatabaseManager:
                 db_path = "audit_cache.db"
                 
         self.db_path = db_path
+        self._pool: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+        self._pending_touches: List[tuple] = []
+        self._touch_lock = threading.Lock()
+        self._last_touch_flush = time.monotonic()
+        self.max_cache_bytes = cache_budget_bytes(max_cache_mb)
+        self._eviction_lock = threading.Lock()
+        self.memory = MemoryLRU(memory_budget_bytes(max_memory_mb))
+        # (analysis_type, logic_version) pairs whose older-version rows this process already dropped
+        self._purged_versions: Set[tuple] = set()
+        self._maintenance_lock = threading.Lock()
+        self._maintenance_thread: Optional[threading.Thread] = None
+        self._maintenance_stop = threading.Event()
+        self._last_maintenance_start: Optional[float] = None
+        self.last_maintenance: Optional[Dict[str, Any]] = None
         self.init_database()
     
+    # ========== Connection Layer ==========
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        is_new_file = not os.path.exists(self.db_path) or os.path.getsize(self.db_path) == 0
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=SQLITE_BUSY_TIMEOUT_SECONDS,
+            isolation_level=None,  # transactions are managed explicitly in _transaction()
+            check_same_thread=False,  # pooled connections move between threads, one at a time
+            cached_statements=SQLITE_STATEMENT_CACHE_SIZE,
+        )
+        if is_new_file:
+            # Only possible before the file is initialised; older files switch
+            # over in _vacuum() the first time eviction frees space
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        except sqlite3.DatabaseError:
+            # Some filesystems (e.g. network shares) cannot use WAL; keep the default journal
+            pass
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """This thread's connection, checked out of the pool for the outermost caller."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        with self._pool_lock:
+            conn = self._pool.pop() if self._pool else None
+        if conn is None:
+            conn = self._open_connection()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            with self._pool_lock:
+                if len(self._pool) < SQLITE_POOL_SIZE:
+                    self._pool.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+    
+    @contextmanager
+    def _transaction(self):
+        """Cursor inside a write transaction; nested calls join the outer transaction."""
+        with self._connection() as conn:
+            if conn.in_transaction:
+                yield conn.cursor()
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._write_touches(conn)
+                yield conn.cursor()
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+    
+    def batch(self):
+        """Group every write made inside the ``with`` block into one transaction."""
+        return self._transaction()
+    
+    def _touch(self, sql: str, params: tuple) -> None:
+        """Queue a last_accessed update instead of taking the write lock on a read."""
+        with self._touch_lock:
+            self._pending_touches.append((sql, params))
+            due = (len(self._pending_touches) >= TOUCH_BATCH_SIZE
+                   or time.monotonic() - self._last_touch_flush >= TOUCH_FLUSH_SECONDS)
+        if due:
+            self.flush_touches()
+    
+    def _write_touches(self, conn: sqlite3.Connection) -> None:
+        with self._touch_lock:
+            pending, self._pending_touches = self._pending_touches, []
+            self._last_touch_flush = time.monotonic()
+        grouped: Dict[str, List[tuple]] = {}
+        for sql, params in pending:
+            grouped.setdefault(sql, []).append(params)
+        for sql, rows in grouped.items():
+            conn.executemany(sql, rows)
+    
+    def flush_touches(self) -> None:
+        """Write queued last_accessed updates now, in one transaction."""
+        try:
+            with self._transaction():
+                pass
+        except sqlite3.Error as e:
+            if 'debug_messages' in st.session_state:
+                st.session_state.debug_messages.append(f"[SQLite Error] Failed to write access times: {str(e)}")
+    
+    def close(self) -> None:
+        """Write pending access times and close the pooled connections."""
+        self._maintenance_stop.set()
+        thread = self._maintenance_thread
+        if thread is not None:
+            thread.join(timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+        self.flush_touches()
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+    
     def init_database(self):
         """Initialize the database with required tables."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create tables for caching different types of data
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS data_cache (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cache_key TEXT UNIQUE NOT NULL,
-                data_type TEXT NOT NULL,
-                data_hash TEXT NOT NULL,
-                compressed_data BLOB,
-                metadata TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        with self._transaction() as cursor:
+            # Create tables for caching different types of data
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cache_key TEXT UNIQUE NOT NULL,
+                    data_type TEXT NOT NULL,
+                    data_hash TEXT NOT NULL,
+                    compressed_data BLOB,
+                    metadata TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS client_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                client_name TEXT NOT NULL,
-                data_type TEXT NOT NULL,
-                file_hash TEXT NOT NULL,
-                processed_data BLOB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(client_name, data_type, file_hash)
-            )
-        ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS client_data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    client_name TEXT NOT NULL,
+                    data_type TEXT NOT NULL,
+                    file_hash TEXT NOT NULL,
+                    processed_data BLOB,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(client_name, data_type, file_hash)
+                )
+            ''')
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS analysis_cache (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                client_name TEXT NOT NULL,
-                analysis_type TEXT NOT NULL,
-                input_hash TEXT NOT NULL,
-                result_data BLOB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(client_name, analysis_type, input_hash)
-            )
-        ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    client_name TEXT NOT NULL,
+                    analysis_type TEXT NOT NULL,
+                    input_hash TEXT NOT NULL,
+                    result_data BLOB,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    logic_version INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE(client_name, analysis_type, input_hash)
+                )
+            ''')
         
-        # Client config cache table (per-user)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS client_config_cache (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                client_name TEXT NOT NULL,
-                config_data TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, client_name)
-            )
-        ''')
+            # Client config cache table (per-user)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS client_config_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    client_name TEXT NOT NULL,
+                    config_data TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(user_id, client_name)
+                )
+            ''')
         
-        # Client names cache table (per-user)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS client_names_cache (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL UNIQUE,
-                client_names TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+            # Client names cache table (per-user)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS client_names_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL UNIQUE,
+                    client_names TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
         
-        # Session metadata cache table (per-user, per-client)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS session_metadata_cache (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                client_name TEXT NOT NULL,
-                session_list TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, client_name)
-            )
-        ''')
+            # Session metadata cache table (per-user, per-client)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS session_metadata_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    client_name TEXT NOT NULL,
+                    session_list TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(user_id, client_name)
+                )
+            ''')
         
-        # Create indexes for better performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cache_key ON data_cache(cache_key)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_client_data ON client_data(client_name, data_type)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache ON analysis_cache(client_name, analysis_type)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_client_config_cache ON client_config_cache(user_id, client_name)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_client_names_cache ON client_names_cache(user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_metadata_cache ON session_metadata_cache(user_id, client_name)')
+            # Create indexes for better performance
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cache_key ON data_cache(cache_key)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_client_data ON client_data(client_name, data_type)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache ON analysis_cache(client_name, analysis_type)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_client_config_cache ON client_config_cache(user_id, client_name)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_client_names_cache ON client_names_cache(user_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_metadata_cache ON session_metadata_cache(user_id, client_name)')
+            for table in EXPIRING_TABLES:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table}(created_at)')
         
-        conn.commit()
-        conn.close()
+            # Files created before the byte budget lack the size/access columns
+            for table, blob_column in BUDGETED_TABLES.items():
+                columns = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+                if 'size_bytes' not in columns:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN size_bytes INTEGER NOT NULL DEFAULT 0')
+                    cursor.execute(f'UPDATE {table} SET size_bytes = COALESCE(length({blob_column}), 0)')
+                if 'last_accessed' not in columns:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN last_accessed TIMESTAMP')
+                    cursor.execute(f'UPDATE {table} SET last_accessed = created_at')
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_last_accessed ON {table}(last_accessed)')
+            
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(analysis_cache)')}
+            if 'logic_version' not in columns:
+                # Rows cached before versioning count as version 0
+                cursor.execute('ALTER TABLE analysis_cache ADD COLUMN logic_version INTEGER NOT NULL DEFAULT 0')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_version ON analysis_cache(analysis_type, logic_version)')
     
     def _calculate_hash(self, data: Any) -> str:
         """Calculate hash for data to detect changes."""
         if isinstance(data, pd.DataFrame):
-            # For DataFrames, use a combination of shape, columns, and sample data
-            hash_input = f"{data.shape}_{list(data.columns)}_{data.head().to_string()}"
+            # For DataFrames, hash every row (memoized per frame)
+            return frame_fingerprint(data)
         elif isinstance(data, dict):
-            # For dictionaries, convert to JSON string
-            hash_input = json.dumps(data, sort_keys=True, default=str)
+            # For dictionaries, convert to JSON string; DataFrames inside are fingerprinted
+            hash_input = json.dumps(data, sort_keys=True, default=self._hash_default)
         else:
             # For other types, convert to string
             hash_input = str(data)
         
         return hashlib.md5(hash_input.encode()).hexdigest()
     
+    @staticmethod
+    def _hash_default(value: Any) -> str:
+        if isinstance(value, (pd.DataFrame, pd.Series, Mapping)):
+            return value_fingerprint(value)
+        return str(value)
+    
     def _compress_data(self, data: Any) -> bytes:
-        """Compress data for storage."""
-        pickled_data = pickle.dumps(data)
-        return gzip.compress(pickled_data)
+        """Serialize data for storage (codec chosen by blob_codec, tagged in the blob)."""
+        return blob_codec.encode(data)
     
     def _decompress_data(self, compressed_data: bytes) -> Any:
-        """Decompress data from storage."""
-        decompressed = gzip.decompress(compressed_data)
-        return pickle.loads(decompressed)
+        """Deserialize a stored blob, including rows written as gzip-compressed pickles."""
+        return blob_codec.decode(compressed_data)
+    
+    def _put_blob(self, table: str, key: tuple, value: Any, extra_columns: Optional[Dict[str, Any]] = None) -> None:
+        """Write ``value`` through the memory tier to its SQLite row.
+        
+        A blob too big to fit under CACHE_EVICTION_TARGET of the budget stays in
+        the memory tier only.
+        """
+        self.memory.put((table,) + key, value)
+        encode_start = time.perf_counter()
+        compressed_data = self._compress_data(value)
+        key_filter = ' AND '.join(f'{column} = ?' for column in BLOB_KEY_COLUMNS[table])
+        if 0 < self.max_cache_bytes * CACHE_EVICTION_TARGET < len(compressed_data):
+            # Storing it would evict every other row and then the blob itself
+            with self._transaction() as cursor:
+                cursor.execute(f'DELETE FROM {table} WHERE {key_filter}', key)
+            if 'debug_messages' in st.session_state:
+                st.session_state.debug_messages.append(
+                    f"[DB] Kept {key[1]} out of SQLite: {len(compressed_data) / (1024 * 1024):.1f} MB is more than "
+                    f"the {self.max_cache_bytes / (1024 * 1024):.0f} MB cache budget can hold"
+                )
+            return
+        cache_metrics.record_write(key[1], TIER_SQLITE, len(compressed_data), time.perf_counter() - encode_start)
+        extra_columns = extra_columns or {}
+        columns = ', '.join(BLOB_KEY_COLUMNS[table] + tuple(extra_columns))
+        placeholders = ', '.join('?' for _ in range(len(key) + len(extra_columns)))
+        with self._transaction() as cursor:
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO {table}
+                ({columns}, {BUDGETED_TABLES[table]}, size_bytes, last_accessed)
+                VALUES ({placeholders}, ?, ?, {ACCESS_TIME_SQL})
+            ''', key + tuple(extra_columns.values()) + (compressed_data, len(compressed_data)))
+        self.enforce_cache_budget()
+    
+    def _get_blob(self, table: str, key: tuple) -> tuple:
+        """(value, tier) for a cached blob, checking memory before SQLite; (None, None) on a miss."""
+        name = key[1]
+        start = time.perf_counter()
+        value = self.memory.get((table,) + key)
+        cache_metrics.record(name, TIER_MEMORY, value is not None, time.perf_counter() - start)
+        key_filter = ' AND '.join(f'{column} = ?' for column in BLOB_KEY_COLUMNS[table])
+        if value is not None:
+            # Keep the SQLite row's LRU position in step with its use
+            self._touch(f'UPDATE {table} SET last_accessed = {ACCESS_TIME_SQL} WHERE {key_filter}', key)
+            mark_tier_served()
+            return value, 'memory'
+        
+        start = time.perf_counter()
+        with self._connection() as conn:
+            result = conn.execute(
+                f'SELECT {BUDGETED_TABLES[table]}, id FROM {table} WHERE {key_filter}', key
+            ).fetchone()
+        if not result:
+            cache_metrics.record(name, TIER_SQLITE, False, time.perf_counter() - start)
+            return None, None
+        decode_start = time.perf_counter()
+        value = self._decompress_data(result[0])
+        end = time.perf_counter()
+        cache_metrics.record(name, TIER_SQLITE, True, end - start,
+                             bytes_read=len(result[0]), codec_seconds=end - decode_start)
+        self._touch(f'UPDATE {table} SET last_accessed = {ACCESS_TIME_SQL} WHERE id = ?', (result[1],))
+        self.memory.put((table,) + key, value)
+        mark_tier_served()
+        return value, 'disk'
     
     def cache_bulk_data(self, client_name: str, file_content: bytes, processed_data: Dict[str, pd.DataFrame]) -> bool:
         """Cache processed bulk data."""
         try:
             file_hash = hashlib.md5(file_content).hexdigest()
-            compressed_data = self._compress_data(processed_data)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO client_data (client_name, data_type, file_hash, processed_data)
-                VALUES (?, ?, ?, ?)
-            ''', (client_name, 'bulk_data', file_hash, compressed_data))
-            
-            conn.commit()
-            conn.close()
+            self._put_blob('client_data', (client_name, 'bulk_data', file_hash), processed_data)
             
             if 'debug_messages' in st.session_state:
                 st.session_state.debug_messages.append(f"[DB] Cached bulk data for {client_name} with hash {file_hash[:8]}")
@@ -186,22 +463,11 @@ class DatabaseManager:
         """Retrieve cached bulk data if it exists and matches the file hash."""
         try:
             file_hash = hashlib.md5(file_content).hexdigest()
+            processed_data, tier = self._get_blob('client_data', (client_name, 'bulk_data', file_hash))
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT processed_data FROM client_data 
-                WHERE client_name = ? AND data_type = ? AND file_hash = ?
-            ''', (client_name, 'bulk_data', file_hash))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                processed_data = self._decompress_data(result[0])
+            if tier:
                 if 'debug_messages' in st.session_state:
-                    st.session_state.debug_messages.append(f"[DB] Retrieved cached bulk data for {client_name}")
+                    st.session_state.debug_messages.append(f"[DB] Retrieved cached bulk data for {client_name} ({tier})")
                 return processed_data
             
             return None
@@ -214,18 +480,7 @@ class DatabaseManager:
         """Cache processed sales report data."""
         try:
             file_hash = hashlib.md5(file_content).hexdigest()
-            compressed_data = self._compress_data(processed_data)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO client_data (client_name, data_type, file_hash, processed_data)
-                VALUES (?, ?, ?, ?)
-            ''', (client_name, 'sales_report', file_hash, compressed_data))
-            
-            conn.commit()
-            conn.close()
+            self._put_blob('client_data', (client_name, 'sales_report', file_hash), processed_data)
             
             if 'debug_messages' in st.session_state:
                 st.session_state.debug_messages.append(f"[DB] Cached sales report for {client_name} with hash {file_hash[:8]}")
@@ -240,22 +495,11 @@ class DatabaseManager:
         """Retrieve cached sales report data if it exists and matches the file hash."""
         try:
             file_hash = hashlib.md5(file_content).hexdigest()
+            processed_data, tier = self._get_blob('client_data', (client_name, 'sales_report', file_hash))
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT processed_data FROM client_data 
-                WHERE client_name = ? AND data_type = ? AND file_hash = ?
-            ''', (client_name, 'sales_report', file_hash))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                processed_data = self._decompress_data(result[0])
+            if tier:
                 if 'debug_messages' in st.session_state:
-                    st.session_state.debug_messages.append(f"[DB] Retrieved cached sales report for {client_name}")
+                    st.session_state.debug_messages.append(f"[DB] Retrieved cached sales report for {client_name} ({tier})")
                 return processed_data
             
             return None
@@ -264,22 +508,39 @@ class DatabaseManager:
                 st.session_state.debug_messages.append(f"[DB Error] Failed to retrieve cached sales report: {str(e)}")
             return None
     
-    def cache_analysis_result(self, client_name: str, analysis_type: str, input_data: Any, result_data: Any) -> bool:
-        """Cache analysis results."""
+    def _analysis_key(self, client_name: str, analysis_type: str, input_data: Any, logic_version: int) -> tuple:
+        input_hash = self._calculate_hash(input_data)
+        if logic_version:
+            # Each logic version is its own namespace of input hashes
+            input_hash = f"v{logic_version}:{input_hash}"
+        return (client_name, analysis_type, input_hash)
+    
+    def cache_analysis_result(self, client_name: str, analysis_type: str, input_data: Any, result_data: Any,
+                              logic_version: int = 0) -> bool:
+        """Cache analysis results.
+        
+        ``logic_version`` is the version of the code that computed the result;
+        rows of the same analysis type from older versions are dropped on the
+        first write of each type and version in this process.
+        """
         try:
-            input_hash = self._calculate_hash(input_data)
-            compressed_data = self._compress_data(result_data)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO analysis_cache (client_name, analysis_type, input_hash, result_data)
-                VALUES (?, ?, ?, ?)
-            ''', (client_name, analysis_type, input_hash, compressed_data))
-            
-            conn.commit()
-            conn.close()
+            key = self._analysis_key(client_name, analysis_type, input_data, logic_version)
+            stale_rows = 0
+            if (analysis_type, logic_version) not in self._purged_versions:
+                # Once per analysis type and version per process, not on every write
+                with self._transaction() as cursor:
+                    cursor.execute('DELETE FROM analysis_cache WHERE analysis_type = ? AND logic_version < ?',
+                                   (analysis_type, logic_version))
+                    stale_rows = cursor.rowcount
+                self._purged_versions.add((analysis_type, logic_version))
+            self._put_blob('analysis_cache', key, result_data, {'logic_version': logic_version})
+            if stale_rows > 0:
+                self.memory.discard_where(lambda k: k[0] == 'analysis_cache' and k[2] == analysis_type
+                                          and _hash_logic_version(k[3]) < logic_version)
+                if 'debug_messages' in st.session_state:
+                    st.session_state.debug_messages.append(
+                        f"[DB] Dropped {stale_rows} {analysis_type} results from older logic versions"
+                    )
             
             if 'debug_messages' in st.session_state:
                 st.session_state.debug_messages.append(f"[DB] Cached {analysis_type} analysis for {client_name}")
@@ -290,26 +551,16 @@ class DatabaseManager:
                 st.session_state.debug_messages.append(f"[DB Error] Failed to cache analysis result: {str(e)}")
             return False
     
-    def get_cached_analysis_result(self, client_name: str, analysis_type: str, input_data: Any) -> Optional[Any]:
-        """Retrieve cached analysis result if it exists and matches the input hash."""
+    def get_cached_analysis_result(self, client_name: str, analysis_type: str, input_data: Any,
+                                   logic_version: int = 0) -> Optional[Any]:
+        """Retrieve cached analysis result if it exists and matches the input hash and logic version."""
         try:
-            input_hash = self._calculate_hash(input_data)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT result_data FROM analysis_cache 
-                WHERE client_name = ? AND analysis_type = ? AND input_hash = ?
-            ''', (client_name, analysis_type, input_hash))
-            
-            result = cursor.fetchone()
-            conn.close()
+            key = self._analysis_key(client_name, analysis_type, input_data, logic_version)
+            result_data, tier = self._get_blob('analysis_cache', key)
             
-            if result:
-                result_data = self._decompress_data(result[0])
+            if tier:
                 if 'debug_messages' in st.session_state:
-                    st.session_state.debug_messages.append(f"[DB] Retrieved cached {analysis_type} analysis for {client_name}")
+                    st.session_state.debug_messages.append(f"[DB] Retrieved cached {analysis_type} analysis for {client_name} ({tier})")
                 return result_data
             
             return None
@@ -321,14 +572,10 @@ class DatabaseManager:
     def clear_client_cache(self, client_name: str) -> bool:
         """Clear all cached data for a specific client."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM client_data WHERE client_name = ?', (client_name,))
-            cursor.execute('DELETE FROM analysis_cache WHERE client_name = ?', (client_name,))
-            
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                cursor.execute('DELETE FROM client_data WHERE client_name = ?', (client_name,))
+                cursor.execute('DELETE FROM analysis_cache WHERE client_name = ?', (client_name,))
+            self.memory.discard_where(lambda key: key[1] == client_name)
             
             if 'debug_messages' in st.session_state:
                 st.session_state.debug_messages.append(f"[DB] Cleared all cache for {client_name}")
@@ -339,6 +586,33 @@ class DatabaseManager:
                 st.session_state.debug_messages.append(f"[DB Error] Failed to clear client cache: {str(e)}")
             return False
     
+    def invalidate_analyses(self, client_name: str, analysis_types: List[str]) -> bool:
+        """Drop cached results of the given analysis types for one client."""
+        analysis_types = list(analysis_types)
+        if not analysis_types:
+            return True
+        try:
+            placeholders = ', '.join('?' for _ in analysis_types)
+            with self._transaction() as cursor:
+                cursor.execute(f'''
+                    DELETE FROM analysis_cache
+                    WHERE client_name = ? AND analysis_type IN ({placeholders})
+                ''', (client_name, *analysis_types))
+                removed = cursor.rowcount
+            types = set(analysis_types)
+            self.memory.discard_where(lambda key: key[0] == 'analysis_cache' and key[1] == client_name
+                                      and key[2] in types)
+
+            if 'debug_messages' in st.session_state:
+                st.session_state.debug_messages.append(
+                    f"[DB] Invalidated {removed} cached {', '.join(analysis_types)} result(s) for {client_name}")
+
+            return True
+        except Exception as e:
+            if 'debug_messages' in st.session_state:
+                st.session_state.debug_messages.append(f"[DB Error] Failed to invalidate analyses: {str(e)}")
+            return False
+
     # ========== Client Config Caching Methods ==========
     
     def cache_client_names(self, user_id: str, client_names: List[str]) -> bool:
@@ -349,16 +623,11 @@ class DatabaseManager:
             
             names_json = json.dumps(client_names)
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO client_names_cache (user_id, client_names, last_accessed)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-            ''', (user_id, names_json))
-            
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO client_names_cache (user_id, client_names, last_accessed)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                ''', (user_id, names_json))
             
             _elapsed = (_t.perf_counter() - _t0) * 1000
             if 'debug_messages' in st.session_state:
@@ -376,29 +645,23 @@ class DatabaseManager:
             import time as _t
             _t0 = _t.perf_counter()
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT client_names, 
-                       (julianday('now') - julianday(last_accessed)) * 86400 as age_seconds
-                FROM client_names_cache 
-                WHERE user_id = ?
-            ''', (user_id,))
-            
-            result = cursor.fetchone()
+            with self._connection() as conn:
+                result = conn.execute('''
+                    SELECT client_names, 
+                           (julianday('now') - julianday(last_accessed)) * 86400 as age_seconds
+                    FROM client_names_cache 
+                    WHERE user_id = ?
+                ''', (user_id,)).fetchone()
             
             if result:
                 names_json, age = result
                 if age <= max_age_seconds:
-                    # Update last_accessed
-                    cursor.execute('''
+                    # Update last_accessed (batched with other pending touches)
+                    self._touch('''
                         UPDATE client_names_cache 
                         SET last_accessed = CURRENT_TIMESTAMP 
                         WHERE user_id = ?
                     ''', (user_id,))
-                    conn.commit()
-                    conn.close()
                     
                     client_names = json.loads(names_json)
                     _elapsed = (_t.perf_counter() - _t0) * 1000
@@ -406,7 +669,6 @@ class DatabaseManager:
                         st.session_state.debug_messages.append(f"[SQLite] Retrieved {len(client_names)} client names from cache in {int(_elapsed)}ms")
                     return client_names
             
-            conn.close()
             return None
         except Exception as e:
             if 'debug_messages' in st.session_state:
@@ -421,17 +683,12 @@ class DatabaseManager:
             
             config_json = json.dumps(config_data)
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO client_config_cache 
-                (user_id, client_name, config_data, last_accessed)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (user_id, client_name, config_json))
-            
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO client_config_cache 
+                    (user_id, client_name, config_data, last_accessed)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (user_id, client_name, config_json))
             
             _elapsed = (_t.perf_counter() - _t0) * 1000
             if 'debug_messages' in st.session_state:
@@ -449,29 +706,23 @@ class DatabaseManager:
             import time as _t
             _t0 = _t.perf_counter()
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT config_data,
-                       (julianday('now') - julianday(last_accessed)) * 86400 as age_seconds
-                FROM client_config_cache 
-                WHERE user_id = ? AND client_name = ?
-            ''', (user_id, client_name))
-            
-            result = cursor.fetchone()
+            with self._connection() as conn:
+                result = conn.execute('''
+                    SELECT config_data,
+                           (julianday('now') - julianday(last_accessed)) * 86400 as age_seconds
+                    FROM client_config_cache 
+                    WHERE user_id = ? AND client_name = ?
+                ''', (user_id, client_name)).fetchone()
             
             if result:
                 config_json, age = result
                 if age <= max_age_seconds:
-                    # Update last_accessed
-                    cursor.execute('''
+                    # Update last_accessed (batched with other pending touches)
+                    self._touch('''
                         UPDATE client_config_cache 
                         SET last_accessed = CURRENT_TIMESTAMP 
                         WHERE user_id = ? AND client_name = ?
                     ''', (user_id, client_name))
-                    conn.commit()
-                    conn.close()
                     
                     config_data = json.loads(config_json)
                     _elapsed = (_t.perf_counter() - _t0) * 1000
@@ -479,7 +730,6 @@ class DatabaseManager:
                         st.session_state.debug_messages.append(f"[SQLite] Retrieved config for {client_name} from cache in {int(_elapsed)}ms")
                     return config_data
             
-            conn.close()
             return None
         except Exception as e:
             if 'debug_messages' in st.session_state:
@@ -494,17 +744,12 @@ class DatabaseManager:
             
             sessions_json = json.dumps(session_list)
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO session_metadata_cache 
-                (user_id, client_name, session_list, last_accessed)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (user_id, client_name, sessions_json))
-            
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO session_metadata_cache 
+                    (user_id, client_name, session_list, last_accessed)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (user_id, client_name, sessions_json))
             
             _elapsed = (_t.perf_counter() - _t0) * 1000
             if 'debug_messages' in st.session_state:
@@ -522,29 +767,23 @@ class DatabaseManager:
             import time as _t
             _t0 = _t.perf_counter()
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT session_list,
-                       (julianday('now') - julianday(last_accessed)) * 86400 as age_seconds
-                FROM session_metadata_cache 
-                WHERE user_id = ? AND client_name = ?
-            ''', (user_id, client_name))
-            
-            result = cursor.fetchone()
+            with self._connection() as conn:
+                result = conn.execute('''
+                    SELECT session_list,
+                           (julianday('now') - julianday(last_accessed)) * 86400 as age_seconds
+                    FROM session_metadata_cache 
+                    WHERE user_id = ? AND client_name = ?
+                ''', (user_id, client_name)).fetchone()
             
             if result:
                 sessions_json, age = result
                 if age <= max_age_seconds:
-                    # Update last_accessed
-                    cursor.execute('''
+                    # Update last_accessed (batched with other pending touches)
+                    self._touch('''
                         UPDATE session_metadata_cache 
                         SET last_accessed = CURRENT_TIMESTAMP 
                         WHERE user_id = ? AND client_name = ?
                     ''', (user_id, client_name))
-                    conn.commit()
-                    conn.close()
                     
                     session_list = json.loads(sessions_json)
                     _elapsed = (_t.perf_counter() - _t0) * 1000
@@ -552,7 +791,6 @@ class DatabaseManager:
                         st.session_state.debug_messages.append(f"[SQLite] Retrieved {len(session_list)} sessions from cache in {int(_elapsed)}ms")
                     return session_list
             
-            conn.close()
             return None
         except Exception as e:
             if 'debug_messages' in st.session_state:
@@ -562,27 +800,22 @@ class DatabaseManager:
     def invalidate_client_cache(self, user_id: str, client_name: str = None) -> bool:
         """Invalidate cached data for a user or specific client."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if client_name:
-                # Invalidate specific client
-                cursor.execute('DELETE FROM client_config_cache WHERE user_id = ? AND client_name = ?', 
-                             (user_id, client_name))
-                cursor.execute('DELETE FROM session_metadata_cache WHERE user_id = ? AND client_name = ?', 
-                             (user_id, client_name))
-                if 'debug_messages' in st.session_state:
-                    st.session_state.debug_messages.append(f"[SQLite] Invalidated cache for {client_name}")
-            else:
-                # Invalidate all for user
-                cursor.execute('DELETE FROM client_config_cache WHERE user_id = ?', (user_id,))
-                cursor.execute('DELETE FROM client_names_cache WHERE user_id = ?', (user_id,))
-                cursor.execute('DELETE FROM session_metadata_cache WHERE user_id = ?', (user_id,))
-                if 'debug_messages' in st.session_state:
-                    st.session_state.debug_messages.append(f"[SQLite] Invalidated all cache for user")
-            
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                if client_name:
+                    # Invalidate specific client
+                    cursor.execute('DELETE FROM client_config_cache WHERE user_id = ? AND client_name = ?', 
+                                 (user_id, client_name))
+                    cursor.execute('DELETE FROM session_metadata_cache WHERE user_id = ? AND client_name = ?', 
+                                 (user_id, client_name))
+                    if 'debug_messages' in st.session_state:
+                        st.session_state.debug_messages.append(f"[SQLite] Invalidated cache for {client_name}")
+                else:
+                    # Invalidate all for user
+                    cursor.execute('DELETE FROM client_config_cache WHERE user_id = ?', (user_id,))
+                    cursor.execute('DELETE FROM client_names_cache WHERE user_id = ?', (user_id,))
+                    cursor.execute('DELETE FROM session_metadata_cache WHERE user_id = ?', (user_id,))
+                    if 'debug_messages' in st.session_state:
+                        st.session_state.debug_messages.append(f"[SQLite] Invalidated all cache for user")
             return True
         except Exception as e:
             if 'debug_messages' in st.session_state:
@@ -592,64 +825,239 @@ class DatabaseManager:
     # ========== End Client Config Caching Methods ==========
     
     def cleanup_old_cache(self, days_old: int = 7) -> bool:
-        """Remove cached data older than specified days."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                DELETE FROM data_cache 
-                WHERE created_at < datetime('now', '-{} days')
-            '''.format(days_old))
-            
-            cursor.execute('''
-                DELETE FROM client_data 
-                WHERE created_at < datetime('now', '-{} days')
-            '''.format(days_old))
-            
-            cursor.execute('''
-                DELETE FROM analysis_cache 
-                WHERE created_at < datetime('now', '-{} days')
-            '''.format(days_old))
-            
-            conn.commit()
-            conn.close()
-            
-            if 'debug_messages' in st.session_state:
+        """Remove cached data older than specified days (blocks until done)."""
+        report = self.run_maintenance(days_old)
+        if 'debug_messages' in st.session_state:
+            if report.get('error'):
+                st.session_state.debug_messages.append(f"[DB Error] Failed to cleanup old cache: {report['error']}")
+            else:
                 st.session_state.debug_messages.append(f"[DB] Cleaned up cache older than {days_old} days")
-            
-            return True
-        except Exception as e:
-            if 'debug_messages' in st.session_state:
-                st.session_state.debug_messages.append(f"[DB Error] Failed to cleanup old cache: {str(e)}")
-            return False
+        return not report.get('error')
+    
+    def start_background_maintenance(self, days_old: int = 7,
+                                     min_interval: float = MAINTENANCE_INTERVAL_SECONDS) -> bool:
+        """Run ``run_maintenance`` on a daemon thread unless it ran (or is running) recently.
+        
+        Returns immediately; True if a run was started. The outcome is kept in
+        ``last_maintenance``.
+        """
+        with self._maintenance_lock:
+            if self._maintenance_thread is not None and self._maintenance_thread.is_alive():
+                return False
+            now = time.monotonic()
+            if self._last_maintenance_start is not None and now - self._last_maintenance_start < min_interval:
+                return False
+            self._last_maintenance_start = now
+            self._maintenance_thread = threading.Thread(
+                target=self.run_maintenance, args=(days_old,), name='cache-maintenance', daemon=True)
+            self._maintenance_thread.start()
+        return True
+    
+    def _expire_batch(self, table: str, days_old: int, limit: int) -> tuple:
+        """Delete up to ``limit`` of the oldest rows created more than ``days_old`` days ago.
+        
+        Returns (rows deleted, blob bytes deleted).
+        """
+        key_columns = BLOB_KEY_COLUMNS.get(table, ())
+        size_sql = 'size_bytes' if table in BUDGETED_TABLES else 'COALESCE(length(compressed_data), 0)'
+        select_columns = ', '.join(('id', size_sql) + key_columns)
+        with self._transaction() as cursor:
+            # Walks idx_{table}_created_at, so each batch only touches the rows it deletes
+            rows = cursor.execute(f'''
+                SELECT {select_columns} FROM {table}
+                WHERE created_at < datetime('now', ?)
+                ORDER BY created_at
+                LIMIT ?
+            ''', (f'-{int(days_old)} days', limit)).fetchall()
+            if rows:
+                cursor.executemany(f'DELETE FROM {table} WHERE id = ?', [(row[0],) for row in rows])
+        if key_columns:
+            for row in rows:
+                self.memory.discard((table,) + tuple(row[2:]))
+        return len(rows), sum(row[1] for row in rows)
+    
+    def run_maintenance(self, days_old: int = 7, batch_size: int = CLEANUP_BATCH_ROWS,
+                        pause: float = CLEANUP_BATCH_PAUSE_SECONDS) -> Dict[str, Any]:
+        """Expire old rows in batches, enforce the byte budget and release freed pages.
+        
+        Other connections can read and write between batches. Returns (and keeps
+        in ``last_maintenance``) what was removed and how much the file shrank.
+        Nothing here touches st.session_state, since this usually runs on the
+        maintenance thread.
+        """
+        started = time.perf_counter()
+        report: Dict[str, Any] = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'days_old': days_old,
+            'rows_deleted': {table: 0 for table in EXPIRING_TABLES},
+            'bytes_deleted': 0,
+            'batches': 0,
+            'evicted': 0,
+            'bytes_evicted': 0,
+            'file_bytes_reclaimed': 0,
+            'seconds': 0.0,
+            'error': None,
+        }
+        file_size_before = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        try:
+            for table in EXPIRING_TABLES:
+                while not self._maintenance_stop.is_set():
+                    deleted, deleted_bytes = self._expire_batch(table, days_old, batch_size)
+                    report['rows_deleted'][table] += deleted
+                    report['bytes_deleted'] += deleted_bytes
+                    if deleted:
+                        report['batches'] += 1
+                    if deleted < batch_size:
+                        break
+                    # Let waiting writers in between batches
+                    self._maintenance_stop.wait(pause)
+            if not self._maintenance_stop.is_set():
+                report['evicted'], report['bytes_evicted'], report['error'] = self._evict_over_budget()
+                if not report['error']:
+                    report['error'] = self._vacuum(convert=bool(report['evicted']))
+        except sqlite3.Error as e:
+            report['error'] = str(e)
+        file_size_after = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        report['file_bytes_reclaimed'] = max(0, file_size_before - file_size_after)
+        report['seconds'] = time.perf_counter() - started
+        self.last_maintenance = report
+        return report
+    
+    def _cache_usage(self, cursor: sqlite3.Cursor) -> int:
+        """Bytes of cached blobs counted against the budget."""
+        total = 0
+        for table in BUDGETED_TABLES:
+            total += cursor.execute(f'SELECT COALESCE(SUM(size_bytes), 0) FROM {table}').fetchone()[0]
+        return total
+    
+    def enforce_cache_budget(self, max_bytes: Optional[int] = None) -> int:
+        """Evict least recently used blobs until the cache fits its byte budget.
+        
+        Once the budget is exceeded, rows are removed oldest-access first across
+        client_data and analysis_cache until usage is back under
+        CACHE_EVICTION_TARGET of the budget. A budget of 0 disables eviction.
+        Returns the number of rows evicted.
+        """
+        budget = self.max_cache_bytes if max_bytes is None else max_bytes
+        evicted, freed, error = self._evict_over_budget(max_bytes)
+        if error is None and evicted:
+            error = self._vacuum()
+        if 'debug_messages' in st.session_state:
+            if evicted:
+                st.session_state.debug_messages.append(
+                    f"[DB] Evicted {evicted} cached entries ({freed / (1024 * 1024):.1f} MB) "
+                    f"to stay under the {budget / (1024 * 1024):.0f} MB cache budget"
+                )
+            if error:
+                st.session_state.debug_messages.append(f"[DB Error] {error}")
+        return evicted
+    
+    def _evict_over_budget(self, max_bytes: Optional[int] = None) -> tuple:
+        """Do the eviction for ``enforce_cache_budget`` without logging.
+        
+        Safe to call off the script thread. Returns (rows evicted, bytes freed,
+        error message or None).
+        """
+        budget = self.max_cache_bytes if max_bytes is None else max_bytes
+        if budget <= 0:
+            return 0, 0, None
+        # Another thread is already evicting
+        if not self._eviction_lock.acquire(blocking=False):
+            return 0, 0, None
+        try:
+            with self._transaction() as cursor:
+                usage = self._cache_usage(cursor)
+                if usage <= budget:
+                    return 0, 0, None
+                target = int(budget * CACHE_EVICTION_TARGET)
+                candidates = cursor.execute(' UNION ALL '.join(
+                    f"SELECT '{table}', id, size_bytes, last_accessed, {', '.join(key_columns)} FROM {table}"
+                    for table, key_columns in ((table, BLOB_KEY_COLUMNS[table]) for table in BUDGETED_TABLES)
+                ) + ' ORDER BY last_accessed, id').fetchall()
+                victims: Dict[str, List[tuple]] = {}
+                evicted_keys = []
+                freed = 0
+                for table, row_id, size_bytes, _, *key in candidates:
+                    if usage - freed <= target:
+                        break
+                    victims.setdefault(table, []).append((row_id,))
+                    evicted_keys.append((table,) + tuple(key))
+                    freed += size_bytes
+                for table, row_ids in victims.items():
+                    cursor.executemany(f'DELETE FROM {table} WHERE id = ?', row_ids)
+            # Keep the memory tier from serving rows SQLite no longer has
+            for memory_key in evicted_keys:
+                self.memory.discard(memory_key)
+            return len(evicted_keys), freed, None
+        except sqlite3.Error as e:
+            return 0, 0, f"Failed to enforce cache budget: {str(e)}"
+        finally:
+            self._eviction_lock.release()
+    
+    def _vacuum(self, convert: bool = True) -> Optional[str]:
+        """Return free pages to the filesystem a step at a time.
+        
+        Files created before incremental auto-vacuum was enabled need one full
+        VACUUM to switch over; with ``convert`` that happens here, after eviction
+        has already brought the file down to the budget. Returns an error
+        message, or None; the caller decides whether to log it.
+        """
+        try:
+            with self._connection() as conn:
+                if conn.in_transaction:
+                    # Inside batch(): the caller's transaction has to finish first
+                    return
+                if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                    if convert:
+                        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                        conn.execute('VACUUM')
+                        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+                    return
+                # Each step is its own short write transaction (autocommit)
+                vacuumed = False
+                while conn.execute('PRAGMA freelist_count').fetchone()[0] > 0:
+                    conn.execute(f'PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})').fetchall()
+                    vacuumed = True
+                if vacuumed:
+                    # Pages only leave the main file, and the WAL only shrinks, at a checkpoint
+                    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        except sqlite3.Error as e:
+            return f"Incremental vacuum failed: {str(e)}"
+        return None
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                # Get total cache size
+                cursor.execute('SELECT COUNT(*) FROM data_cache')
+                total_cache_entries = cursor.fetchone()[0]
             
-            # Get total cache size
-            cursor.execute('SELECT COUNT(*) FROM data_cache')
-            total_cache_entries = cursor.fetchone()[0]
+                cursor.execute('SELECT COUNT(*) FROM client_data')
+                total_client_entries = cursor.fetchone()[0]
             
-            cursor.execute('SELECT COUNT(*) FROM client_data')
-            total_client_entries = cursor.fetchone()[0]
+                cursor.execute('SELECT COUNT(*) FROM analysis_cache')
+                total_analysis_entries = cursor.fetchone()[0]
             
-            cursor.execute('SELECT COUNT(*) FROM analysis_cache')
-            total_analysis_entries = cursor.fetchone()[0]
+                cache_bytes = self._cache_usage(cursor)
             
-            # Get database file size
-            db_size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
-            
-            conn.close()
+                # Get database file size
+                db_size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+            memory_stats = self.memory.stats()
             
             return {
                 'total_cache_entries': total_cache_entries,
                 'total_client_entries': total_client_entries,
                 'total_analysis_entries': total_analysis_entries,
                 'db_size_mb': db_size / (1024 * 1024),
+                'cache_size_mb': cache_bytes / (1024 * 1024),
+                'cache_budget_mb': self.max_cache_bytes / (1024 * 1024),
+                'memory_entries': memory_stats['entries'],
+                'memory_mb': memory_stats['bytes'] / (1024 * 1024),
+                'memory_budget_mb': memory_stats['max_bytes'] / (1024 * 1024),
+                'memory_hits': memory_stats['hits'],
+                'last_maintenance': self.last_maintenance,
                 'db_path': self.db_path
             }
         except Exception as e:
@@ -658,4 +1066,5 @@ class DatabaseManager:
             return {}
 
 # Global database manager instance
-db_manager = DatabaseManager() 
\ No newline at end of file
+db_manager = DatabaseManager()
+atexit.register(db_manager.close) 
\ No newline at end of file
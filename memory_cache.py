@@ -0,0 +1,165 @@
+"""In-process memory tier in front of the SQLite cache.
+
+Decoded cache values (bulk data, sales reports, analysis results) are kept in
+a byte-budgeted LRU shared by every session in the process, so a repeat
+lookup hands back the object already in memory instead of reading and
+decoding the blob again. Entries are keyed exactly like their SQLite rows
+(table, client, type, content hash); evicting one here only drops the memory
+copy, the SQLite tier still has it.
+
+Values are shared, so they follow the same rule as ingested frames: treat
+them as read-only. Lookups return shallow copies of DataFrames (and of the
+tuples/lists/dicts holding them), so adding or replacing columns on a result
+does not leak into the cache, but writing values in place would.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from bulk_reader import BulkWorkbook
+
+MEMORY_CACHE_ENV = 'AUDIT_MEMORY_CACHE_MB'
+DEFAULT_MEMORY_CACHE_MB = 512
+# Object columns are sized from this many sampled values
+SIZE_SAMPLE_VALUES = 1000
+
+
+def memory_budget_bytes(configured: Any = None) -> int:
+    """Memory tier budget in bytes from ``configured`` MB, the environment, or the default."""
+    if configured is None:
+        configured = os.environ.get(MEMORY_CACHE_ENV)
+    try:
+        megabytes = float(configured) if configured not in (None, '') else DEFAULT_MEMORY_CACHE_MB
+    except (TypeError, ValueError):
+        megabytes = DEFAULT_MEMORY_CACHE_MB
+    return max(0, int(megabytes * 1024 * 1024))
+
+
+def _object_column_size(values: np.ndarray) -> int:
+    """Pointer array plus the sampled average size of the Python objects it holds."""
+    count = len(values)
+    if count == 0:
+        return 0
+    step = max(1, count // SIZE_SAMPLE_VALUES)
+    sample = values[::step]
+    average = sum(sys.getsizeof(v) for v in sample) / len(sample)
+    return int(values.nbytes + average * count)
+
+
+def _frame_size(df: pd.DataFrame) -> int:
+    # memory_usage(deep=True) measures every string and takes seconds on large frames
+    total = int(df.index.memory_usage())
+    for position, dtype in enumerate(df.dtypes):
+        column = df.iloc[:, position]
+        if dtype == object:
+            total += _object_column_size(column.to_numpy())
+        else:
+            total += int(column.memory_usage(index=False))
+    return total
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate bytes held by a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return _frame_size(value)
+    if isinstance(value, pd.Series):
+        return _frame_size(value.to_frame())
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+def shared_view(value: Any) -> Any:
+    """New container/DataFrame objects over the same column data as ``value``."""
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    if isinstance(value, BulkWorkbook):
+        return value.session_view()
+    if isinstance(value, tuple):
+        return tuple(shared_view(v) for v in value)
+    if isinstance(value, list):
+        return [shared_view(v) for v in value]
+    if isinstance(value, dict):
+        return {k: shared_view(v) for k, v in value.items()}
+    return value
+
+
+class MemoryLRU:
+    """Thread-safe LRU of cache values bounded by their estimated size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Shared view of the value for ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return shared_view(entry[0])
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """Keep ``value`` (as a shared view) under ``key``; False if it is larger than the budget."""
+        if value is None or self.max_bytes <= 0:
+            return False
+        size = estimate_size(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return False
+            self._entries[key] = (shared_view(value), size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches ``predicate``; returns how many were dropped."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
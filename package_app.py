@@ -103,6 +103,20 @@ a = Analysis(
             ('.streamlit', '.streamlit'),
             ('app.py', '.'),
             ('database.py', '.'),
+            ('bulk_reader.py', '.'),
+            ('column_schema.py', '.'),
+            ('branded_classifier.py', '.'),
+            ('data_fingerprint.py', '.'),
+            ('blob_codec.py', '.'),
+            ('memory_cache.py', '.'),
+            ('cache_metrics.py', '.'),
+            ('config_dependencies.py', '.'),
+            ('precompute.py', '.'),
+            ('shared_store.py', '.'),
+            ('secure_files.py', '.'),
+            ('session_compare.py', '.'),
+            ('session_index.py', '.'),
+            ('session_snapshot.py', '.'),
             ('supabase_store.py', '.'),
         ]
     ),
@@ -158,6 +172,20 @@ a = Analysis(
         'postgrest',
         'httpx',
         'database',
+        'bulk_reader',
+        'column_schema',
+        'branded_classifier',
+        'data_fingerprint',
+        'blob_codec',
+        'memory_cache',
+        'cache_metrics',
+        'config_dependencies',
+        'precompute',
+        'shared_store',
+        'secure_files',
+        'session_compare',
+        'session_index',
+        'session_snapshot',
         'supabase_store',
     ],
     hookspath=[],
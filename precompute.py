@@ -0,0 +1,194 @@
+"""Background precompute of the heavy audit analyses.
+
+When a bulk file is ingested or a saved session is loaded, the analyses the
+Advertising Audit sections render from (targeting performance, search terms,
+campaign performance, word clouds) are queued on a worker thread. Their
+results land in the shared caches (the SQLite/memory tiers and st.cache_data),
+so by the time a user scrolls to a section it renders from cache instead of
+computing synchronously.
+
+Each session has at most one job; scheduling a new one cancels the previous
+job's remaining tasks. Jobs from all sessions share a small thread pool so
+concurrent uploads don't compete for the CPU with more than a few workers.
+If a section needs an analysis the worker is computing at that moment, it
+waits for that result (``wait_for_precompute``) instead of computing it twice.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+PRECOMPUTE_WORKERS_ENV = 'AUDIT_PRECOMPUTE_WORKERS'
+DEFAULT_PRECOMPUTE_WORKERS = 1
+# Longest a section waits for the task the worker is running before computing it itself
+PRECOMPUTE_WAIT_SECONDS = 600
+
+_SESSIONLESS = '__no_session__'
+
+
+def _worker_count() -> int:
+    try:
+        return max(1, int(os.environ.get(PRECOMPUTE_WORKERS_ENV, DEFAULT_PRECOMPUTE_WORKERS)))
+    except ValueError:
+        return DEFAULT_PRECOMPUTE_WORKERS
+
+
+def _script_run_ctx():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except Exception:
+        return None
+    return get_script_run_ctx()
+
+
+@contextmanager
+def _attached_session(ctx):
+    """Make ``st.session_state`` on this thread refer to the session of ``ctx``."""
+    if ctx is None:
+        yield
+        return
+    from streamlit.runtime.scriptrunner import add_script_run_ctx
+    from streamlit.runtime.scriptrunner.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+    thread = threading.current_thread()
+    add_script_run_ctx(thread, ctx)
+    try:
+        yield
+    finally:
+        setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+
+
+class PrecomputeTask:
+    """One analysis to precompute.
+
+    ``run`` receives the results of the job's earlier tasks (by name) and
+    returns this task's result. Tasks that read ``st.session_state`` set
+    ``needs_session``; they run with the scheduling session attached to the
+    worker thread, so they must not render anything. Other tasks run detached,
+    which makes st.cache_data spinners inside them no-ops.
+    """
+
+    def __init__(self, name: str, label: str, run: Callable[[Dict[str, Any]], Any],
+                 needs_session: bool = False):
+        self.name = name
+        self.label = label
+        self.run = run
+        self.needs_session = needs_session
+
+
+class PrecomputeJob:
+    """The precompute tasks queued for one session, run in order on the worker pool."""
+
+    def __init__(self, session_id: str, tasks: List[PrecomputeTask], ctx=None):
+        self.session_id = session_id
+        self.tasks = tasks
+        self.ctx = ctx
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self.done = 0
+        self.current: Optional[str] = None
+        self.finished = False
+        self.cancelled = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._condition = threading.Condition()
+
+    def cancel(self) -> None:
+        """Skip the tasks that have not started yet."""
+        with self._condition:
+            self.cancelled = True
+
+    def run(self) -> None:
+        self._thread = threading.current_thread()
+        self.started_at = time.time()
+        try:
+            for task in self.tasks:
+                with self._condition:
+                    if self.cancelled:
+                        break
+                    self.current = task.name
+                try:
+                    with _attached_session(self.ctx if task.needs_session else None):
+                        self.results[task.name] = task.run(self.results)
+                except Exception as e:
+                    self.errors[task.name] = str(e)
+                with self._condition:
+                    self.done += 1
+                    self.current = None
+                    self._condition.notify_all()
+        finally:
+            with self._condition:
+                self.current = None
+                self.finished = True
+                self.finished_at = time.time()
+                self._condition.notify_all()
+
+    def wait_for(self, name: str, timeout: float = PRECOMPUTE_WAIT_SECONDS) -> bool:
+        """Block while the worker is running task ``name``; True if it was waited for."""
+        if threading.current_thread() is self._thread:
+            return False
+        deadline = time.monotonic() + timeout
+        waited = False
+        with self._condition:
+            while self.current == name and not self.finished:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                waited = True
+                self._condition.wait(remaining)
+        return waited
+
+    def progress(self) -> Dict[str, Any]:
+        with self._condition:
+            current = next((t.label for t in self.tasks if t.name == self.current), None)
+            return {
+                'done': self.done,
+                'total': len(self.tasks),
+                'current': current,
+                'finished': self.finished,
+                'cancelled': self.cancelled,
+                'errors': dict(self.errors),
+                'seconds': ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0,
+            }
+
+
+_executor = ThreadPoolExecutor(max_workers=_worker_count(), thread_name_prefix='precompute')
+_jobs: Dict[str, PrecomputeJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def _session_id(ctx) -> str:
+    return ctx.session_id if ctx is not None else _SESSIONLESS
+
+
+def schedule_precompute(tasks: List[PrecomputeTask]) -> PrecomputeJob:
+    """Queue ``tasks`` for the current session, replacing any job it already has."""
+    ctx = _script_run_ctx()
+    job = PrecomputeJob(_session_id(ctx), tasks, ctx)
+    with _jobs_lock:
+        previous = _jobs.get(job.session_id)
+        if previous is not None:
+            previous.cancel()
+        _jobs[job.session_id] = job
+    _executor.submit(job.run)
+    return job
+
+
+def current_precompute_job() -> Optional[PrecomputeJob]:
+    """The current session's latest job, if any."""
+    with _jobs_lock:
+        return _jobs.get(_session_id(_script_run_ctx()))
+
+
+def wait_for_precompute(name: str, timeout: float = PRECOMPUTE_WAIT_SECONDS) -> bool:
+    """Wait for the current session's worker if it is computing ``name`` right now."""
+    job = current_precompute_job()
+    return job.wait_for(name, timeout) if job is not None else False
+
+
+def precompute_progress() -> Optional[Dict[str, Any]]:
+    """Progress of the current session's latest job, or None if it has none."""
+    job = current_precompute_job()
+    return job.progress() if job is not None else None
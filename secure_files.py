@@ -0,0 +1,240 @@
+"""Chunked, streaming authenticated encryption for files at rest.
+
+Client configs and saved sessions used to be encrypted as one Fernet token:
+the whole plaintext, its bytes and the base64 token were all in memory at
+once (about three times the plaintext), and a reader had to attempt a decrypt
+to find out whether a file was encrypted at all. Files are now written as
+
+    header   MAGIC, format version, chunk size, 8-byte random nonce prefix
+    chunks   final flag (1 byte), ciphertext length (4 bytes), AES-GCM ciphertext
+
+Each chunk of up to ``chunk_size`` plaintext bytes is sealed with AES-256-GCM
+under the nonce ``prefix + chunk index``, with the header and the final flag
+as associated data, so reordered, truncated or extended files fail to
+decrypt. Reading and writing hold one chunk at a time beyond the plaintext
+the caller itself holds, and ``detect_format`` tells chunked, legacy Fernet
+and plaintext files apart from their first bytes.
+
+Requires the ``cryptography`` package; ``available()`` is False without it.
+"""
+import os
+import struct
+import uuid
+from typing import Iterator, Optional
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.hashes import SHA256
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+except Exception:
+    AESGCM = None  # cryptography not available; encryption disabled
+
+    class InvalidTag(Exception):
+        pass
+
+# Not valid UTF-8 or base64, so it can't be the start of a JSON document or a Fernet token
+MAGIC = b'\x89ADBENC\n'
+FORMAT_VERSION = 1
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# Every Fernet token starts with version byte 0x80 and a 64-bit timestamp
+FERNET_PREFIX = b'gAAAAA'
+
+FORMAT_CHUNKED = 'chunked'
+FORMAT_FERNET = 'fernet'
+FORMAT_PLAIN = 'plain'
+
+_HEADER = struct.Struct('<8sBI8s')  # magic, version, chunk size, nonce prefix
+_CHUNK = struct.Struct('<BI')  # final flag, ciphertext length
+_KEY_INFO = b'amazon-ads-audit-dashboard file encryption v1'
+
+
+class SecureFileError(ValueError):
+    """An encrypted file is corrupt, truncated, or was written with a different key."""
+
+
+def available() -> bool:
+    return AESGCM is not None
+
+
+def detect_format(path: str) -> str:
+    """FORMAT_CHUNKED, FORMAT_FERNET or FORMAT_PLAIN, from the file's first bytes."""
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC))
+    if head == MAGIC:
+        return FORMAT_CHUNKED
+    if head.startswith(FERNET_PREFIX):
+        return FORMAT_FERNET
+    return FORMAT_PLAIN
+
+
+class FileCipher:
+    """An AES-256-GCM key for reading and writing chunked encrypted files."""
+
+    def __init__(self, key: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if AESGCM is None:
+            raise RuntimeError("The cryptography package is required for encrypted files")
+        self._aead = AESGCM(key)
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_secret(cls, secret: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'FileCipher':
+        """Derive the file key from an application secret (e.g. the Fernet key) with HKDF."""
+        key = HKDF(algorithm=SHA256(), length=32, salt=None, info=_KEY_INFO).derive(secret)
+        return cls(key, chunk_size)
+
+    def writer(self, path: str) -> 'EncryptedWriter':
+        return EncryptedWriter(self, path)
+
+    def iter_chunks(self, path: str) -> Iterator[bytes]:
+        """Decrypted plaintext of ``path``, one chunk at a time."""
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise SecureFileError(f"{path} is not an encrypted file")
+            magic, version, _chunk_size, prefix = _HEADER.unpack(header)
+            if magic != MAGIC:
+                raise SecureFileError(f"{path} is not an encrypted file")
+            if version != FORMAT_VERSION:
+                raise SecureFileError(f"{path} uses encryption format version {version}")
+            index = 0
+            while True:
+                chunk_header = f.read(_CHUNK.size)
+                if len(chunk_header) < _CHUNK.size:
+                    raise SecureFileError(f"{path} is truncated")
+                final, length = _CHUNK.unpack(chunk_header)
+                ciphertext = f.read(length)
+                if len(ciphertext) < length:
+                    raise SecureFileError(f"{path} is truncated")
+                try:
+                    yield self._aead.decrypt(_nonce(prefix, index), ciphertext, header + bytes((final,)))
+                except InvalidTag:
+                    raise SecureFileError(f"{path} could not be decrypted (wrong key or corrupted)") from None
+                index += 1
+                if final:
+                    break
+            if f.read(1):
+                raise SecureFileError(f"{path} has data after its final chunk")
+
+    def read(self, path: str) -> bytearray:
+        """The whole decrypted file; memory is the plaintext plus one chunk."""
+        # Ciphertext is never shorter than its plaintext
+        data = bytearray(max(os.path.getsize(path) - _HEADER.size, 0))
+        size = 0
+        for chunk in self.iter_chunks(path):
+            data[size:size + len(chunk)] = chunk
+            size += len(chunk)
+        del data[size:]
+        return data
+
+    def write(self, path: str, data) -> None:
+        with self.writer(path) as out:
+            out.write(data)
+
+
+def _nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + struct.pack('<I', index)
+
+
+class EncryptedWriter:
+    """Streams plaintext into an encrypted file, one chunk at a time.
+
+    Written to a temporary file next to ``path`` and renamed into place on
+    ``close()``; leaving the ``with`` block on an exception discards it, so the
+    previous file survives a failed write.
+    """
+
+    def __init__(self, cipher: FileCipher, path: str):
+        self._cipher = cipher
+        self._chunk_size = cipher.chunk_size
+        self.path = path
+        self._tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        self._file = open(self._tmp_path, 'wb')
+        self._header = _HEADER.pack(MAGIC, FORMAT_VERSION, self._chunk_size, os.urandom(8))
+        self._prefix = self._header[-8:]
+        self._file.write(self._header)
+        self._buffer = bytearray()
+        self._index = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast('B')
+        written = len(view)
+        if len(self._buffer) + written <= self._chunk_size:
+            self._buffer += view
+            return written
+        while view:
+            # A chunk is only sealed once more data follows it; the last one is sealed as final
+            if len(self._buffer) == self._chunk_size:
+                self._seal(self._buffer, final=False)
+                self._buffer = bytearray()
+            if not self._buffer and len(view) > self._chunk_size:
+                self._seal(view[:self._chunk_size], final=False)
+                view = view[self._chunk_size:]
+                continue
+            take = min(len(view), self._chunk_size - len(self._buffer))
+            self._buffer += view[:take]
+            view = view[take:]
+        return written
+
+    def _seal(self, plaintext, final: bool) -> None:
+        flag = 1 if final else 0
+        ciphertext = self._cipher._aead.encrypt(_nonce(self._prefix, self._index), plaintext,
+                                                self._header + bytes((flag,)))
+        self._file.write(_CHUNK.pack(flag, len(ciphertext)))
+        self._file.write(ciphertext)
+        self._index += 1
+
+    def close(self) -> None:
+        """Seal the final chunk and move the file into place."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._seal(self._buffer, final=True)
+            self._buffer = bytearray()
+            self._file.close()
+            os.replace(self._tmp_path, self.path)
+        except BaseException:
+            self._discard()
+            raise
+
+    def abort(self) -> None:
+        """Discard everything written; ``path`` is left as it was."""
+        if self.closed:
+            return
+        self.closed = True
+        self._discard()
+
+    def _discard(self) -> None:
+        try:
+            self._file.close()
+        finally:
+            try:
+                os.remove(self._tmp_path)
+            except OSError:
+                pass
+
+    def __enter__(self) -> 'EncryptedWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_file(path: str, cipher: Optional[FileCipher]):
+    """(contents, format) of ``path``, decrypting chunked files with ``cipher``.
+
+    Legacy Fernet files are returned undecrypted with FORMAT_FERNET; the
+    caller decides how to read them.
+    """
+    file_format = detect_format(path)
+    if file_format == FORMAT_CHUNKED:
+        if cipher is None:
+            raise SecureFileError(f"{path} is encrypted but no encryption key is configured")
+        return cipher.read(path), file_format
+    with open(path, 'rb') as f:
+        return f.read(), file_format
@@ -0,0 +1,331 @@
+"""Period-over-period comparison of two audit sessions.
+
+Compares the bulk data of a previous and a current session at campaign, ad
+group, target and ASIN level. Each level's rows are picked out of every bulk
+sheet by their Entity, keyed by entity IDs (Campaign ID, Ad Group ID, the
+keyword / product targeting / targeting ID, or the advertised ASIN), and the
+two periods are joined with one hash join (``DataFrame.merge``) per level.
+Everything is column-wise, so accounts with a million bulk rows compare in
+seconds.
+
+Each level table has the entity's labels, a Status (New, Removed, Updated
+when its state or bid/budget changed, else Same), and previous/current/change
+columns for state, bid or budget, spend, sales, ACoS, orders, clicks and
+impressions, sorted by the size of the spend change.
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from column_schema import resolve_column, to_numeric_clean
+
+LEVEL_CAMPAIGN = 'campaign'
+LEVEL_AD_GROUP = 'ad_group'
+LEVEL_TARGET = 'target'
+LEVEL_ASIN = 'asin'
+
+PREVIOUS = 'Previous'
+CURRENT = 'Current'
+
+STATUS_NEW = 'New'
+STATUS_REMOVED = 'Removed'
+STATUS_UPDATED = 'Updated'
+STATUS_SAME = 'Same'
+
+CAMPAIGN_NAMES = ['Campaign Name (Informational only)', 'Campaign Name', 'Campaign']
+AD_GROUP_NAMES = ['Ad Group Name (Informational only)', 'Ad Group Name', 'Ad Group']
+METRICS = {
+    'Spend': ['Spend', 'Cost'],
+    'Sales': ['Sales'],
+    'Orders': ['Orders'],
+    'Clicks': ['Clicks'],
+    'Impressions': ['Impressions'],
+}
+# Sponsored Display sales column when the view-through attribution is chosen
+SD_VIEWS_SALES = 'Sales (Views & Clicks)'
+
+
+class ComparisonLevel:
+    """How one level's rows are found in a bulk sheet and what identifies them."""
+
+    def __init__(self, name: str, label: str, entities: Iterable[str], ids: Dict[str, List[str]],
+                 labels: Dict[str, List[str]], setting: Optional[tuple] = None, state: bool = True,
+                 text_ids: Iterable[str] = ()):
+        self.name = name
+        self.label = label
+        self.entities = tuple(entities)
+        # Output key column -> source columns, the first non-empty one wins
+        self.ids = ids
+        # Key columns compared as text (ASINs, SKUs) rather than numeric IDs
+        self.text_ids = frozenset(text_ids)
+        self.labels = labels
+        # (output name, source columns) of the bid-like setting, if the level has one
+        self.setting = setting
+        self.state = state
+
+
+COMPARISON_LEVELS: Dict[str, ComparisonLevel] = {
+    LEVEL_CAMPAIGN: ComparisonLevel(
+        LEVEL_CAMPAIGN, 'Campaigns', ['campaign'],
+        ids={'Campaign ID': ['Campaign ID']},
+        labels={'Product': ['Product'], 'Campaign': CAMPAIGN_NAMES},
+        setting=('Budget', ['Daily Budget', 'Budget']),
+    ),
+    LEVEL_AD_GROUP: ComparisonLevel(
+        LEVEL_AD_GROUP, 'Ad Groups', ['ad group'],
+        ids={'Campaign ID': ['Campaign ID'], 'Ad Group ID': ['Ad Group ID']},
+        labels={'Product': ['Product'], 'Campaign': CAMPAIGN_NAMES, 'Ad Group': AD_GROUP_NAMES},
+        setting=('Bid', ['Ad Group Default Bid', 'Ad Group Default Bid (Informational only)', 'Default Bid']),
+    ),
+    LEVEL_TARGET: ComparisonLevel(
+        LEVEL_TARGET, 'Targets',
+        ['keyword', 'product targeting', 'targeting', 'audience targeting', 'contextual targeting'],
+        ids={'Campaign ID': ['Campaign ID'], 'Ad Group ID': ['Ad Group ID'],
+             'Target ID': ['Keyword ID', 'Product Targeting ID', 'Targeting ID']},
+        labels={'Product': ['Product'], 'Campaign': CAMPAIGN_NAMES, 'Ad Group': AD_GROUP_NAMES,
+                'Entity': ['Entity'],
+                'Target': ['Keyword Text', 'Product Targeting Expression', 'Targeting Expression',
+                           'Resolved Product Targeting Expression (Informational only)'],
+                'Match Type': ['Match Type']},
+        setting=('Bid', ['Bid']),
+    ),
+    LEVEL_ASIN: ComparisonLevel(
+        LEVEL_ASIN, 'ASINs', ['product ad'],
+        # Seller product ads without an ASIN in the sheet are keyed by SKU
+        ids={'ASIN': ['ASIN (Informational only)', 'ASIN', 'Advertised ASIN', 'SKU']},
+        labels={'SKU': ['SKU']},
+        state=False,
+        text_ids=['ASIN'],
+    ),
+}
+
+
+def _map_distinct(series: pd.Series, func) -> pd.Series:
+    """``func`` (a vectorized string transform) applied once per distinct value of ``series``.
+
+    Bulk text columns repeat a few thousand names over up to a million rows;
+    NA stays NA.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    mapped = func(pd.Series(uniques, dtype=object).astype(str)).to_numpy(dtype=object)
+    return pd.Series(np.where(codes >= 0, mapped[codes] if len(mapped) else None, None),
+                     index=series.index, dtype=object)
+
+
+def _normalized_text(series: pd.Series) -> pd.Series:
+    """Lower-cased, stripped text, with NA as ''."""
+    return _map_distinct(series, lambda s: s.str.strip().str.lower()).fillna('')
+
+
+def _coalesce(rows: pd.DataFrame, names: List[str]) -> Optional[pd.Series]:
+    """The first non-empty value across the columns ``names`` resolves to in ``rows``."""
+    result = None
+    for name in names:
+        column = resolve_column(rows, [name])
+        if column is None:
+            continue
+        values = rows[column]
+        if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype == object:
+            # Blank text counts as missing so the next column can fill it
+            values = _map_distinct(values, lambda s: s.where(s.str.strip() != ''))
+        # where() rather than fillna(), which warns about downcasting object columns
+        result = values if result is None else result.where(result.notna(), values)
+    return result
+
+
+def _id_values(values: pd.Series) -> pd.Series:
+    """Entity IDs as nullable integers, whether the sheet held them as ints, floats or text."""
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.astype('Int64')
+    if not pd.api.types.is_float_dtype(values.dtype):
+        values = pd.to_numeric(values.astype(str).str.strip().str.replace(r'\.0+$', '', regex=True),
+                               errors='coerce')
+    if pd.api.types.is_float_dtype(values.dtype):
+        values = values.round()
+    return values.astype('Int64')
+
+
+def _is_sponsored_display(sheet_name: str, rows: pd.DataFrame) -> bool:
+    if 'display' in sheet_name.lower():
+        return True
+    product_col = resolve_column(rows, ['Product'])
+    if product_col is None or rows.empty:
+        return False
+    return bool(_normalized_text(rows[product_col].iloc[:1]).str.contains('sponsored display').any())
+
+
+def _sheet_level_rows(sheet_name: str, df: pd.DataFrame, level: ComparisonLevel,
+                      sd_attribution: str) -> Optional[pd.DataFrame]:
+    entity_col = resolve_column(df, ['Entity', 'Record Type'])
+    if entity_col is None:
+        return None
+    mask = _normalized_text(df[entity_col]).isin(level.entities).to_numpy()
+    if not mask.any():
+        return None
+    # Only the columns this level reads are copied out of the sheet
+    names = [name for names in level.ids.values() for name in names]
+    names += [name for names in level.labels.values() for name in names]
+    names += ['State', 'Product', SD_VIEWS_SALES] + [name for names in METRICS.values() for name in names]
+    if level.setting:
+        names += level.setting[1]
+    columns = list(dict.fromkeys(c for c in (resolve_column(df, [name]) for name in names) if c is not None))
+    rows = df.loc[mask, columns]
+    out = {}
+    for key, names in level.ids.items():
+        values = _coalesce(rows, names)
+        if values is None:
+            return None
+        if key in level.text_ids:
+            out[key] = _map_distinct(values, lambda s: s.str.strip().str.upper())
+        else:
+            out[key] = _id_values(values)
+    for label, names in level.labels.items():
+        values = _coalesce(rows, names)
+        out[label] = values.astype(object) if values is not None else pd.Series(None, index=rows.index, dtype=object)
+    if level.state:
+        state_col = resolve_column(rows, ['State'])
+        out['State'] = _normalized_text(rows[state_col]) if state_col else pd.Series('', index=rows.index)
+    if level.setting:
+        setting_name, names = level.setting
+        values = _coalesce(rows, names)
+        out[setting_name] = to_numeric_clean(values) if values is not None else pd.Series(np.nan, index=rows.index)
+    sales_names = METRICS['Sales']
+    if sd_attribution == SD_VIEWS_SALES and _is_sponsored_display(sheet_name, rows):
+        sales_names = [SD_VIEWS_SALES] + sales_names
+    for metric, names in METRICS.items():
+        values = _coalesce(rows, sales_names if metric == 'Sales' else names)
+        out[metric] = to_numeric_clean(values).fillna(0).astype('float64') if values is not None \
+            else pd.Series(0.0, index=rows.index)
+    frame = pd.DataFrame(out)
+    # Rows without their IDs can't be matched across periods
+    frame = frame.dropna(subset=list(level.ids))
+    # Plain int64 keys hash faster than nullable ones in the join
+    return frame.astype({key: 'int64' for key in level.ids if key not in level.text_ids})
+
+
+def level_frame(bulk_data: Mapping[str, pd.DataFrame], level: ComparisonLevel,
+                sd_attribution: str = 'Sales') -> pd.DataFrame:
+    """One row per entity of ``level`` across all bulk sheets, metrics summed over duplicates."""
+    frames = []
+    for sheet_name in list(bulk_data):
+        df = bulk_data[sheet_name]
+        if isinstance(df, pd.DataFrame):
+            rows = _sheet_level_rows(sheet_name, df, level, sd_attribution)
+            if rows is not None and not rows.empty:
+                frames.append(rows)
+    if not frames:
+        return pd.DataFrame()
+    combined = pd.concat(frames, ignore_index=True)
+    keys = list(level.ids)
+    if not combined.duplicated(keys).any():
+        return combined
+    aggregations = {column: 'first' for column in combined.columns if column not in keys}
+    aggregations.update({metric: 'sum' for metric in METRICS})
+    return combined.groupby(keys, sort=False).agg(aggregations).reset_index()
+
+
+def _acos(spend: pd.Series, sales: pd.Series) -> pd.Series:
+    return (spend / sales.where(sales > 0)) * 100
+
+
+def compare_level(previous: pd.DataFrame, current: pd.DataFrame, level: ComparisonLevel) -> pd.DataFrame:
+    """Join one level of both periods on its IDs and compute the changes."""
+    if previous.empty and current.empty:
+        return pd.DataFrame()
+    keys = list(level.ids)
+    if previous.empty:
+        previous = pd.DataFrame({c: current[c].iloc[:0] for c in current.columns})
+    if current.empty:
+        current = pd.DataFrame({c: previous[c].iloc[:0] for c in previous.columns})
+    merged = previous.merge(current, on=keys, how='outer', suffixes=(f' ({PREVIOUS})', f' ({CURRENT})'),
+                            indicator=True)
+    side = merged.pop('_merge')
+
+    result = {}
+    for label in level.labels:
+        # Names as of the current period, or the last known for removed entities
+        current = merged[f'{label} ({CURRENT})']
+        result[label] = current.where(current.notna(), merged[f'{label} ({PREVIOUS})'])
+
+    changed = np.zeros(len(merged), dtype=bool)
+    if level.state:
+        prev_state = merged[f'State ({PREVIOUS})'].fillna('')
+        cur_state = merged[f'State ({CURRENT})'].fillna('')
+        result[f'State ({PREVIOUS})'] = prev_state
+        result[f'State ({CURRENT})'] = cur_state
+        changed |= (prev_state != cur_state).to_numpy()
+    if level.setting:
+        setting = level.setting[0]
+        prev_setting = merged[f'{setting} ({PREVIOUS})']
+        cur_setting = merged[f'{setting} ({CURRENT})']
+        result[f'{setting} ({PREVIOUS})'] = prev_setting
+        result[f'{setting} ({CURRENT})'] = cur_setting
+        result[f'{setting} Change'] = cur_setting - prev_setting
+        changed |= ~np.isclose(prev_setting.to_numpy(dtype=float), cur_setting.to_numpy(dtype=float),
+                               equal_nan=True)
+
+    for metric in METRICS:
+        prev_values = merged[f'{metric} ({PREVIOUS})'].fillna(0.0)
+        cur_values = merged[f'{metric} ({CURRENT})'].fillna(0.0)
+        result[f'{metric} ({PREVIOUS})'] = prev_values
+        result[f'{metric} ({CURRENT})'] = cur_values
+        result[f'{metric} Change'] = cur_values - prev_values
+        if metric == 'Sales':
+            prev_acos = _acos(result[f'Spend ({PREVIOUS})'], prev_values)
+            cur_acos = _acos(result[f'Spend ({CURRENT})'], cur_values)
+            result[f'ACoS ({PREVIOUS})'] = prev_acos
+            result[f'ACoS ({CURRENT})'] = cur_acos
+            result['ACoS Change'] = cur_acos - prev_acos
+
+    side = side.to_numpy()
+    status = np.select([side == 'left_only', side == 'right_only', changed],
+                       [STATUS_REMOVED, STATUS_NEW, STATUS_UPDATED], STATUS_SAME)
+    for key in keys:
+        result[key] = merged[key]
+    columns = list(level.labels) + ['Status'] + [c for c in result if c not in level.labels]
+    result['Status'] = status
+    table = pd.DataFrame({c: result[c] for c in columns}, copy=False)
+    order = np.argsort(-np.abs(result['Spend Change'].to_numpy()), kind='stable')
+    return table.take(order).reset_index(drop=True)
+
+
+def level_summary(table: pd.DataFrame) -> Dict[str, Any]:
+    """Entity counts by status and both periods' totals for one level table."""
+    if table.empty:
+        return {'entities': 0}
+    counts = table['Status'].value_counts()
+    summary: Dict[str, Any] = {
+        'entities': int(len(table)),
+        'new': int(counts.get(STATUS_NEW, 0)),
+        'removed': int(counts.get(STATUS_REMOVED, 0)),
+        'updated': int(counts.get(STATUS_UPDATED, 0)),
+    }
+    if f'State ({PREVIOUS})' in table:
+        both = ~table['Status'].isin([STATUS_NEW, STATUS_REMOVED])
+        summary['state_changes'] = int((both & (table[f'State ({PREVIOUS})'] != table[f'State ({CURRENT})'])).sum())
+    for period in (PREVIOUS, CURRENT):
+        spend = float(table[f'Spend ({period})'].sum())
+        sales = float(table[f'Sales ({period})'].sum())
+        summary[period.lower()] = {
+            'spend': spend,
+            'sales': sales,
+            'orders': float(table[f'Orders ({period})'].sum()),
+            'acos': spend / sales * 100 if sales > 0 else None,
+        }
+    return summary
+
+
+def compare_sessions(previous_bulk: Mapping[str, pd.DataFrame], current_bulk: Mapping[str, pd.DataFrame],
+                     sd_attribution: str = 'Sales',
+                     levels: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+    """Level name -> comparison table of two sessions' bulk data (see ``compare_level``)."""
+    tables = {}
+    for name in (levels or COMPARISON_LEVELS):
+        level = COMPARISON_LEVELS[name]
+        tables[name] = compare_level(level_frame(previous_bulk, level, sd_attribution),
+                                     level_frame(current_bulk, level, sd_attribution), level)
+    return tables
@@ -0,0 +1,190 @@
+"""Per-client index of saved sessions.
+
+Listing a client's sessions used to open every session (legacy JSON
+documents can be hundreds of MB) just to show names and dates. Each client
+session directory now keeps a small index file with the metadata the session
+picker shows, updated when a session is saved or deleted. Listing reads only
+the index, sorted and paged.
+
+Sessions that reach the directory some other way (backup import, data
+migration, copying files) are picked up on the next listing: the index
+records each session's modification time, and a ``listdir``/``stat`` pass
+(no file is opened) finds entries that are missing, gone or changed. Only
+those are described again.
+"""
+import json
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from session_snapshot import SNAPSHOT_SUFFIX
+
+INDEX_FILENAME = '.session_index'
+INDEX_VERSION = 1
+LEGACY_SESSION_SUFFIX = '.json'
+
+SORT_KEYS = ('timestamp', 'created_date', 'display_name')
+
+ReadBytes = Callable[[str], bytes]
+WriteBytes = Callable[[str, bytes], None]
+# Session metadata for the file at a path, or None if it can't be read
+Describe = Callable[[str], Optional[Dict[str, Any]]]
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _directory_lock(directory: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(directory), threading.Lock())
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def is_session_name(filename: str) -> bool:
+    return filename.endswith(SNAPSHOT_SUFFIX) or filename.endswith(LEGACY_SESSION_SUFFIX)
+
+
+class SessionIndex:
+    """The session index of one client's session directory."""
+
+    def __init__(self, directory: str, describe: Describe,
+                 read_bytes: ReadBytes = _read_file, write_bytes: WriteBytes = _write_file):
+        self.directory = directory
+        self.path = os.path.join(directory, INDEX_FILENAME)
+        self._describe = describe
+        self._read_bytes = read_bytes
+        self._write_bytes = write_bytes
+        self._lock = _directory_lock(directory)
+
+    # --- Storage ---
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            index = json.loads(self._read_bytes(self.path))
+        except (OSError, ValueError):
+            # Missing, unreadable or written with another key: rebuilt from the directory
+            return {}
+        if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+            return {}
+        sessions = index.get('sessions')
+        return sessions if isinstance(sessions, dict) else {}
+
+    def _save(self, sessions: Dict[str, Dict[str, Any]]) -> None:
+        data = json.dumps({'version': INDEX_VERSION, 'sessions': sessions}, indent=2).encode('utf-8')
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            self._write_bytes(tmp_path, data)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _mtime(self, filename: str) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(self.directory, filename)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _describe_entry(self, filename: str, mtime_ns: int) -> Dict[str, Any]:
+        try:
+            metadata = self._describe(os.path.join(self.directory, filename))
+        except Exception:
+            metadata = None
+        if metadata is None:
+            # Kept so an unreadable file isn't reopened on every listing
+            return {'filename': filename, 'mtime_ns': mtime_ns, 'invalid': True}
+        entry = dict(metadata)
+        entry.update({'filename': filename, 'mtime_ns': mtime_ns})
+        entry.pop('filepath', None)
+        return entry
+
+    def _reconcile(self, sessions: Dict[str, Dict[str, Any]]) -> bool:
+        """Bring ``sessions`` in line with the directory; True if anything changed."""
+        try:
+            names = [name for name in os.listdir(self.directory) if is_session_name(name)]
+        except FileNotFoundError:
+            names = []
+        changed = False
+        for filename in set(sessions) - set(names):
+            del sessions[filename]
+            changed = True
+        for filename in names:
+            mtime_ns = self._mtime(filename)
+            if mtime_ns is None:
+                continue
+            entry = sessions.get(filename)
+            if entry is None or entry.get('mtime_ns') != mtime_ns:
+                sessions[filename] = self._describe_entry(filename, mtime_ns)
+                changed = True
+        return changed
+
+    # --- Updates ---
+
+    def record(self, filename: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Add or replace the entry for ``filename`` (described from the file if no metadata is given)."""
+        with self._lock:
+            sessions = self._load()
+            mtime_ns = self._mtime(filename)
+            if mtime_ns is None:
+                sessions.pop(filename, None)
+            elif metadata is None:
+                sessions[filename] = self._describe_entry(filename, mtime_ns)
+            else:
+                entry = dict(metadata)
+                entry.update({'filename': filename, 'mtime_ns': mtime_ns})
+                sessions[filename] = entry
+            self._save(sessions)
+
+    def remove(self, filename: str) -> None:
+        with self._lock:
+            sessions = self._load()
+            if sessions.pop(filename, None) is not None:
+                self._save(sessions)
+
+    # --- Listing ---
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Every readable session's metadata (with its ``filepath``), in no particular order."""
+        with self._lock:
+            sessions = self._load()
+            if (self._reconcile(sessions) or not os.path.exists(self.path)) and os.path.isdir(self.directory):
+                try:
+                    self._save(sessions)
+                except OSError:
+                    # Listing still works; the index is rebuilt next time
+                    pass
+        listed = []
+        for filename, entry in sessions.items():
+            if entry.get('invalid'):
+                continue
+            entry = dict(entry)
+            entry.pop('mtime_ns', None)
+            entry['filepath'] = os.path.join(self.directory, filename)
+            listed.append(entry)
+        return listed
+
+    def page(self, sort_by: str = 'timestamp', descending: bool = True,
+             offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """(sessions on the page, total number of sessions), sorted by ``sort_by``."""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown session sort key {sort_by!r}")
+        entries = self.entries()
+        if sort_by == 'display_name':
+            entries.sort(key=lambda e: (str(e.get('display_name', '')).casefold(), e['filename']), reverse=descending)
+        else:
+            entries.sort(key=lambda e: (str(e.get(sort_by, '')), e['filename']), reverse=descending)
+        end = None if limit is None else offset + limit
+        return entries[offset:end], len(entries)
@@ -0,0 +1,364 @@
+"""Columnar snapshots of saved audit sessions.
+
+Sessions used to be one JSON document holding every bulk sheet and the sales
+report as ``to_dict('records')`` lists: gigabytes for a large client, every
+dtype lost, and the whole document parsed just to list or load a session.
+A snapshot is a directory instead:
+
+    <session name>.session/
+        manifest.json      session metadata plus the sheet index (small)
+        bulk_000.frame     one file per bulk sheet
+        ...
+        sales_report.frame
+
+Each ``.frame`` file is a DataFrame encoded by ``blob_codec`` (normally an
+Arrow IPC stream with zstd-compressed columns), so dtypes (categoricals,
+datetimes, nullable integers, NaN vs None) come back exactly. Listing a
+session reads only the manifest, and bulk sheets are read the first time
+something asks for them (``SnapshotWorkbook``).
+
+A snapshot can also be saved as a delta against an earlier full snapshot of
+the same client (``write_snapshot(..., base_path=...)``). Weekly audits share
+most of their campaigns, ad groups and targets, so each bulk sheet is matched
+to the base sheet row by row on its entity ID columns and only the added and
+changed rows are stored, with the position of every row (in the base or among
+the stored rows) so the sheet is rebuilt exactly, row order and dtypes
+included. Sheets that can't be keyed, or whose delta isn't much smaller than
+the sheet, are stored in full. Deltas always reference a full snapshot, so
+loading one reads at most two files per sheet.
+
+All file reads and writes go through ``read_bytes``/``write_bytes`` callables
+so the caller can encrypt them.
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import blob_codec
+from bulk_reader import BulkWorkbook
+from column_schema import column_resolver
+
+SNAPSHOT_SUFFIX = '.session'
+SNAPSHOT_MANIFEST = 'manifest.json'
+SNAPSHOT_FORMAT = 'audit-session-snapshot'
+SNAPSHOT_VERSION = 1
+SALES_REPORT_FILE = 'sales_report.frame'
+# Manifest fields describing the snapshot itself rather than the session
+SNAPSHOT_FIELDS = ('format', 'version', 'snapshot_id', 'bulk_sheets', 'sales_report', 'base')
+
+# Columns that identify a row of a bulk sheet, where present
+DELTA_KEY_COLUMNS = ('Entity', 'Campaign ID', 'Ad Group ID', 'Ad ID', 'Keyword ID',
+                     'Product Targeting ID', 'Targeting ID')
+# A sheet is stored in full when its delta would be larger than this fraction of the base sheet
+DELTA_MAX_RATIO = 0.5
+
+ReadBytes = Callable[[str], bytes]
+WriteBytes = Callable[[str, bytes], None]
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def is_snapshot(path: str) -> bool:
+    return path.endswith(SNAPSHOT_SUFFIX) and os.path.isdir(path)
+
+
+def _frame_entry(directory: str, filename: str, df: pd.DataFrame, write_bytes: WriteBytes,
+                 digest) -> Dict[str, Any]:
+    data = blob_codec.encode(df)
+    write_bytes(os.path.join(directory, filename), data)
+    digest.update(hashlib.md5(data).digest())
+    return {'file': filename, 'rows': int(len(df)), 'columns': int(len(df.columns)),
+            'bytes': len(data), 'codec': blob_codec.codec_name(data)}
+
+
+def delta_key_columns(df: pd.DataFrame) -> List[str]:
+    """The ID columns that key ``df``'s rows, or [] if it has none."""
+    keys = [column for column in DELTA_KEY_COLUMNS if column in df.columns]
+    return keys if any(column != 'Entity' for column in keys) else []
+
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def encode_delta(base: pd.DataFrame, df: pd.DataFrame) -> Optional[Tuple[pd.DataFrame, np.ndarray, Dict[str, int]]]:
+    """(stored rows, row sources, counts) that rebuild ``df`` from ``base``; None if ``df`` can't be keyed.
+
+    ``stored rows`` are the added and changed rows of ``df``. ``row sources``
+    gives, for each row of ``df`` in order, its position in ``base`` (>= 0) or
+    ``-1 - i`` for stored row ``i``.
+    """
+    keys = delta_key_columns(df)
+    default_index = isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+    if not keys or not default_index or len(df) == 0 or not base.columns.equals(df.columns):
+        return None
+    try:
+        base_keys = pd.Index(_row_hashes(base[keys]))
+        df_keys = _row_hashes(df[keys])
+        if base_keys.has_duplicates or pd.Index(df_keys).has_duplicates:
+            return None
+        base_positions = base_keys.get_indexer(df_keys)
+        matched = base_positions >= 0
+        unchanged = matched.copy()
+        unchanged[matched] = _row_hashes(df)[matched] == _row_hashes(base)[base_positions[matched]]
+    except TypeError:
+        # Unhashable values
+        return None
+    stored = ~unchanged
+    sources = np.where(unchanged, base_positions, -np.cumsum(stored)).astype(np.int64)
+    stored_positions = np.flatnonzero(stored)
+    if not len(stored_positions):
+        # An unreferenced row keeps the column dtypes (e.g. categories), which empty frames lose
+        stored_positions = np.array([0])
+    rows = df.iloc[stored_positions].reset_index(drop=True)
+    counts = {
+        'added': int((~matched).sum()),
+        'changed': int((matched & stored).sum()),
+        'removed': int(len(base) - matched.sum()),
+    }
+    return rows, sources, counts
+
+
+def apply_delta(base: pd.DataFrame, rows: pd.DataFrame, sources: np.ndarray) -> pd.DataFrame:
+    """Inverse of ``encode_delta``."""
+    # The stored rows carry the sheet's dtypes (categories may differ from the base's)
+    casts = {column: rows[column].dtype for column in rows.columns if base[column].dtype != rows[column].dtype}
+    if casts:
+        base = base.astype(casts)
+    combined = pd.concat([base, rows], ignore_index=True)
+    positions = np.where(sources >= 0, sources, len(base) - 1 - sources)
+    return combined.take(positions).reset_index(drop=True)
+
+
+def _identical(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    return (a.columns.equals(b.columns) and list(a.dtypes) == list(b.dtypes)
+            and a.index.equals(b.index) and a.equals(b))
+
+
+def _delta_entry(directory: str, filename: str, df: pd.DataFrame, base_path: str,
+                 base_entry: Dict[str, Any], read_bytes: ReadBytes, write_bytes: WriteBytes,
+                 digest) -> Optional[Dict[str, Any]]:
+    base_df = read_frame(base_path, base_entry, read_bytes)
+    encoded = encode_delta(base_df, df)
+    if encoded is None:
+        return None
+    rows, sources, counts = encoded
+    # Only keep a delta that provably rebuilds the sheet
+    if not _identical(apply_delta(base_df, rows, sources), df):
+        return None
+    # Stored as steps: runs of unchanged rows become runs of 1s, which compress to almost nothing
+    data = blob_codec.encode((rows, pd.DataFrame({'source_step': np.diff(sources, prepend=0)})))
+    if len(data) > DELTA_MAX_RATIO * base_entry.get('bytes', 0):
+        return None
+    write_bytes(os.path.join(directory, filename), data)
+    digest.update(hashlib.md5(data).digest())
+    return {'file': filename, 'rows': int(len(df)), 'columns': int(len(df.columns)),
+            'bytes': len(data), 'codec': blob_codec.codec_name(data), 'delta': counts}
+
+
+def write_snapshot(path: str, metadata: Dict[str, Any],
+                   bulk_data: Optional[Mapping[str, pd.DataFrame]] = None,
+                   sales_report_data: Optional[pd.DataFrame] = None,
+                   write_bytes: WriteBytes = _write_file,
+                   base_path: Optional[str] = None,
+                   read_bytes: ReadBytes = _read_file) -> Dict[str, Any]:
+    """Write a snapshot directory at ``path`` (replacing any existing one); returns its manifest.
+
+    With ``base_path`` (a full snapshot in the same directory), bulk sheets are
+    stored as deltas against it where that is smaller; the manifest's ``base``
+    is None if none was.
+
+    The snapshot is assembled in a temporary directory next to ``path`` and
+    renamed into place, so a failed save never leaves a half-written session.
+    """
+    parent = os.path.dirname(path)
+    tmp_path = os.path.join(parent, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    os.makedirs(tmp_path)
+    try:
+        digest = hashlib.md5()
+        base_manifest = read_manifest(base_path, read_bytes) if base_path else None
+        if base_manifest is not None and base_manifest.get('base'):
+            raise ValueError("A delta session's base must be a full session")
+        base_entries = {entry['key']: entry for entry in (base_manifest or {}).get('bulk_sheets') or []}
+        sheets: List[Dict[str, Any]] = []
+        if bulk_data is not None:
+            for index, (key, df) in enumerate(bulk_data.items()):
+                if isinstance(df, pd.DataFrame):
+                    filename = f"bulk_{index:03d}.frame"
+                    entry = None
+                    if key in base_entries:
+                        entry = _delta_entry(tmp_path, filename, df, base_path, base_entries[key],
+                                             read_bytes, write_bytes, digest)
+                    if entry is None:
+                        entry = _frame_entry(tmp_path, filename, df, write_bytes, digest)
+                    entry['key'] = key
+                    sheets.append(entry)
+        base = None
+        if any('delta' in entry for entry in sheets):
+            base = {'file': os.path.basename(base_path), 'snapshot_id': base_manifest['snapshot_id']}
+            digest.update(base['snapshot_id'].encode('ascii'))
+        sales_entry = None
+        if isinstance(sales_report_data, pd.DataFrame):
+            sales_entry = _frame_entry(tmp_path, SALES_REPORT_FILE, sales_report_data, write_bytes, digest)
+        manifest = dict(metadata)
+        manifest.update({
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'snapshot_id': digest.hexdigest(),
+            'bulk_sheets': sheets if bulk_data is not None else None,
+            'sales_report': sales_entry,
+            'base': base,
+        })
+        write_bytes(os.path.join(tmp_path, SNAPSHOT_MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+        if os.path.exists(path):
+            old_path = f"{tmp_path}.old"
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.replace(tmp_path, path)
+        return manifest
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def read_manifest(path: str, read_bytes: ReadBytes = _read_file) -> Dict[str, Any]:
+    """The snapshot's manifest (metadata and sheet index) without reading any sheet."""
+    manifest = json.loads(read_bytes(os.path.join(path, SNAPSHOT_MANIFEST)).decode('utf-8'))
+    if not isinstance(manifest, dict) or manifest.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path} is not a session snapshot")
+    if manifest.get('version', 0) > SNAPSHOT_VERSION:
+        raise ValueError(f"Session snapshot version {manifest.get('version')} is newer than this app")
+    return manifest
+
+
+def read_frame(path: str, entry: Dict[str, Any], read_bytes: ReadBytes = _read_file) -> pd.DataFrame:
+    df = blob_codec.decode(read_bytes(os.path.join(path, entry['file'])))
+    column_resolver(df)
+    return df
+
+
+def base_snapshot_path(path: str, manifest: Dict[str, Any]) -> Optional[str]:
+    """Path of the snapshot a delta snapshot was saved against (None for a full snapshot)."""
+    base = manifest.get('base')
+    return os.path.join(os.path.dirname(path), base['file']) if base else None
+
+
+class SnapshotWorkbook(BulkWorkbook):
+    """The bulk sheets of a snapshot, each read from its file on first access.
+
+    A ``BulkWorkbook`` whose sheets come from the snapshot instead of a
+    workbook, so it hashes, fingerprints and pickles like an uploaded file.
+    Delta sheets are rebuilt from the base snapshot as they are read.
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, Any], read_bytes: ReadBytes = _read_file):
+        entries = {entry['key']: entry for entry in manifest.get('bulk_sheets') or []}
+        super().__init__(b'', {key: (key, False) for key in entries},
+                         source_hash=f"snapshot:{manifest['snapshot_id']}")
+        self._snapshot_path = path
+        self._snapshot_id = manifest['snapshot_id']
+        self._entries = entries
+        self._read_bytes = read_bytes
+        self._base = manifest.get('base')
+        self._base_path = base_snapshot_path(path, manifest)
+        self._base_entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _base_entry(self, key: str) -> Dict[str, Any]:
+        if self._base_entries is None:
+            try:
+                base_manifest = read_manifest(self._base_path, self._read_bytes)
+            except OSError:
+                raise ValueError(f"Base session {self._base['file']} of this session is missing") from None
+            if base_manifest.get('snapshot_id') != self._base['snapshot_id']:
+                raise ValueError(f"Base session {self._base['file']} of this session was replaced")
+            self._base_entries = {entry['key']: entry for entry in base_manifest.get('bulk_sheets') or []}
+        return self._base_entries[key]
+
+    def _check_current(self) -> None:
+        """Raise if the snapshot was saved again or deleted since this workbook was opened.
+
+        Sheet files are named by position, so a stale reader would otherwise get
+        another save's sheets.
+        """
+        name = os.path.basename(self._snapshot_path)
+        try:
+            manifest = read_manifest(self._snapshot_path, self._read_bytes)
+        except OSError:
+            raise ValueError(f"Session {name} was deleted since it was loaded") from None
+        if manifest.get('snapshot_id') != self._snapshot_id:
+            raise ValueError(f"Session {name} was replaced since it was loaded; load it again")
+
+    def _load(self, key: str) -> pd.DataFrame:
+        entry = self._entries[key]
+        if 'delta' not in entry:
+            self._check_current()
+            df = read_frame(self._snapshot_path, entry, self._read_bytes)
+            # A save that landed while the sheet was read
+            self._check_current()
+            return df
+        # Materializing rewrites a delta sheet's file as a full frame under the same name
+        self._check_current()
+        blob = self._read_bytes(os.path.join(self._snapshot_path, entry['file']))
+        self._check_current()
+        rows, steps = blob_codec.decode(blob)
+        base_df = read_frame(self._base_path, self._base_entry(key), self._read_bytes)
+        return apply_delta(base_df, rows, np.cumsum(steps['source_step'].to_numpy()))
+
+
+def load_snapshot(path: str, read_bytes: ReadBytes = _read_file,
+                  include_sales_report: bool = True) -> Dict[str, Any]:
+    """Manifest fields plus ``bulk_data`` (a lazy SnapshotWorkbook, or None) and ``sales_report_data``.
+
+    With ``include_sales_report=False`` the sales report isn't read and ``sales_report_data`` is None.
+    """
+    manifest = read_manifest(path, read_bytes)
+    restored = dict(manifest)
+    restored['bulk_data'] = SnapshotWorkbook(path, manifest, read_bytes) if manifest.get('bulk_sheets') else None
+    sales_entry = manifest.get('sales_report')
+    restored['sales_report_data'] = read_frame(path, sales_entry, read_bytes) if sales_entry and include_sales_report else None
+    return restored
+
+
+def snapshot_document(path: str, read_bytes: ReadBytes = _read_file) -> Dict[str, Any]:
+    """The snapshot as a JSON session document (records per sheet), e.g. for backups."""
+    restored = load_snapshot(path, read_bytes)
+    document = {k: v for k, v in restored.items() if k not in SNAPSHOT_FIELDS}
+
+    def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        return json.loads(df.to_json(orient='records', date_format='iso'))
+
+    bulk_data = restored['bulk_data']
+    document['bulk_data'] = {key: _records(bulk_data[key]) for key in bulk_data} if bulk_data is not None else None
+    sales = restored['sales_report_data']
+    document['sales_report_data'] = _records(sales) if sales is not None else None
+    return document
+
+
+def materialize_snapshot(path: str, read_bytes: ReadBytes = _read_file,
+                         write_bytes: WriteBytes = _write_file) -> Dict[str, Any]:
+    """Rewrite a delta snapshot as a full one (e.g. before its base is deleted); returns the new manifest."""
+    restored = load_snapshot(path, read_bytes)
+    bulk_data = restored['bulk_data']
+    return write_snapshot(
+        path,
+        {k: v for k, v in restored.items() if k not in SNAPSHOT_FIELDS + ('bulk_data', 'sales_report_data')},
+        bulk_data=bulk_data.to_dict() if bulk_data is not None else None,
+        sales_report_data=restored['sales_report_data'],
+        write_bytes=write_bytes,
+    )
@@ -0,0 +1,182 @@
+"""Process-wide store of loaded datasets shared between sessions.
+
+When several analysts open the same upload or saved session, each Streamlit
+session used to hold its own full copy of ``bulk_data`` and
+``sales_report_data``. The store keeps one copy per content fingerprint;
+sessions are handed views of it (``memory_cache.shared_view``: their own
+container/DataFrame objects over the shared column data, and for a lazy
+``BulkWorkbook`` its ``session_view``) and hold those in ``st.session_state``
+as before, so server memory grows with the number of distinct datasets
+rather than the number of users.
+
+Shared data follows the same rule as the memory tier: treat it as read-only.
+Adding or replacing a column on a session's frame only changes that
+session's view; writing values in place would change every session's data.
+
+Each dataset is reference-counted by the sessions holding it. A session
+stops holding a dataset when none of the session_state entries it was
+assigned to still refer to its view (the entry was cleared or replaced) or
+when the session itself is gone; a dataset nobody holds is dropped.
+"""
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from memory_cache import estimate_size, shared_view
+
+# A new hold counts as active this long, so the caller can assign its objects to session_state
+HOLD_GRACE_SECONDS = 60
+
+
+def _current_session():
+    """(session id, weak reference to the session's SessionState) of the running script."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except Exception:
+        ctx = None
+    if ctx is None:
+        return None, None
+    try:
+        # SafeSessionState is recreated on every rerun; the SessionState inside lives as long as the session
+        return ctx.session_id, weakref.ref(ctx.session_state._state)
+    except (AttributeError, TypeError):
+        return ctx.session_id, None
+
+
+class _Holder:
+    """One session's hold on a dataset, through the objects it assigned to session_state."""
+
+    def __init__(self, session_id: Optional[str], state_ref, slots: Dict[str, Any]):
+        self.session_id = session_id
+        self.state_ref = state_ref
+        self.slots = dict(slots)
+        self.created_at = time.monotonic()
+
+    def active(self) -> bool:
+        held = any(value is not None for value in self.slots.values())
+        if held and time.monotonic() - self.created_at < HOLD_GRACE_SECONDS:
+            return True
+        if self.state_ref is None:
+            # Outside a Streamlit session: held until the same slots are shared again
+            return held
+        state = self.state_ref()
+        if state is None:
+            return False
+        for slot, value in self.slots.items():
+            if value is None:
+                continue
+            try:
+                if state[slot] is value:
+                    return True
+            except KeyError:
+                continue
+        return False
+
+
+def _dataset_size(value: Any) -> int:
+    loaded_items = getattr(value, 'loaded_items', None)
+    if callable(loaded_items):
+        # Lazy mappings (BulkWorkbook): only the sheets parsed so far take memory
+        return estimate_size(loaded_items())
+    return estimate_size(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'holders', 'created_at', 'shares')
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.holders: List[_Holder] = []
+        self.created_at = time.time()
+        self.shares = 0
+
+
+class SharedDataStore:
+    """Datasets keyed by content fingerprint, shared by every session that loads them."""
+
+    def __init__(self):
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    def share(self, key: Hashable, build: Callable[[], Any],
+              slots: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+        """Session-state entries for dataset ``key``, building it only if no session holds it.
+
+        ``build()`` returns the dataset; ``slots(view)`` maps a view of it to the
+        session_state entries to assign (e.g. ``{'bulk_data': view}``). The
+        current session holds the dataset for as long as one of those entries
+        still refers to the object it was given. Returns that mapping; the
+        caller assigns it to ``st.session_state``.
+        """
+        with self._lock:
+            self._collect()
+            entry = self._entries.get(key)
+        if entry is None:
+            value = build()
+            if value is None:
+                return slots(None)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = _Entry(value)
+                    self.builds += 1
+                else:
+                    # Another session built it meanwhile
+                    self.reuses += 1
+        else:
+            with self._lock:
+                self.reuses += 1
+        assigned = slots(shared_view(entry.value))
+        session_id, state_ref = _current_session()
+        with self._lock:
+            self._supersede(session_id, assigned)
+            entry.holders.append(_Holder(session_id, state_ref, assigned))
+            entry.shares += 1
+            if key not in self._entries:
+                # Collected between build and hold by a concurrent call
+                self._entries[key] = entry
+        return assigned
+
+    def _supersede(self, session_id: Optional[str], slots: Dict[str, Any]) -> None:
+        """The session is assigning new objects to ``slots``: earlier holds through them end."""
+        for entry in self._entries.values():
+            for holder in entry.holders:
+                if holder.session_id == session_id:
+                    for slot in slots:
+                        holder.slots.pop(slot, None)
+
+    def _collect(self) -> int:
+        removed = 0
+        for key in list(self._entries):
+            entry = self._entries[key]
+            entry.holders = [holder for holder in entry.holders if holder.active()]
+            if not entry.holders:
+                del self._entries[key]
+                removed += 1
+        self.evictions += removed
+        return removed
+
+    def collect(self) -> int:
+        """Drop datasets no session holds any more; returns how many were dropped."""
+        with self._lock:
+            return self._collect()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._collect()
+            entries = list(self._entries.values())
+            stats = {
+                'datasets': len(entries),
+                'holders': sum(len(entry.holders) for entry in entries),
+                'sessions': len({holder.session_id for entry in entries for holder in entry.holders}),
+                'builds': self.builds,
+                'reuses': self.reuses,
+                'evictions': self.evictions,
+            }
+        stats['bytes'] = sum(_dataset_size(entry.value) for entry in entries)
+        return stats
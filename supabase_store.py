@@ -352,14 +352,16 @@ def upsert_client_config(user_id: str, client_name: str, config: Dict[str, Any])
         
         # Update SQLite cache immediately with new data
         if _DB_AVAILABLE and db_manager:
-            db_manager.cache_client_config(user_id, client_name, config)
-            # Also refresh client names list since this might be a new client
+            # One SQLite transaction for the config and client names updates
             try:
-                names_cached = db_manager.get_cached_client_names(user_id, max_age_seconds=999999)
-                if names_cached is not None and client_name not in names_cached:
-                    names_cached.append(client_name)
-                    names_cached.sort()
-                    db_manager.cache_client_names(user_id, names_cached)
+                with db_manager.batch():
+                    db_manager.cache_client_config(user_id, client_name, config)
+                    # Also refresh client names list since this might be a new client
+                    names_cached = db_manager.get_cached_client_names(user_id, max_age_seconds=999999)
+                    if names_cached is not None and client_name not in names_cached:
+                        names_cached.append(client_name)
+                        names_cached.sort()
+                        db_manager.cache_client_names(user_id, names_cached)
             except Exception:
                 pass
         